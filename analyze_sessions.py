@@ -0,0 +1,403 @@
+"""
+Offline analytics over a folder of emotion session logs
+
+Scans every session the logger wrote (NDJSON, CSV, old JSON, Parquet/Arrow
+and SQLite session databases), analyses each one in a process pool with
+NumPy and writes a combined report:
+
+- emotion distribution and mean confidence
+- dwell times (how long an emotion lasts before it changes)
+- emotion transition matrix
+- confidence histogram
+
+Per-session results are cached by file size/mtime (or record count for
+database sessions), so rescans only analyse new or changed sessions.
+
+Usage:
+    python analyze_sessions.py
+    python analyze_sessions.py output/ --report-dir output/analytics --workers 4
+    python analyze_sessions.py output/ --rebuild
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from utils.columnar_log import PYARROW_AVAILABLE, read_columnar
+from utils.session_log import iter_records
+
+CACHE_VERSION = 1
+HISTOGRAM_BINS = 10
+# When a session exists in several formats, read the fastest one
+FORMAT_PREFERENCE = (".parquet", ".arrow", ".ndjson", ".csv", ".json")
+
+
+def discover_sessions(folder: str) -> List[Tuple[str, str, Optional[int], list]]:
+    """(key, path, db_session_id, fingerprint) for every session in the folder
+
+    Database sessions that also exist as files (same session name) are
+    read from the file so they are not counted twice.
+    """
+    by_stem: Dict[str, str] = {}
+    db_sessions = []
+    for name in sorted(os.listdir(folder)):
+        path = os.path.join(folder, name)
+        stem, ext = os.path.splitext(name)
+        if not os.path.isfile(path):
+            continue
+        if ext == ".db":
+            db_sessions.extend(_discover_db_sessions(path))
+        elif ext in FORMAT_PREFERENCE:
+            if ext in (".parquet", ".arrow") and not PYARROW_AVAILABLE:
+                continue
+            current = by_stem.get(stem)
+            if current is None or FORMAT_PREFERENCE.index(ext) < FORMAT_PREFERENCE.index(os.path.splitext(current)[1]):
+                by_stem[stem] = path
+
+    sources = []
+    for stem, path in sorted(by_stem.items()):
+        stat = os.stat(path)
+        sources.append((os.path.basename(path), path, None, [stat.st_size, stat.st_mtime]))
+    sources.extend(source for name, source in db_sessions if name not in by_stem)
+    return sources
+
+
+def _discover_db_sessions(path: str) -> list:
+    from utils.session_store import SessionStore
+    store = SessionStore(path)
+    try:
+        return [(session['name'], (f"{os.path.basename(path)}#{session['id']}", path, session['id'],
+                                   [session['total_records'], session['end_us']]))
+                for session in store.list_sessions()]
+    finally:
+        store.close()
+
+
+def expand_intervals(elapsed: np.ndarray, codes: np.ndarray, confidence: np.ndarray,
+                     duration: np.ndarray, frames: np.ndarray):
+    """Per-frame arrays from event rows: frames spread evenly over each interval"""
+    frames = np.maximum(frames.astype(np.int64), 1)
+    if len(frames) == 0 or (frames == 1).all():
+        return elapsed, codes, confidence
+    row = np.repeat(np.arange(len(frames)), frames)
+    position = np.arange(len(row)) - np.repeat(np.cumsum(frames) - frames, frames)
+    step = duration / frames
+    return (elapsed[row] + position * step[row], codes[row], confidence[row])
+
+
+def load_session(path: str, session_id: Optional[int] = None):
+    """(time_elapsed float64, emotion labels, emotion codes int32, confidence float32), one entry per frame
+
+    Event-mode logs (rows with duration / frame_count) are expanded to frames.
+    """
+    ext = os.path.splitext(path)[1]
+    if ext in (".parquet", ".arrow"):
+        table = read_columnar(path)
+        emotion = table.column('emotion').combine_chunks()
+        if hasattr(emotion, 'dictionary'):
+            labels = emotion.dictionary.to_pylist()
+            codes = emotion.indices.to_numpy(zero_copy_only=False).astype(np.int32)
+        else:
+            labels, codes = np.unique(np.asarray(emotion.to_pylist(), dtype=object), return_inverse=True)
+            labels = list(labels)
+        elapsed = table.column('time_elapsed').to_numpy().astype(np.float64)
+        confidence = table.column('confidence').to_numpy().astype(np.float32)
+        if 'frame_count' in table.column_names:
+            elapsed, codes, confidence = expand_intervals(
+                elapsed, codes, confidence, table.column('duration').to_numpy().astype(np.float64),
+                table.column('frame_count').to_numpy())
+        return elapsed, labels, codes, confidence
+
+    if ext == ".db":
+        from utils.session_store import SessionStore
+        store = SessionStore(path)
+        try:
+            rows = store.conn.execute(
+                "SELECT time_elapsed, emotion, confidence, duration, frame_count FROM records "
+                "WHERE session_id = ? ORDER BY timestamp_us",
+                (session_id,)
+            ).fetchall()
+        finally:
+            store.close()
+        elapsed = [row[0] for row in rows]
+        emotions = [row[1] for row in rows]
+        confidences = [row[2] for row in rows]
+        durations = [row[3] or 0.0 for row in rows]
+        frames = [row[4] or 1 for row in rows]
+    else:
+        if ext == ".csv":
+            with open(path, newline='', encoding='utf-8') as f:
+                records = list(csv.DictReader(f))
+        elif ext == ".ndjson":
+            records = list(iter_records(path))
+        else:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            records = data.get('data', []) if isinstance(data, dict) else []
+        elapsed = [record['time_elapsed'] for record in records]
+        emotions = [record['emotion'] for record in records]
+        confidences = [record['confidence'] for record in records]
+        durations = [record.get('duration') or 0.0 for record in records]
+        frames = [record.get('frame_count') or 1 for record in records]
+
+    labels, codes = np.unique(np.asarray(emotions, dtype=object), return_inverse=True) if emotions \
+        else (np.array([], dtype=object), np.array([], dtype=np.int64))
+    elapsed, codes, confidence = expand_intervals(
+        np.asarray(elapsed, dtype=np.float64), codes.astype(np.int32), np.asarray(confidences, dtype=np.float32),
+        np.asarray(durations, dtype=np.float64), np.asarray(frames, dtype=np.int64))
+    return elapsed, list(labels), codes, confidence
+
+
+def analyze_arrays(elapsed: np.ndarray, labels: list, codes: np.ndarray, confidence: np.ndarray) -> Dict:
+    """Vectorised per-session statistics"""
+    count = len(codes)
+    if count == 0:
+        return {'records': 0}
+    k = len(labels)
+
+    emotion_counts = np.bincount(codes, minlength=k)
+    confidence_sums = np.bincount(codes, weights=confidence, minlength=k)
+
+    # Runs of the same emotion: start index of each run and its duration
+    starts = np.concatenate(([0], np.flatnonzero(codes[1:] != codes[:-1]) + 1))
+    run_codes = codes[starts]
+    run_ends = np.append(elapsed[starts[1:]], elapsed[-1])
+    dwell = run_ends - elapsed[starts]
+    dwell_total = np.bincount(run_codes, weights=dwell, minlength=k)
+    dwell_runs = np.bincount(run_codes, minlength=k)
+    dwell_max = np.zeros(k)
+    np.maximum.at(dwell_max, run_codes, dwell)
+
+    transitions = np.zeros((k, k), dtype=np.int64)
+    np.add.at(transitions, (run_codes[:-1], run_codes[1:]), 1)
+
+    histogram, _ = np.histogram(confidence, bins=HISTOGRAM_BINS, range=(0.0, 1.0))
+
+    return {
+        'records': int(count),
+        'duration_seconds': float(elapsed[-1] - elapsed[0]) if count > 1 else 0.0,
+        'confidence_sum': float(confidence.sum(dtype=np.float64)),
+        'emotions': {
+            label: {
+                'count': int(emotion_counts[i]),
+                'confidence_sum': float(confidence_sums[i]),
+                'dwell_total': float(dwell_total[i]),
+                'dwell_runs': int(dwell_runs[i]),
+                'dwell_max': float(dwell_max[i]),
+            }
+            for i, label in enumerate(labels) if emotion_counts[i]
+        },
+        'transitions': {
+            labels[i]: {labels[j]: int(transitions[i, j]) for j in np.flatnonzero(transitions[i])}
+            for i in np.flatnonzero(transitions.sum(axis=1))
+        },
+        'confidence_histogram': histogram.tolist(),
+    }
+
+
+def analyze_session(source: Tuple[str, str, Optional[int], list]) -> Tuple[str, Dict]:
+    """Worker entry point: load and analyse one session"""
+    key, path, session_id, _ = source
+    try:
+        return key, analyze_arrays(*load_session(path, session_id))
+    except Exception as e:
+        return key, {'error': str(e)}
+
+
+def merge_results(results: List[Dict]) -> Dict:
+    """Cross-session totals from per-session results"""
+    merged = {'sessions': 0, 'records': 0, 'duration_seconds': 0.0, 'confidence_sum': 0.0,
+              'emotions': {}, 'transitions': {}, 'confidence_histogram': [0] * HISTOGRAM_BINS}
+    for result in results:
+        if not result.get('records'):
+            continue
+        merged['sessions'] += 1
+        for field in ('records', 'duration_seconds', 'confidence_sum'):
+            merged[field] += result[field]
+        for label, entry in result['emotions'].items():
+            total = merged['emotions'].setdefault(
+                label, {'count': 0, 'confidence_sum': 0.0, 'dwell_total': 0.0, 'dwell_runs': 0, 'dwell_max': 0.0})
+            for field in ('count', 'confidence_sum', 'dwell_total', 'dwell_runs'):
+                total[field] += entry[field]
+            total['dwell_max'] = max(total['dwell_max'], entry['dwell_max'])
+        for source, targets in result['transitions'].items():
+            row = merged['transitions'].setdefault(source, {})
+            for target, count in targets.items():
+                row[target] = row.get(target, 0) + count
+        merged['confidence_histogram'] = [a + b for a, b in
+                                          zip(merged['confidence_histogram'], result['confidence_histogram'])]
+    return merged
+
+
+def describe(result: Dict) -> Dict:
+    """Derived statistics (shares, means, transition probabilities) for the report"""
+    records = result.get('records', 0)
+    if not records:
+        return {'records': 0}
+    emotions = {}
+    for label, entry in sorted(result['emotions'].items(), key=lambda item: -item[1]['count']):
+        emotions[label] = {
+            'count': entry['count'],
+            'percentage': round(entry['count'] / records * 100, 2),
+            'avg_confidence': round(entry['confidence_sum'] / entry['count'], 4),
+            'avg_dwell_seconds': round(entry['dwell_total'] / entry['dwell_runs'], 3) if entry['dwell_runs'] else 0.0,
+            'max_dwell_seconds': round(entry['dwell_max'], 3),
+        }
+    transition_probabilities = {}
+    for source, targets in result['transitions'].items():
+        total = sum(targets.values())
+        transition_probabilities[source] = {target: round(count / total, 4) for target, count in targets.items()}
+    described = {
+        'records': records,
+        'duration_minutes': round(result['duration_seconds'] / 60, 2),
+        'avg_confidence': round(result['confidence_sum'] / records, 4),
+        'emotions': emotions,
+        'transitions': result['transitions'],
+        'transition_probabilities': transition_probabilities,
+        'confidence_histogram': {
+            f"{i / HISTOGRAM_BINS:.1f}-{(i + 1) / HISTOGRAM_BINS:.1f}": count
+            for i, count in enumerate(result['confidence_histogram'])
+        },
+    }
+    if 'sessions' in result:
+        described['sessions'] = result['sessions']
+    return described
+
+
+def load_cache(path: str) -> Dict:
+    try:
+        with open(path, encoding='utf-8') as f:
+            cache = json.load(f)
+        if cache.get('version') == CACHE_VERSION:
+            return cache.get('sessions', {})
+    except (OSError, ValueError):
+        pass
+    return {}
+
+
+def save_cache(path: str, sessions: Dict):
+    temp_path = path + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump({'version': CACHE_VERSION, 'sessions': sessions}, f, ensure_ascii=False)
+    os.replace(temp_path, path)
+
+
+def run_analysis(folder: str, report_dir: str, workers: int = 0, rebuild: bool = False) -> Dict:
+    """Analyse new/changed sessions, merge with the cache and write the report"""
+    os.makedirs(report_dir, exist_ok=True)
+    cache_path = os.path.join(report_dir, "analytics_cache.json")
+    cache = {} if rebuild else load_cache(cache_path)
+
+    sources = discover_sessions(folder)
+    stale = [source for source in sources
+             if cache.get(source[0], {}).get('fingerprint') != source[3]]
+    print(f"Tìm thấy {len(sources)} phiên, cần phân tích {len(stale)} (còn lại dùng cache)")
+
+    start = time.perf_counter()
+    if stale:
+        fingerprints = {source[0]: source[3] for source in stale}
+        if workers == 1 or len(stale) == 1:
+            analysed = [analyze_session(source) for source in stale]
+        else:
+            with ProcessPoolExecutor(max_workers=workers or None) as executor:
+                analysed = list(executor.map(analyze_session, stale, chunksize=max(1, len(stale) // 32)))
+        for key, result in analysed:
+            if 'error' in result:
+                print(f"Lỗi phân tích {key}: {result['error']}")
+                continue
+            cache[key] = {'fingerprint': fingerprints[key], 'result': result}
+
+    # Drop sessions that no longer exist
+    current = {source[0] for source in sources}
+    cache = {key: entry for key, entry in cache.items() if key in current}
+    save_cache(cache_path, cache)
+
+    per_session = {key: entry['result'] for key, entry in sorted(cache.items())}
+    report = {
+        'generated': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'folder': os.path.abspath(folder),
+        'analysis_seconds': round(time.perf_counter() - start, 3),
+        'overall': describe(merge_results(list(per_session.values()))),
+        'sessions': {key: describe(result) for key, result in per_session.items()},
+    }
+    with open(os.path.join(report_dir, "report.json"), 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    write_text_report(os.path.join(report_dir, "report.txt"), report)
+    return report
+
+
+def write_text_report(path: str, report: Dict):
+    """Human-readable combined report"""
+    overall = report['overall']
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("EMOTION RECOGNITION - BÁO CÁO TỔNG HỢP\n")
+        f.write("=" * 50 + "\n\n")
+        f.write(f"Thời gian tạo: {report['generated']}\n")
+        f.write(f"Thư mục: {report['folder']}\n")
+        f.write(f"Số phiên: {overall.get('sessions', 0)}\n")
+        f.write(f"Tổng số bản ghi: {overall.get('records', 0)}\n")
+        f.write(f"Tổng thời lượng: {overall.get('duration_minutes', 0):.2f} phút\n")
+        f.write(f"Độ tin cậy TB: {overall.get('avg_confidence', 0):.4f}\n\n")
+
+        f.write("PHÂN PHỐI CẢM XÚC (tỉ lệ / độ tin cậy TB / thời gian duy trì TB / tối đa):\n")
+        f.write("-" * 30 + "\n")
+        for emotion, entry in overall.get('emotions', {}).items():
+            f.write(f"{emotion:15}: {entry['percentage']:6.2f}%  {entry['avg_confidence']:.3f}  "
+                    f"{entry['avg_dwell_seconds']:7.2f}s  {entry['max_dwell_seconds']:7.2f}s\n")
+
+        f.write("\nCHUYỂN ĐỔI CẢM XÚC (xác suất):\n")
+        f.write("-" * 30 + "\n")
+        for source, targets in overall.get('transition_probabilities', {}).items():
+            top = sorted(targets.items(), key=lambda item: -item[1])[:3]
+            f.write(f"{source:15} -> " + ", ".join(f"{target} {p:.0%}" for target, p in top) + "\n")
+
+        f.write("\nHISTOGRAM ĐỘ TIN CẬY:\n")
+        f.write("-" * 30 + "\n")
+        histogram = overall.get('confidence_histogram', {})
+        peak = max(histogram.values(), default=0) or 1
+        for bucket, count in histogram.items():
+            f.write(f"{bucket}: {'#' * int(30 * count / peak):30} {count}\n")
+
+        f.write("\nTỪNG PHIÊN:\n")
+        f.write("-" * 30 + "\n")
+        for key, session in report['sessions'].items():
+            emotions = session.get('emotions', {})
+            main_emotion = next(iter(emotions), 'N/A')
+            f.write(f"{key}: {session.get('records', 0)} bản ghi, {session.get('duration_minutes', 0):.2f} phút, "
+                    f"chủ yếu {main_emotion}\n")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline analytics over emotion session logs")
+    parser.add_argument("folder", nargs="?", default="output", help="Folder with session logs")
+    parser.add_argument("--report-dir", help="Report and cache folder (default: <folder>/analytics)")
+    parser.add_argument("--workers", type=int, default=0, help="Worker processes (0 = CPU count, 1 = no pool)")
+    parser.add_argument("--rebuild", action="store_true", help="Ignore the cache and analyse every session")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not os.path.isdir(args.folder):
+        print(f"Không tìm thấy thư mục: {args.folder}")
+        return 1
+    report_dir = args.report_dir or os.path.join(args.folder, "analytics")
+    report = run_analysis(args.folder, report_dir, args.workers, args.rebuild)
+    overall = report['overall']
+    print(f"Đã phân tích {overall.get('sessions', 0)} phiên, {overall.get('records', 0)} bản ghi "
+          f"trong {report['analysis_seconds']:.2f}s")
+    print(f"Báo cáo: {os.path.join(report_dir, 'report.txt')}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,614 @@
+"""
+Offline benchmark suite for emotion detectors and the full pipeline
+
+Runs without a camera or network: input comes from synthetic frames or from
+local sample videos. Results are written as JSON and optionally compared
+against a stored baseline to flag regressions.
+
+Usage:
+    python benchmark.py
+    python benchmark.py --videos samples/ --output bench_results.json
+    python benchmark.py --save-baseline
+    python benchmark.py --baseline benchmarks/baseline.json --tolerance 0.2
+"""
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import cv2
+import numpy as np
+
+from models.base_detector import EmotionDetector
+from utils.perf_monitor import percentile, get_peak_rss_mb
+from utils.synthetic_video import SyntheticFaceVideo, SCENARIOS
+
+DEFAULT_BASELINE = os.path.join("benchmarks", "baseline.json")
+BATCH_SIZES = (1, 4, 16)
+
+# (module, class, constructor args) for every EmotionDetector implementation
+DETECTORS = [
+    ("models.opencv_detector", "OpenCVDetector", ()),
+    ("models.fer_detector", "FERDetector", ()),
+    ("models.deepface_detector", "DeepFaceDetector", ("VGG-Face",)),
+    ("models.deepface_detector", "DeepFaceDetector", ("Facenet",)),
+    ("models.deepface_detector", "DeepFaceDetector", ("OpenFace",)),
+    ("models.mediapipe_detector", "MediaPipeTransformersDetector", ()),
+    ("models.mtcnn_detector", "MTCNNDetector", ()),
+    ("models.dlib_detector", "DlibDetector", ()),
+    ("models.simple_cnn_detector", "SimpleCNNDetector", ()),
+]
+
+# Metrics compared against the baseline: (path, higher_is_better)
+REGRESSION_METRICS = [
+    (("cold_start", "total_s"), False),
+    (("latency_ms", "p50"), False),
+    (("latency_ms", "p95"), False),
+    (("throughput_fps", "1"), True),
+    (("throughput_fps", "4"), True),
+    (("throughput_fps", "16"), True),
+    (("faces_per_s",), True),
+    (("peak_rss_mb",), False),
+]
+
+
+def make_synthetic_frames(count, scenario="single", seed=0, face_dir=None, width=640, height=480):
+    """Generate deterministic frames with the synthetic face-video generator"""
+    generator = SyntheticFaceVideo.from_scenario(
+        scenario, width=width, height=height, seed=seed, face_dir=face_dir
+    )
+    return list(generator.frames(count))
+
+
+def load_video_frames(video_dir, limit, width=640, height=480):
+    """Load frames from local sample videos"""
+    frames = []
+    paths = []
+    for ext in ('*.mp4', '*.avi', '*.mov', '*.mkv'):
+        paths.extend(sorted(glob.glob(os.path.join(video_dir, ext))))
+
+    for path in paths:
+        cap = cv2.VideoCapture(path)
+        while len(frames) < limit:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(cv2.resize(frame, (width, height)))
+        cap.release()
+        if len(frames) >= limit:
+            break
+    return frames
+
+
+def get_frames(args):
+    """Get benchmark input frames"""
+    if args.videos:
+        frames = load_video_frames(args.videos, args.frames)
+        if frames:
+            return frames, f"videos:{args.videos}"
+        print(f"Không tìm thấy video trong {args.videos}, dùng frame tổng hợp")
+    frames = make_synthetic_frames(args.frames, args.scenario, args.seed, args.face_dir)
+    return frames, f"synthetic:{args.scenario}"
+
+
+def latency_stats(samples_s):
+    """Summarise latency samples (seconds) in milliseconds"""
+    ordered = sorted(s * 1000.0 for s in samples_s)
+    if not ordered:
+        return {}
+    return {
+        'mean': sum(ordered) / len(ordered),
+        'p50': percentile(ordered, 50),
+        'p95': percentile(ordered, 95),
+        'p99': percentile(ordered, 99),
+        'max': ordered[-1],
+    }
+
+
+def benchmark_detector(spec, args):
+    """Benchmark a single detector; runs inside a fresh process by default"""
+    module_name, class_name, ctor_args = spec
+    frames, source = get_frames(args)
+
+    start = time.perf_counter()
+    try:
+        module = __import__(module_name, fromlist=[class_name])
+        detector = getattr(module, class_name)(*ctor_args)
+    except Exception as e:
+        return {'available': False, 'error': str(e)}
+    init_s = time.perf_counter() - start
+
+    if not detector.is_available():
+        return {'available': False, 'name': detector.get_model_name()}
+
+    start = time.perf_counter()
+    detector.detect_emotion(frames[0])
+    first_frame_s = time.perf_counter() - start
+
+    for frame in frames[:args.warmup]:
+        detector.detect_emotion(frame)
+
+    samples = []
+    face_count = 0
+    for frame in frames:
+        start = time.perf_counter()
+        _, _, faces = detector.detect_emotion(frame)
+        samples.append(time.perf_counter() - start)
+        face_count += len(faces)
+    total_s = sum(samples)
+
+    # Detectors without their own detect_emotion_batch run batches frame by frame
+    native_batch = type(detector).detect_emotion_batch is not EmotionDetector.detect_emotion_batch
+    throughput = {}
+    for batch_size in BATCH_SIZES:
+        batches = [frames[i:i + batch_size] for i in range(0, len(frames) - batch_size + 1, batch_size)]
+        start = time.perf_counter()
+        for batch in batches:
+            detector.detect_emotion_batch(batch)
+        elapsed = time.perf_counter() - start
+        processed = len(batches) * batch_size
+        throughput[str(batch_size)] = processed / elapsed if elapsed > 0 else 0.0
+
+    return {
+        'available': True,
+        'name': detector.get_model_name(),
+        'source': source,
+        'frames': len(frames),
+        'cold_start': {
+            'init_s': init_s,
+            'first_frame_s': first_frame_s,
+            'total_s': init_s + first_frame_s,
+        },
+        'latency_ms': latency_stats(samples),
+        'throughput_fps': throughput,
+        'batch_mode': "native" if native_batch else "sequential",
+        'faces_per_s': face_count / total_s if total_s > 0 else 0.0,
+        'peak_rss_mb': get_peak_rss_mb(),
+    }
+
+
+def benchmark_pipeline(args):
+    """Benchmark detect -> log -> annotate -> display conversion -> record"""
+    from gui.video_display import VideoDisplay
+    from models.model_manager import ModelManager
+    from utils.camera_handler import CameraHandler
+    from utils.video_recorder import VideoRecorder
+    from utils.logger import EmotionLogger
+    from utils.frame_pool import FramePool
+
+    frames, source = get_frames(args)
+    annotation_pool = FramePool(4, "annotation")
+
+    start = time.perf_counter()
+    model_manager = ModelManager()
+    model_name = args.pipeline_model
+    if model_name not in model_manager.get_available_models():
+        model_name = model_manager.get_available_models()[-1]
+    cold_start_s = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        logger = EmotionLogger()
+        logger.output_folder = temp_dir
+        logger.start_logging("benchmark")
+        recorder = VideoRecorder()
+        height, width = frames[0].shape[:2]
+        recorder.start_recording(os.path.join(temp_dir, "benchmark.avi"), 20.0, (width, height))
+
+        stages = {'inference': [], 'log': [], 'annotate': [], 'display': [], 'record': []}
+        totals = []
+        face_count = 0
+        for frame in frames:
+            frame_start = time.perf_counter()
+
+            t0 = time.perf_counter()
+            result = model_manager.detect(model_name, frame)
+            t1 = time.perf_counter()
+            logger.log_result(result, model_name)
+            t2 = time.perf_counter()
+            buffer = annotation_pool.copy_from(frame)
+            annotated = CameraHandler.draw_result(buffer.array, result)
+            t3 = time.perf_counter()
+            VideoDisplay.encode_ppm(annotated)
+            t4 = time.perf_counter()
+            recorder.write_frame(annotated)
+            buffer.release()
+            t5 = time.perf_counter()
+
+            stages['inference'].append(t1 - t0)
+            stages['log'].append(t2 - t1)
+            stages['annotate'].append(t3 - t2)
+            stages['display'].append(t4 - t3)
+            stages['record'].append(t5 - t4)
+            totals.append(time.perf_counter() - frame_start)
+            face_count += result.face_count
+
+        recorder.stop_recording()
+        logger.stop_logging()
+
+    total_s = sum(totals)
+    return {
+        'model': model_name,
+        'source': source,
+        'frames': len(frames),
+        'cold_start': {'total_s': cold_start_s},
+        'latency_ms': latency_stats(totals),
+        'stage_latency_ms': {stage: latency_stats(samples) for stage, samples in stages.items()},
+        'throughput_fps': {'1': len(frames) / total_s if total_s > 0 else 0.0},
+        'faces_per_s': face_count / total_s if total_s > 0 else 0.0,
+        'peak_rss_mb': get_peak_rss_mb(),
+    }
+
+
+def benchmark_display(args):
+    """Per-frame display cost: PIL + new ImageTk.PhotoImage vs reused PhotoImage from PPM
+
+    Uses a hidden Tk root when a display is available; otherwise only the
+    conversion part of each path is timed.
+    """
+    from PIL import Image
+    from gui.video_display import VideoDisplay
+
+    frames, _ = get_frames(args)
+    root = None
+    try:
+        import tkinter as tk
+        from PIL import ImageTk
+        root = tk.Tk()
+        root.withdraw()
+    except Exception as e:
+        print(f"  Tk không khả dụng, chỉ đo chuyển đổi ({e})")
+
+    def pil_path(frame):
+        image = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        if root is not None:
+            ImageTk.PhotoImage(image, master=root)
+        else:
+            image.tobytes()  # Same pixel copy ImageTk makes
+
+    photo = []
+    rgb_buffer = np.empty_like(frames[0])
+
+    def ppm_path(frame):
+        data = VideoDisplay.encode_ppm(frame, rgb_buffer)
+        if root is None:
+            return
+        if not photo:
+            photo.append(tk.PhotoImage(master=root, data=data, format="PPM"))
+        else:
+            photo[0].configure(data=data, format="PPM")
+
+    results = {'tk': root is not None}
+    for name, func in (('pil_imagetk', pil_path), ('ppm_photoimage', ppm_path)):
+        for frame in frames[:args.warmup]:
+            func(frame)
+        samples = []
+        for frame in frames:
+            start = time.perf_counter()
+            func(frame)
+            samples.append(time.perf_counter() - start)
+        results[name] = latency_stats(samples)
+
+    if root is not None:
+        root.destroy()
+    return results
+
+
+def draw_face_rectangles(frame, faces, emotion, confidence):
+    """Annotation as drawn before EmotionResult (one label for every face), for comparison"""
+    for (x1, y1, x2, y2) in faces:
+        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+        cv2.putText(frame, f"{emotion}: {confidence:.1%}", (x1, y1 - 10),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+    return frame
+
+
+def benchmark_allocations(args):
+    """Bytes allocated per frame by annotate + display conversion (tracemalloc)
+
+    Compares the old path (frame.copy() + PIL RGB image) with pooled
+    annotation buffers + PPM encoding. Only allocations visible to
+    tracemalloc (Python objects, NumPy/OpenCV arrays) are counted.
+    """
+    import tracemalloc
+    from PIL import Image
+    from gui.video_display import VideoDisplay
+    from utils.frame_pool import FramePool
+
+    frames, _ = get_frames(args)
+    faces = [(100, 100, 260, 260)]
+    pool = FramePool(4, "annotation")
+    rgb_buffer = np.empty_like(frames[0])
+
+    def copy_path(frame):
+        annotated = draw_face_rectangles(frame.copy(), faces, "happy", 0.9)
+        Image.fromarray(cv2.cvtColor(annotated, cv2.COLOR_BGR2RGB)).tobytes()
+
+    def pooled_path(frame):
+        buffer = pool.copy_from(frame)
+        draw_face_rectangles(buffer.array, faces, "happy", 0.9)
+        VideoDisplay.encode_ppm(buffer.array, rgb_buffer)
+        buffer.release()
+
+    results = {}
+    for name, func in (('copy', copy_path), ('pooled', pooled_path)):
+        for frame in frames[:args.warmup]:
+            func(frame)
+        samples = []
+        for frame in frames:
+            tracemalloc.start()
+            func(frame)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            samples.append(peak)
+        results[name] = {
+            'mean_bytes_per_frame': sum(samples) / len(samples),
+            'max_bytes_per_frame': max(samples),
+        }
+    results['pool'] = pool.get_stats()
+    return results
+
+
+def benchmark_capture_allocations(args):
+    """Bytes allocated per frame by capture read + inference downscale (tracemalloc)
+
+    Frames are written to a temporary MJPG file and read back through
+    VideoFileSource: plain read() with a fresh resize per frame versus
+    read_pooled() with the downscale going into a pooled dst buffer.
+    """
+    import shutil
+    import tracemalloc
+    from utils.frame_pool import FramePool
+    from utils.frame_sources import VideoFileSource
+    from utils.resolution import fit_size, resize_for_inference
+
+    frames, _ = get_frames(args)
+    height, width = frames[0].shape[:2]
+    inference_size = (width // 2, height // 2)
+    target = fit_size(width, height, *inference_size)
+    temp_dir = tempfile.mkdtemp(prefix="capture_bench_")
+    path = os.path.join(temp_dir, "frames.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 30, (width, height))
+    for frame in frames[:args.warmup] + frames:
+        writer.write(frame)
+    writer.release()
+
+    def plain_path(source, _pools):
+        ret, frame = source.read()
+        if ret:
+            resize_for_inference(frame, inference_size)
+        return ret
+
+    def pooled_path(source, pools):
+        capture_pool, resize_pool = pools
+        ret, buffer = source.read_pooled(capture_pool)
+        if ret:
+            small = resize_pool.acquire((target[1], target[0], 3))
+            resize_for_inference(buffer.array, inference_size, small.array)
+            small.release()
+            buffer.release()
+        return ret
+
+    results = {}
+    try:
+        for name, func in (('plain', plain_path), ('pooled', pooled_path)):
+            pools = (FramePool(8, "capture"), FramePool(8, "inference"))
+            source = VideoFileSource(path, realtime=False)
+            if not source.open():
+                raise RuntimeError(f"Không thể mở video: {path}")
+            try:
+                for _ in range(args.warmup):
+                    func(source, pools)
+                samples = []
+                for _ in range(len(frames)):
+                    tracemalloc.start()
+                    ret = func(source, pools)
+                    _, peak = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+                    if not ret:
+                        break
+                    samples.append(peak)
+            finally:
+                source.release()
+            results[name] = {
+                'mean_bytes_per_frame': sum(samples) / len(samples) if samples else 0.0,
+                'max_bytes_per_frame': max(samples) if samples else 0,
+            }
+            if name == 'pooled':
+                results['pool'] = pools[1].get_stats()
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return results
+
+
+def _run_isolated(func, *func_args):
+    """Run a benchmark function in a fresh process so cold start and RSS are per-detector"""
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(1) as pool:
+        return pool.apply(func, func_args)
+
+
+def run_benchmarks(args):
+    """Run all benchmarks and return the results dict"""
+    run = _run_isolated if args.isolate else (lambda func, *a: func(*a))
+    results = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'opencv': cv2.__version__,
+            'numpy': np.__version__,
+            'frames': args.frames,
+            'warmup': args.warmup,
+            'seed': args.seed,
+            'scenario': args.scenario,
+        },
+        'detectors': {},
+        'pipeline': {},
+        'display': {},
+        'allocations': {},
+    }
+
+    for spec in DETECTORS:
+        label = spec[1] + (f"({spec[2][0]})" if spec[2] else "")
+        print(f"\nBenchmark {label}...")
+        try:
+            result = run(benchmark_detector, spec, args)
+        except Exception as e:
+            result = {'available': False, 'error': str(e)}
+
+        if not result.get('available'):
+            print(f"  bỏ qua (không khả dụng) {result.get('error', '')}")
+            continue
+
+        results['detectors'][result['name']] = result
+        print(f"  p50 {result['latency_ms']['p50']:.2f} ms, "
+              f"{result['throughput_fps']['1']:.1f} FPS, "
+              f"{result['faces_per_s']:.1f} faces/s, "
+              f"peak RSS {result['peak_rss_mb']:.0f} MB")
+        batch_fps = ", ".join(f"{size}: {fps:.1f}" for size, fps in result['throughput_fps'].items())
+        print(f"  batch FPS ({result['batch_mode']}): {batch_fps}")
+
+    print("\nBenchmark end-to-end pipeline...")
+    try:
+        results['pipeline'] = run(benchmark_pipeline, args)
+        pipeline = results['pipeline']
+        print(f"  {pipeline['model']}: p50 {pipeline['latency_ms']['p50']:.2f} ms, "
+              f"{pipeline['throughput_fps']['1']:.1f} FPS")
+    except Exception as e:
+        print(f"  Pipeline error: {e}")
+
+    print("\nBenchmark display path...")
+    try:
+        results['display'] = run(benchmark_display, args)
+        display = results['display']
+        print(f"  PIL ImageTk p50 {display['pil_imagetk']['p50']:.2f} ms, "
+              f"PPM PhotoImage p50 {display['ppm_photoimage']['p50']:.2f} ms")
+    except Exception as e:
+        print(f"  Display error: {e}")
+
+    print("\nBenchmark allocations per frame...")
+    try:
+        results['allocations'] = run(benchmark_allocations, args)
+        allocations = results['allocations']
+        print(f"  frame.copy + PIL: {allocations['copy']['mean_bytes_per_frame'] / 1024:.0f} KB, "
+              f"pooled + PPM: {allocations['pooled']['mean_bytes_per_frame'] / 1024:.0f} KB")
+    except Exception as e:
+        print(f"  Allocation error: {e}")
+
+    print("\nBenchmark capture allocations per frame...")
+    try:
+        results['capture_allocations'] = run(benchmark_capture_allocations, args)
+        capture = results['capture_allocations']
+        print(f"  read + resize: {capture['plain']['mean_bytes_per_frame'] / 1024:.0f} KB, "
+              f"pooled read + resize: {capture['pooled']['mean_bytes_per_frame'] / 1024:.0f} KB")
+    except Exception as e:
+        print(f"  Capture allocation error: {e}")
+
+    return results
+
+
+def _get_metric(entry, path):
+    """Read a nested metric, None if missing"""
+    value = entry
+    for key in path:
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    """Return a list of regression descriptions"""
+    regressions = []
+    entries = [(f"detector:{name}", entry, baseline.get('detectors', {}).get(name))
+               for name, entry in results.get('detectors', {}).items()]
+    entries.append(("pipeline", results.get('pipeline', {}), baseline.get('pipeline')))
+
+    for label, current, previous in entries:
+        if not current or not previous:
+            continue
+        for path, higher_is_better in REGRESSION_METRICS:
+            new = _get_metric(current, path)
+            old = _get_metric(previous, path)
+            if new is None or old is None or old == 0:
+                continue
+
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            if worse > tolerance:
+                regressions.append(
+                    f"{label} {'.'.join(path)}: {old:.3f} -> {new:.3f} ({change:+.1%})"
+                )
+    return regressions
+
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Offline emotion recognition benchmarks")
+    parser.add_argument("--frames", type=int, default=120, help="Frames per measurement")
+    parser.add_argument("--warmup", type=int, default=10, help="Warm-up frames before timing")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for synthetic frames")
+    parser.add_argument("--scenario", default="single", choices=sorted(SCENARIOS),
+                        help="Synthetic input scenario")
+    parser.add_argument("--face-dir", help="Folder with local face images for synthetic frames")
+    parser.add_argument("--videos", help="Folder with local sample videos instead of synthetic frames")
+    parser.add_argument("--pipeline-model", default="OpenCV Basic", help="Model for the end-to-end pipeline")
+    parser.add_argument("--output", default="bench_results.json", help="Results JSON file")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Store results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed relative regression")
+    parser.add_argument("--no-isolate", dest="isolate", action="store_false",
+                        help="Run all detectors in this process")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Run benchmarks, write JSON and check for regressions"""
+    args = parse_args(argv)
+
+    print("=" * 60)
+    print("EMOTION RECOGNITION BENCHMARKS")
+    print("=" * 60)
+
+    results = run_benchmarks(args)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nKết quả: {args.output}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Đã lưu baseline: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"Chưa có baseline ({args.baseline}), chạy với --save-baseline để tạo")
+        return 0
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+
+    regressions = compare_with_baseline(results, baseline, args.tolerance)
+    print(f"\n{'='*60}")
+    if regressions:
+        print(f"REGRESSIONS (> {args.tolerance:.0%}):")
+        for line in regressions:
+            print(f"  - {line}")
+        return 1
+
+    print("Không có regression so với baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
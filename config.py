@@ -18,11 +18,68 @@ FRAME_WIDTH = 640
 FRAME_HEIGHT = 480
 FPS = 30
 FRAME_DELAY = 0.03  # 1/FPS for ~30 FPS
+DISPLAY_REFRESH_MS = 33  # Tk polls the latest frame at this interval
+
+# Inference resolution: frames are downscaled to fit (aspect kept) only for the
+# detector; boxes are mapped back to capture resolution. Display follows the
+# video widget size and recording uses FRAME_WIDTH x FRAME_HEIGHT.
+INFERENCE_WIDTH = 640
+INFERENCE_HEIGHT = 480
+
+# Annotated frames are drawn into pooled buffers shared by display and recorder
+ANNOTATION_POOL_SIZE = 8
+
+# Captured frames are read into recycled buffers (returned once every stage released them)
+CAPTURE_POOL_SIZE = 8
+
+# Multi-camera settings (enter several sources separated by ';', e.g. "0;1;rtsp://...")
+MULTI_STREAM_SEPARATOR = ";"
+MAX_STREAMS = 8
+INFERENCE_WORKERS = 2  # Shared inference threads for all streams
+INFERENCE_QUEUE_PER_STREAM = 2  # Oldest pending frame is dropped when full
+TILE_WIDTH = 320
+TILE_HEIGHT = 240
+MULTI_STREAM_REFRESH_MS = 40
+INFERENCE_BACKEND = "thread"  # "thread" or "process" (detectors run in worker processes)
+PROCESS_RING_SLOT_BYTES = 1920 * 1080 * 3  # Largest frame the shared-memory ring can hold
+PROCESS_RING_SLOTS_PER_WORKER = 2  # Frames in flight per worker process
+
+# Pipeline queues between stages (policy: "drop_oldest", "block" or "sample")
+PIPELINE_QUEUES = {
+    'inference': {'maxsize': 2, 'policy': "drop_oldest"},  # Live video never falls behind
+    'display': {'maxsize': 1, 'policy': "drop_oldest"},
+    'log': {'maxsize': 120, 'policy': "block"},
+    'record': {'maxsize': 30, 'policy': "block"},  # Recorded video keeps every frame
+    'history': {'maxsize': 16, 'policy': "block"},  # Label transitions only (GUI history)
+}
 
 # Recording settings
 DEFAULT_CODEC = 'XVID'
 DEFAULT_FPS = 20.0
 
+# Emotion log writer (background thread, rows are dropped and counted if the queue fills)
+LOG_QUEUE_SIZE = 1000
+LOG_BATCH_SIZE = 50
+LOG_FLUSH_INTERVAL = 1.0  # seconds
+LOG_CHECKPOINT_INTERVAL = 60.0  # seconds between summary checkpoints in the session log
+LOG_COLUMNAR_FORMAT = None  # "parquet" or "arrow" (needs pyarrow) for a typed copy of the records
+LOG_ROW_GROUP_SECONDS = 10.0
+LOG_SQLITE_DB = None  # e.g. "output/sessions.db" to also store sessions in SQLite (python -m utils.session_store)
+LOG_FACE_RECORDS = False  # Per-face binary records (box, track ID, scores, latencies) in <session>.faces.bin
+LOG_MODE = "frames"  # "frames": one row per label transition, "events": one row per emotion / face-count interval
+LOG_KEYFRAME_INTERVAL = 10.0  # seconds; events mode writes a row at least this often
+
+# Face tracking (stable per-face IDs across frames)
+TRACK_IOU_THRESHOLD = 0.3
+TRACK_MAX_MISSED = 10  # frames a face may go undetected before its ID is retired
+
+# Temporal smoothing of emotion labels per tracked face
+SMOOTHING_ENABLED = True
+SMOOTHING_ALPHA = 0.4  # EMA weight of the newest score vector
+SMOOTHING_HYSTERESIS = 0.1  # score margin a new emotion needs over the current one
+SMOOTHING_MIN_DWELL = 0.5  # seconds a label change must persist before it is emitted
+SMOOTHING_TRACK_TIMEOUT = 2.0  # seconds before an unseen face's smoothing state is dropped
+
 # Video recording settings
 FRAME_WIDTH = 640
 FRAME_HEIGHT = 480
@@ -50,6 +107,22 @@ MAIN_FRAME_PADDING = "10"
 EMOTION_HISTORY_HEIGHT = 15
 EMOTION_HISTORY_WIDTH = 30
 MAX_HISTORY_ENTRIES = 100
+HISTORY_REFRESH_MS = 250  # New history lines are written to the panel in one batch at most this often
+TIMELINE_WINDOW_SECONDS = 120.0  # Emotion timeline chart shows the last 2 minutes
+TIMELINE_BIN_SECONDS = 0.5  # Scores are averaged per bin (one chart point per bin)
+TIMELINE_REFRESH_MS = 250  # Chart redraws at most 4 times per second
+TIMELINE_WIDTH = 480
+TIMELINE_HEIGHT = 120
+
+# Performance monitoring settings
+SHOW_PERFORMANCE_HUD = False  # Draw stats overlay on the video stream
+PERFORMANCE_REFRESH_MS = 1000  # Refresh rate of HUD / control panel stats
+PERFORMANCE_WINDOW_SIZE = 300  # Latency samples kept per stage
+
+# Profiling trace settings (Chrome trace-event JSON, also enabled with --trace)
+PROFILE_TRACE_ENABLED = False
+PROFILE_TRACE_FILE = "output/pipeline_trace.json"
+PROFILE_TRACE_MAX_EVENTS = 500000
 
 # Font settings
 DEFAULT_FONT = ("Arial", 12)
@@ -131,7 +131,34 @@ class ControlPanel:
         ttk.Label(status_frame, text="Trạng thái:", font=("Arial", 9, "bold")).pack(side=tk.LEFT)
         status_label = ttk.Label(status_frame, textvariable=self.status_var, font=("Arial", 9))
         status_label.pack(side=tk.LEFT, padx=(5, 0))
-    
+
+        self.setup_performance_section()
+
+    def setup_performance_section(self):
+        """Setup performance statistics display"""
+        perf_frame = ttk.LabelFrame(self.control_frame, text="Hiệu năng", padding="5")
+        perf_frame.grid(row=3, column=0, columnspan=5, pady=(10, 0), sticky=(tk.W, tk.E))
+
+        show_hud = config.SHOW_PERFORMANCE_HUD if config and hasattr(config, 'SHOW_PERFORMANCE_HUD') else False
+        self.hud_var = tk.BooleanVar(value=show_hud)
+        ttk.Checkbutton(
+            perf_frame,
+            text="Hiển thị HUD trên video",
+            variable=self.hud_var
+        ).pack(anchor=tk.W)
+
+        self.perf_var = tk.StringVar(value="Chưa có dữ liệu")
+        ttk.Label(
+            perf_frame,
+            textvariable=self.perf_var,
+            font=("Consolas", 8),
+            justify=tk.LEFT
+        ).pack(anchor=tk.W, pady=(5, 0))
+
+    def update_performance_stats(self, lines):
+        """Update performance statistics text"""
+        self.perf_var.set("\n".join(lines) if lines else "Chưa có dữ liệu")
+
     def update_model_list(self, models):
         """Update available models in dropdown"""
         self.model_combo['values'] = models
@@ -391,7 +418,8 @@ Sau khi cài xong, khởi động lại ứng dụng để load models mới."""
             "• /dev/video0 (Linux)\n"
             "• rtsp://192.168.1.100:554/stream\n"
             "• http://192.168.1.100:8080/video\n"
-            "• C:/path/to/video.mp4"
+            "• C:/path/to/video.mp4\n"
+            "• 0;1;rtsp://... (nhiều camera cùng lúc)"
         )
         
         if path:
@@ -3,15 +3,30 @@ Emotion information panel
 """
 import tkinter as tk
 from tkinter import ttk
+from collections import deque
 from datetime import datetime
+from itertools import islice
 
 class EmotionPanel:
-    """Panel displaying emotion information and history"""
+    """Panel displaying emotion information and history
+
+    History lines live in a fixed-size deque. New lines are written to the
+    Text widget in one batch at most every ``history_refresh_ms``; the
+    widget is trimmed by line count, never read back.
+    """
     
-    def __init__(self, parent_frame, emotion_var, confidence_var):
+    def __init__(self, parent_frame, emotion_var, confidence_var, max_entries=100,
+                 history_refresh_ms=250):
         self.parent_frame = parent_frame
         self.emotion_var = emotion_var
         self.confidence_var = confidence_var
+        self.max_entries = max_entries
+        self.history_refresh_ms = history_refresh_ms
+        self.history = deque(maxlen=max_entries)
+        self._pending = 0  # Newest history lines not yet in the widget
+        self._shown = 0  # History lines in the widget
+        self._placeholder = True  # Widget shows a placeholder message
+        self._flush_job = None
         
         self.setup_emotion_panel()
     
@@ -120,7 +135,11 @@ class EmotionPanel:
     
     def update_emotion_info(self, emotion, confidence):
         """Update emotion information and add to history"""
-        # Update current emotion display
+        self.set_current_emotion(emotion, confidence)
+        self.add_history_entry(emotion, confidence)
+    
+    def set_current_emotion(self, emotion, confidence):
+        """Update the current emotion and confidence display"""
         self.emotion_var.set(emotion.title())
         self.confidence_var.set(f"{confidence:.1%}")
         
@@ -131,30 +150,50 @@ class EmotionPanel:
             self.confidence_label.configure(foreground="orange")
         else:
             self.confidence_label.configure(foreground="red")
-        
-        # Add to history
+    
+    def add_history_entry(self, emotion, confidence):
+        """Append one line to the emotion history (written to the widget in batches)"""
         timestamp = datetime.now().strftime("%H:%M:%S")
-        history_entry = f"[{timestamp}] {emotion.title()} ({confidence:.1%})\n"
-        
-        self.history_text.config(state=tk.NORMAL)
-        
-        # Clear initial message if still there
-        content = self.history_text.get("1.0", tk.END).strip()
-        if content == "Chưa có dữ liệu cảm xúc...":
-            self.history_text.delete("1.0", tk.END)
-        
-        self.history_text.insert(tk.END, history_entry)
-        self.history_text.see(tk.END)
-        
-        # Keep only last 100 entries
-        lines = self.history_text.get("1.0", tk.END).split('\n')
-        if len(lines) > 100:
-            self.history_text.delete("1.0", "2.0")
-        
-        self.history_text.config(state=tk.DISABLED)
+        self.history.append(f"[{timestamp}] {emotion.title()} ({confidence:.1%})\n")
+        self._pending = min(self._pending + 1, self.max_entries)
+        if self._flush_job is None:
+            self._flush_job = self.history_text.after(self.history_refresh_ms, self.flush_history)
+    
+    def flush_history(self):
+        """Insert pending lines at the end and drop the oldest beyond max_entries"""
+        self._flush_job = None
+        if not self._pending:
+            return
+        lines = "".join(islice(self.history, len(self.history) - self._pending, None))
+        try:
+            self.history_text.config(state=tk.NORMAL)
+            if self._placeholder:
+                self.history_text.delete("1.0", tk.END)
+                self._placeholder = False
+                self._shown = 0
+            
+            self.history_text.insert(tk.END, lines)
+            self._shown += self._pending
+            excess = self._shown - self.max_entries
+            if excess > 0:
+                self.history_text.delete("1.0", f"{excess + 1}.0")
+                self._shown = self.max_entries
+            
+            self.history_text.see(tk.END)
+            self.history_text.config(state=tk.DISABLED)
+        except tk.TclError:
+            pass  # Panel destroyed before the scheduled flush
+        self._pending = 0
     
     def clear_history(self):
         """Clear emotion history"""
+        if self._flush_job is not None:
+            self.history_text.after_cancel(self._flush_job)
+            self._flush_job = None
+        self.history.clear()
+        self._pending = 0
+        self._shown = 0
+        self._placeholder = True
         self.history_text.config(state=tk.NORMAL)
         self.history_text.delete("1.0", tk.END)
         self.history_text.insert(tk.END, "Lịch sử đã được xóa...\n")
@@ -0,0 +1,155 @@
+"""
+Live emotion timeline chart
+"""
+import time
+import tkinter as tk
+from collections import deque
+from tkinter import ttk
+
+import numpy as np
+
+from models.emotion_result import EMOTION_LABELS
+
+EMOTION_COLORS = {
+    'angry': "red",
+    'disgust': "olive drab",
+    'fear': "purple",
+    'happy': "gold",
+    'sad': "royal blue",
+    'surprise': "dark orange",
+    'neutral': "gray50",
+}
+
+
+class TimelineChart:
+    """Per-emotion score lines over the window of a ScoreTimeline
+
+    Every ``refresh_ms`` the chart takes only the bins closed since the
+    last refresh, shifts the existing lines left with one Canvas.move,
+    draws one segment per emotion per new bin and deletes segments that
+    scrolled out of the window.
+    """
+
+    PAD = 4
+
+    def __init__(self, parent_frame, timeline, refresh_ms=250, width=480, height=120, perf_monitor=None):
+        self.parent_frame = parent_frame
+        self.timeline = timeline
+        self.refresh_ms = refresh_ms
+        self.width = width
+        self.height = height
+        self.perf_monitor = perf_monitor
+        self.step = width / timeline.capacity
+        self._sequence = 0
+        self._last_points = None  # y of the newest bin per emotion (NaN: gap)
+        self._segments = deque()  # Canvas item IDs of each drawn bin, oldest first
+        self._job = None
+        self.setup_timeline_chart()
+
+    def setup_timeline_chart(self):
+        """Setup chart frame, canvas and legend"""
+        self.chart_frame = ttk.LabelFrame(
+            self.parent_frame,
+            text="Biểu đồ cảm xúc",
+            padding="5"
+        )
+        self.chart_frame.grid(
+            row=2, column=0, columnspan=2,
+            sticky=(tk.W, tk.E),
+            padx=(5, 5), pady=(0, 5)
+        )
+
+        self.canvas = tk.Canvas(
+            self.chart_frame,
+            width=self.width,
+            height=self.height,
+            bg="white",
+            highlightthickness=0
+        )
+        self.canvas.pack(fill=tk.X)
+        for level in (0.5, 1.0):
+            y = self._to_y(level)
+            self.canvas.create_line(0, y, self.width, y, fill="gray85", dash=(2, 4))
+
+        legend_frame = ttk.Frame(self.chart_frame)
+        legend_frame.pack(fill=tk.X, pady=(3, 0))
+        for label in EMOTION_LABELS:
+            tk.Label(
+                legend_frame,
+                text=label.title(),
+                font=("Arial", 8),
+                fg=EMOTION_COLORS[label]
+            ).pack(side=tk.LEFT, padx=(0, 6))
+
+    def _to_y(self, values):
+        return self.height - self.PAD - np.asarray(values) * (self.height - 2 * self.PAD)
+
+    def start(self):
+        """Start periodic refreshes"""
+        if self._job is None:
+            self._job = self.canvas.after(self.refresh_ms, self.refresh)
+
+    def stop(self):
+        """Stop periodic refreshes (the drawn lines stay)"""
+        if self._job is not None:
+            self.canvas.after_cancel(self._job)
+            self._job = None
+
+    def clear(self):
+        """Remove all lines; the next refresh redraws the timeline's whole window"""
+        self._delete_lines()
+        self._sequence = 0
+
+    def _delete_lines(self):
+        self.canvas.delete("data")
+        self._segments.clear()
+        self._last_points = None
+
+    def refresh(self):
+        """Draw the bins closed since the last refresh"""
+        self._job = None
+        start = time.perf_counter()
+        try:
+            sequence, rows = self.timeline.since(self._sequence)
+            if sequence < self._sequence:
+                self.clear()  # Timeline was reset
+                sequence, rows = self.timeline.since(0)
+            self._sequence = sequence
+            if len(rows):
+                self._draw(rows)
+        except tk.TclError:
+            return  # Chart destroyed
+        except Exception as e:
+            print(f"Timeline chart error: {e}")
+        if self.perf_monitor is not None:
+            self.perf_monitor.record_latency('timeline', time.perf_counter() - start)
+        self._job = self.canvas.after(self.refresh_ms, self.refresh)
+
+    def _draw(self, rows):
+        """Shift existing segments left and add one segment per emotion for each new bin"""
+        count = len(rows)
+        if count >= self.timeline.capacity:
+            self._delete_lines()
+        elif self._segments:
+            self.canvas.move("data", -count * self.step, 0)
+
+        points = self._to_y(rows).tolist()
+        previous = self._last_points
+        x = self.width - (count - 1) * self.step
+        for row in points:
+            items = []
+            if previous is not None:
+                for index, label in enumerate(EMOTION_LABELS):
+                    y0, y1 = previous[index], row[index]
+                    if y0 == y0 and y1 == y1:  # Neither bin is a NaN gap
+                        items.append(self.canvas.create_line(
+                            x - self.step, y0, x, y1, fill=EMOTION_COLORS[label], width=2, tags="data"))
+            self._segments.append(items)
+            previous = row
+            x += self.step
+        self._last_points = previous
+
+        while len(self._segments) > self.timeline.capacity:
+            items = self._segments.popleft()
+            if items:
+                self.canvas.delete(*items)
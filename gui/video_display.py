@@ -1,14 +1,23 @@
 """
 Video display component
 """
+import math
 import tkinter as tk
 from tkinter import ttk
+import cv2
+import numpy as np
+from utils.resolution import resize_to_fit
 
 class VideoDisplay:
     """Video stream display component"""
     
+    DISPLAY_MARGIN = 64  # LabelFrame padding/border plus the label's padx/pady
+    
     def __init__(self, parent_frame):
         self.parent_frame = parent_frame
+        self.photo = None  # Reused PhotoImage, updated in place every frame
+        self.scaled_buffer = None  # Reused output of the display resize
+        self.rgb_buffer = None  # Reused BGR->RGB conversion buffer
         self.setup_video_display()
     
     def setup_video_display(self):
@@ -44,3 +53,79 @@ class VideoDisplay:
         """Update video frame"""
         self.video_label.configure(image=img_tk)
         self.video_label.image = img_tk
+    
+    def show_frame(self, frame):
+        """Show an OpenCV frame by rewriting one PhotoImage from PPM/PGM bytes
+        
+        Avoids PIL and a new PhotoImage per frame. The BGR->RGB swap goes into a
+        reused buffer and the only per-frame allocation is the bytes object Tk
+        needs; grayscale frames are passed through as PGM without conversion.
+        """
+        scaled = resize_to_fit(frame, self.get_display_size(), allow_upscale=True, dst=self.scaled_buffer)
+        if scaled is not frame:
+            self.scaled_buffer = scaled
+        frame = scaled
+        if frame.ndim == 3 and (self.rgb_buffer is None or self.rgb_buffer.shape != frame.shape):
+            self.rgb_buffer = np.empty_like(frame)
+        data = self.encode_ppm(frame, self.rgb_buffer)
+        if data is None:
+            return False
+        
+        if self.photo is None:
+            self.photo = tk.PhotoImage(master=self.video_label, data=data, format="PPM")
+            self.video_label.configure(image=self.photo)
+            self.video_label.image = self.photo
+        else:
+            self.photo.configure(data=data, format="PPM")
+        return True
+    
+    def get_display_size(self):
+        """Space available for the image inside the video frame (None before layout)"""
+        width = self.video_frame.winfo_width() - self.DISPLAY_MARGIN
+        height = self.video_frame.winfo_height() - self.DISPLAY_MARGIN
+        if width < 32 or height < 32:
+            return None
+        return width, height
+    
+    @staticmethod
+    def encode_ppm(frame, rgb_buffer=None):
+        """Binary PPM (grayscale: PGM) bytes of a BGR frame
+        
+        ``rgb_buffer`` (same shape as frame) is reused for the colour swap.
+        """
+        try:
+            height, width = frame.shape[:2]
+            if frame.ndim == 2:
+                header = f"P5\n{width} {height}\n255\n".encode('ascii')
+                pixels = np.ascontiguousarray(frame)
+            else:
+                header = f"P6\n{width} {height}\n255\n".encode('ascii')
+                pixels = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb_buffer)
+            return b''.join((header, memoryview(pixels)))
+        except Exception as e:
+            print(f"Error encoding frame for display: {e}")
+            return None
+    
+    @staticmethod
+    def compose_tiles(frames, labels=None, tile_size=(320, 240)):
+        """Compose several stream frames into one grid image"""
+        count = max(1, len(frames))
+        columns = math.ceil(math.sqrt(count))
+        rows = math.ceil(count / columns)
+        tile_w, tile_h = tile_size
+        mosaic = np.zeros((rows * tile_h, columns * tile_w, 3), dtype=np.uint8)
+        
+        for i, frame in enumerate(frames):
+            row, col = divmod(i, columns)
+            tile = mosaic[row * tile_h:(row + 1) * tile_h, col * tile_w:(col + 1) * tile_w]
+            if frame is not None:
+                cv2.resize(frame, (tile_w, tile_h), dst=tile, interpolation=cv2.INTER_AREA)
+            else:
+                cv2.putText(tile, "Dang ket noi...", (10, tile_h // 2),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (200, 200, 200), 1)
+            if labels and i < len(labels):
+                cv2.putText(tile, labels[i], (8, tile_h - 10),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 1)
+            cv2.rectangle(tile, (0, 0), (tile_w - 1, tile_h - 1), (80, 80, 80), 1)
+        
+        return mosaic
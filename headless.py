@@ -0,0 +1,199 @@
+"""
+Headless emotion recognition runner (no GUI)
+
+Runs the same asyncio pipeline as the GUI - source, inference, sinks - and
+writes the annotated video and/or the emotion log.
+
+Usage:
+    python headless.py --source 0 --model "OpenCV Basic" --log
+    python headless.py --source video.mp4 --record output/annotated.mp4 --no-realtime
+    python headless.py --source "synthetic://multi_face?frames=300" --duration 10 --trace
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from models.model_manager import ModelManager
+from utils.emotion_smoother import EmotionSmoother
+from utils.face_tracker import IoUTracker
+from utils.frame_sources import create_frame_source
+from utils.logger import EmotionLogger
+from utils.perf_monitor import PerformanceMonitor
+from utils.pipeline import Pipeline
+from utils.trace_recorder import get_tracer
+from utils.video_recorder import VideoRecorder
+import config
+
+
+class HeadlessRunner:
+    """Pipeline with log / record / console sinks and no Tk
+
+    There is no annotate stage: the recorder draws each packet's result into
+    its own (recording-size) buffer.
+    """
+
+    def __init__(self, args):
+        self.args = args
+        self.model_manager = ModelManager()
+        self.video_recorder = VideoRecorder()
+        self.emotion_logger = EmotionLogger(
+            config.LOG_QUEUE_SIZE, config.LOG_BATCH_SIZE, config.LOG_FLUSH_INTERVAL, config.LOG_CHECKPOINT_INTERVAL,
+            args.columnar or config.LOG_COLUMNAR_FORMAT, config.LOG_ROW_GROUP_SECONDS,
+            args.db or config.LOG_SQLITE_DB, args.faces or config.LOG_FACE_RECORDS, args.log_mode,
+            config.LOG_KEYFRAME_INTERVAL
+        )
+        self.perf_monitor = PerformanceMonitor(
+            window_size=config.PERFORMANCE_WINDOW_SIZE,
+            refresh_interval=config.PERFORMANCE_REFRESH_MS / 1000.0
+        )
+        self.source = None
+        self.pipeline = None
+        self.last_report = 0.0
+
+    def run_inference(self, frame):
+        """Detect emotion on one frame"""
+        with self.perf_monitor.measure('inference'):
+            result = self.model_manager.detect(self.args.model, frame)
+        self.perf_monitor.tick('inference')
+        return result
+
+    def log_sink(self, packet):
+        self.emotion_logger.log_result(packet.result, self.args.model, packet.transition)
+        self.emotion_logger.log_faces(packet.index, packet.capture_time, packet.result,
+                                      packet.track_ids, packet.timings)
+
+    def record_sink(self, packet):
+        with self.perf_monitor.measure('record'):
+            self.video_recorder.write_frame(packet.frame, packet.result)
+
+    def console_sink(self, packet):
+        """Print performance stats once per refresh interval"""
+        now = time.time()
+        if now - self.last_report >= config.PERFORMANCE_REFRESH_MS / 1000.0:
+            self.last_report = now
+            print(f"[{packet.index}] {packet.emotion} {packet.confidence:.1%} | "
+                  + " | ".join(self.perf_monitor.get_overlay_lines()[:2]))
+
+    def run(self) -> int:
+        args = self.args
+        if args.model not in self.model_manager.get_available_models():
+            print(f"Model không tồn tại: {args.model}")
+            print(f"Models khả dụng: {self.model_manager.get_available_models()}")
+            return 1
+
+        try:
+            self.source = create_frame_source(args.source, realtime=args.realtime)
+        except ValueError as e:
+            print(f"Nguồn không hợp lệ: {e}")
+            return 1
+        if not self.source.open():
+            print(f"Không thể mở nguồn: {args.source}")
+            return 1
+
+        queues = config.PIPELINE_QUEUES
+        inference_queue = queues['inference'] if args.realtime else {'maxsize': 2, 'policy': "block"}
+        self.pipeline = Pipeline(
+            self.source,
+            self.run_inference,
+            inference_size=(config.INFERENCE_WIDTH, config.INFERENCE_HEIGHT),
+            max_fps=config.FPS if args.realtime else 0.0,
+            inference_workers=args.workers,
+            inference_queue=inference_queue,
+            perf_monitor=self.perf_monitor,
+            max_frames=args.frames,
+            capture_pool_size=config.CAPTURE_POOL_SIZE,
+            tracker=IoUTracker(config.TRACK_IOU_THRESHOLD, config.TRACK_MAX_MISSED),
+            smoother=EmotionSmoother(
+                config.SMOOTHING_ALPHA, config.SMOOTHING_HYSTERESIS, config.SMOOTHING_MIN_DWELL,
+                config.SMOOTHING_TRACK_TIMEOUT
+            ) if args.smoothing else None
+        )
+        self.pipeline.add_sink("console", self.console_sink, maxsize=1, policy="drop_oldest", blocking=False)
+
+        if args.log:
+            self.emotion_logger.start_logging(args.session)
+            self.pipeline.add_sink("log", self.log_sink, **queues['log'])
+        if args.record:
+            if not self.video_recorder.start_recording(args.record, config.DEFAULT_FPS,
+                                                       (config.FRAME_WIDTH, config.FRAME_HEIGHT)):
+                print(f"Không thể ghi video: {args.record}")
+                self.source.release()
+                return 1
+            self.pipeline.add_sink("record", self.record_sink, **queues['record'])
+
+        if args.duration > 0:
+            timer = threading.Timer(args.duration, self.pipeline.stop, kwargs={'drain': True})
+            timer.daemon = True
+            timer.start()
+
+        start = time.perf_counter()
+        try:
+            self.pipeline.run()
+        except KeyboardInterrupt:
+            print("Đã dừng bởi người dùng")
+        finally:
+            elapsed = time.perf_counter() - start
+            self.source.release()
+            if self.video_recorder.is_recording_active():
+                self.video_recorder.stop_recording()
+            if self.emotion_logger.is_active():
+                self.emotion_logger.stop_logging()
+
+        stats = self.pipeline.get_stats()
+        print(f"\nĐã xử lý {stats['frames_processed']}/{stats['frames_read']} frames "
+              f"trong {elapsed:.1f}s ({stats['frames_processed'] / elapsed if elapsed > 0 else 0.0:.1f} FPS)")
+        for name, queue_stats in stats['queues'].items():
+            print(f"  {name}: {queue_stats['policy']}, dropped {queue_stats['dropped']}, "
+                  f"skipped {queue_stats['skipped']}")
+        if 'smoothing' in stats:
+            print(f"  smoothing: {stats['smoothing']['transitions']} transitions / "
+                  f"{stats['smoothing']['frames']} frames")
+        return 0
+
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Headless emotion recognition runner")
+    parser.add_argument("--source", default=str(config.CAMERA_INDEX),
+                        help="Camera index, video file, image pattern, URL or synthetic://")
+    parser.add_argument("--model", default="OpenCV Basic", help="Emotion detection model")
+    parser.add_argument("--record", metavar="FILE", help="Write annotated video to FILE")
+    parser.add_argument("--log", action="store_true", help="Write emotion log to output/")
+    parser.add_argument("--session", help="Log session name")
+    parser.add_argument("--columnar", choices=["parquet", "arrow"],
+                        help="Also write the log as a typed columnar file (needs pyarrow)")
+    parser.add_argument("--faces", action="store_true",
+                        help="Also write per-face binary records (<session>.faces.bin)")
+    parser.add_argument("--log-mode", choices=["events", "frames"], default=config.LOG_MODE,
+                        help="One log row per emotion interval (events) or per label transition (frames)")
+    parser.add_argument("--db", metavar="FILE", help="Also store the session in this SQLite database")
+    parser.add_argument("--no-smoothing", dest="smoothing", action="store_false",
+                        default=config.SMOOTHING_ENABLED, help="Log raw per-frame labels (no temporal smoothing)")
+    parser.add_argument("--frames", type=int, default=0, help="Stop after N frames (0 = until end)")
+    parser.add_argument("--duration", type=float, default=0, help="Stop after N seconds (0 = until end)")
+    parser.add_argument("--workers", type=int, default=1, help="Inference worker threads")
+    parser.add_argument("--no-realtime", dest="realtime", action="store_false",
+                        help="Process files as fast as possible without dropping frames")
+    parser.add_argument("--trace", nargs="?", const=config.PROFILE_TRACE_FILE, default=None, metavar="FILE",
+                        help="Write Chrome trace-event JSON of pipeline spans")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    tracer = get_tracer()
+    if args.trace:
+        tracer.start(args.trace, config.PROFILE_TRACE_MAX_EVENTS)
+    try:
+        return HeadlessRunner(args).run()
+    finally:
+        tracer.stop()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,25 +7,43 @@ from tkinter import messagebox, filedialog
 import sys
 import os
 import time
+import argparse
+from collections import deque
 
 # Add current directory to path for imports
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 # Import application modules
+from models.emotion_result import STATUS_ERROR, EmotionResult
 from models.model_manager import ModelManager
 from gui.main_window import MainWindow
 from gui.control_panel import ControlPanel
 from gui.video_display import VideoDisplay
 from gui.emotion_panel import EmotionPanel
+from gui.timeline_chart import TimelineChart
 from utils.camera_handler import CameraHandler
+from utils.emotion_smoother import EmotionSmoother
+from utils.face_tracker import IoUTracker
+from utils.score_timeline import ScoreTimeline
 from utils.video_recorder import VideoRecorder
 from utils.logger import EmotionLogger
+from utils.perf_monitor import PerformanceMonitor
+from utils.trace_recorder import get_tracer
+from utils.stream_manager import StreamManager
+from utils.pipeline import Pipeline
+from utils.frame_mailbox import FrameMailbox
+from utils.frame_pool import FramePool
 import config
 
 class EmotionRecognitionApp:
     """Main application class"""
     
-    def __init__(self):
+    def __init__(self, trace_file=None):
+        # Start profiling trace if requested from CLI or config
+        self.tracer = get_tracer()
+        if trace_file or config.PROFILE_TRACE_ENABLED:
+            self.tracer.start(trace_file or config.PROFILE_TRACE_FILE, config.PROFILE_TRACE_MAX_EVENTS)
+        
         # Initialize Tkinter root
         self.root = tk.Tk()
         
@@ -33,7 +51,20 @@ class EmotionRecognitionApp:
         self.model_manager = ModelManager()
         self.camera_handler = CameraHandler()
         self.video_recorder = VideoRecorder()
-        self.emotion_logger = EmotionLogger()
+        self.emotion_logger = EmotionLogger(
+            config.LOG_QUEUE_SIZE, config.LOG_BATCH_SIZE, config.LOG_FLUSH_INTERVAL, config.LOG_CHECKPOINT_INTERVAL,
+            config.LOG_COLUMNAR_FORMAT, config.LOG_ROW_GROUP_SECONDS, config.LOG_SQLITE_DB,
+            config.LOG_FACE_RECORDS, config.LOG_MODE, config.LOG_KEYFRAME_INTERVAL
+        )
+        self.perf_monitor = PerformanceMonitor(
+            window_size=config.PERFORMANCE_WINDOW_SIZE,
+            refresh_interval=config.PERFORMANCE_REFRESH_MS / 1000.0
+        )
+        self.camera_handler.set_performance_monitor(self.perf_monitor)
+        self.camera_handler.max_fps = config.FPS
+        self.annotation_pool = FramePool(config.ANNOTATION_POOL_SIZE, "annotation")
+        self.show_performance_hud = config.SHOW_PERFORMANCE_HUD
+        self.score_timeline = ScoreTimeline(config.TIMELINE_WINDOW_SECONDS, config.TIMELINE_BIN_SECONDS)
         
         # Initialize GUI
         self.setup_gui()
@@ -43,6 +74,12 @@ class EmotionRecognitionApp:
         
         # Application state
         self.is_streaming = False
+        self.stream_manager = None
+        self.multi_stream_result = FrameMailbox()
+        self.display_mailbox = FrameMailbox(on_discard=self.release_display_frame)
+        self.history_events = deque(maxlen=100)  # Label transitions waiting for the Tk loop
+        self.pipeline = None
+        self.selected_model = ""
         
     def setup_gui(self):
         """Setup the graphical user interface"""
@@ -72,8 +109,21 @@ class EmotionRecognitionApp:
         self.emotion_panel = EmotionPanel(
             left_frame,
             self.main_window.emotion_var,
-            self.main_window.confidence_var
+            self.main_window.confidence_var,
+            config.MAX_HISTORY_ENTRIES,
+            config.HISTORY_REFRESH_MS
+        )
+        
+        # Emotion timeline chart - below video and emotion panel in left frame
+        self.timeline_chart = TimelineChart(
+            left_frame,
+            self.score_timeline,
+            config.TIMELINE_REFRESH_MS,
+            config.TIMELINE_WIDTH,
+            config.TIMELINE_HEIGHT,
+            self.perf_monitor
         )
+        self.timeline_chart.start()
         
         # Control panel - place in right frame
         self.control_panel = ControlPanel(
@@ -93,6 +143,31 @@ class EmotionRecognitionApp:
         
         # Pass model manager to control panel for status window
         self.control_panel.set_model_manager(self.model_manager)
+        
+        # Performance HUD toggle and periodic stats refresh
+        self.control_panel.hud_var.trace_add('write', self.on_hud_toggled)
+        self.main_window.model_var.trace_add('write', self.on_model_changed)
+        self.root.after(config.PERFORMANCE_REFRESH_MS, self.update_performance_stats)
+    
+    def on_hud_toggled(self, *args):
+        """Cache HUD toggle so the capture thread never touches Tk variables"""
+        self.show_performance_hud = self.control_panel.hud_var.get()
+    
+    def on_model_changed(self, *args):
+        """Cache the selected model for the pipeline inference thread"""
+        self.selected_model = self.main_window.model_var.get()
+    
+    def update_performance_stats(self):
+        """Refresh performance statistics in the control panel"""
+        try:
+            if self.is_streaming:
+                with self.tracer.span("tk.update_performance_stats", "tk"):
+                    self.perf_monitor.get_snapshot()
+                    self.control_panel.update_performance_stats(self.perf_monitor.get_overlay_lines())
+        except Exception as e:
+            print(f"Performance stats error: {e}")
+        
+        self.root.after(config.PERFORMANCE_REFRESH_MS, self.update_performance_stats)
     
     def initialize_models(self):
         """Initialize emotion detection models"""
@@ -125,6 +200,11 @@ class EmotionRecognitionApp:
         # Get camera selection
         camera_selection = self.control_panel.camera_var.get()
         
+        # Several sources at once share one inference pool
+        if config.MULTI_STREAM_SEPARATOR in camera_selection:
+            self.start_multi_stream(selected_model, camera_selection)
+            return
+        
         # Start camera with retry
         max_retries = 3
         for attempt in range(max_retries):
@@ -146,22 +226,143 @@ class EmotionRecognitionApp:
         
         # Start streaming
         try:
-            if self.camera_handler.start_streaming(self.process_frame):
+            self.perf_monitor.reset()
+            self.selected_model = selected_model
+            self.display_mailbox.clear()
+            self.score_timeline.reset()
+            self.pipeline = self.create_pipeline(self.camera_handler.source)
+            if self.pipeline.start():
                 self.is_streaming = True
                 self.control_panel.update_start_button("Dừng")
                 self.main_window.status_var.set("Đang stream...")
+                self.root.after(config.DISPLAY_REFRESH_MS, self.poll_display)
             else:
                 messagebox.showerror("Lỗi", "Không thể bắt đầu stream!")
         except Exception as e:
             messagebox.showerror("Lỗi", f"Lỗi khởi động stream: {str(e)}")
     
+    def create_pipeline(self, source):
+        """Source -> inference -> display / log / record pipeline for one camera"""
+        queues = config.PIPELINE_QUEUES
+        pipeline = Pipeline(
+            source,
+            self.run_inference,
+            annotate_fn=self.annotate_packet,
+            inference_size=(config.INFERENCE_WIDTH, config.INFERENCE_HEIGHT),
+            max_fps=config.FPS,
+            inference_queue=queues['inference'],
+            perf_monitor=self.perf_monitor,
+            capture_pool_size=config.CAPTURE_POOL_SIZE,
+            tracker=IoUTracker(config.TRACK_IOU_THRESHOLD, config.TRACK_MAX_MISSED),
+            smoother=EmotionSmoother(
+                config.SMOOTHING_ALPHA, config.SMOOTHING_HYSTERESIS, config.SMOOTHING_MIN_DWELL,
+                config.SMOOTHING_TRACK_TIMEOUT
+            ) if config.SMOOTHING_ENABLED else None
+        )
+        pipeline.add_sink("display", self.display_sink, blocking=False, **queues['display'])
+        pipeline.add_sink("history", self.history_sink, blocking=False, transitions_only=True,
+                          **queues['history'])
+        pipeline.add_sink("log", self.log_sink, **queues['log'])
+        pipeline.add_sink("record", self.record_sink, **queues['record'])
+        return pipeline
+    
+    def start_multi_stream(self, selected_model, camera_selection):
+        """Start several cameras with a shared inference worker pool"""
+        camera_inputs = [part.strip() for part in camera_selection.split(config.MULTI_STREAM_SEPARATOR) if part.strip()]
+        
+        self.stream_manager = StreamManager(
+            self.model_manager,
+            num_workers=config.INFERENCE_WORKERS,
+            per_stream_capacity=config.INFERENCE_QUEUE_PER_STREAM,
+            max_streams=config.MAX_STREAMS,
+            inference_size=(config.INFERENCE_WIDTH, config.INFERENCE_HEIGHT),
+            capture_pool_size=config.CAPTURE_POOL_SIZE,
+            **self.get_inference_backend_options()
+        )
+        opened = self.stream_manager.open_streams(camera_inputs)
+        if not opened:
+            self.stream_manager = None
+            messagebox.showerror("Lỗi", f"Không thể mở camera nào: {camera_selection}")
+            return
+        
+        self.perf_monitor.reset()
+        try:
+            started = self.stream_manager.start(selected_model, self.on_multi_stream_result)
+        except Exception as e:
+            print(f"Inference pool start error: {e}")
+            started = False
+        if not started:
+            self.stream_manager.stop()
+            self.stream_manager = None
+            messagebox.showerror("Lỗi", "Không thể khởi động inference pool!")
+            return
+        self.is_streaming = True
+        self.control_panel.update_start_button("Dừng")
+        self.main_window.status_var.set(f"Đang stream {len(opened)}/{len(camera_inputs)} camera...")
+        self.root.after(config.MULTI_STREAM_REFRESH_MS, self.update_multi_stream_view)
+    
+    def get_inference_backend_options(self):
+        """StreamManager arguments for the configured inference backend"""
+        if config.INFERENCE_BACKEND == "process":
+            return {
+                'backend': "process",
+                'slot_bytes': config.PROCESS_RING_SLOT_BYTES,
+                'slots_per_worker': config.PROCESS_RING_SLOTS_PER_WORKER,
+            }
+        return {'backend': "thread"}
+    
+    def on_multi_stream_result(self, stream_id, frame, result):
+        """Inference result from the shared pool (worker thread)"""
+        self.perf_monitor.tick('inference')
+        if stream_id == 0:
+            self.multi_stream_result.post((result.label, result.confidence))
+    
+    def update_multi_stream_view(self):
+        """Show the tiled view of all streams (Tk main loop)"""
+        if not self.is_streaming or self.stream_manager is None:
+            return
+        
+        try:
+            with self.tracer.span("tk.update_multi_stream_view", "tk"):
+                stats = self.stream_manager.get_stream_stats()
+                self.perf_monitor.set_queue_depth('pool', sum(entry['queue_depth'] for entry in stats.values()))
+                labels = [
+                    f"#{stream_id} {entry['fps']:.1f} FPS {entry['latency_p50_ms']:.0f} ms drop {entry['dropped']}"
+                    for stream_id, entry in sorted(stats.items())
+                ]
+                buffers = self.stream_manager.get_latest_frames()
+                try:
+                    mosaic = self.video_display.compose_tiles(
+                        [buffer.array if buffer is not None else None for buffer in buffers], labels,
+                        (config.TILE_WIDTH, config.TILE_HEIGHT)
+                    )
+                finally:
+                    self.stream_manager.release_frames(buffers)
+                self.video_display.show_frame(mosaic)
+                
+                result = self.multi_stream_result.take()
+                if result is not None:
+                    self.emotion_panel.update_emotion_info(*result)
+        except Exception as e:
+            print(f"Multi-stream view error: {e}")
+        
+        self.root.after(config.MULTI_STREAM_REFRESH_MS, self.update_multi_stream_view)
+    
     def stop_stream(self):
         """Stop video streaming"""
         try:
             self.is_streaming = False
             
-            # Stop streaming first
-            self.camera_handler.stop_streaming()
+            # Stop multi-camera streams if active
+            if self.stream_manager is not None:
+                self.stream_manager.stop()
+                self.stream_manager = None
+            
+            # Stop the pipeline first
+            if self.pipeline is not None:
+                self.pipeline.stop()
+                self.pipeline = None
+            self.display_mailbox.clear()
             
             # Then stop camera
             self.camera_handler.stop_camera()
@@ -172,6 +373,9 @@ class EmotionRecognitionApp:
             # Stop recording if active
             if self.video_recorder.is_recording_active():
                 self.stop_recording()
+            
+            # Write trace collected so far
+            self.tracer.save()
                 
         except Exception as e:
             print(f"Error stopping stream: {e}")
@@ -190,6 +394,10 @@ class EmotionRecognitionApp:
             messagebox.showwarning("Cảnh báo", "Vui lòng bắt đầu stream trước khi ghi!")
             return
         
+        if self.stream_manager is not None:
+            messagebox.showwarning("Cảnh báo", "Ghi hình chỉ hỗ trợ khi stream một camera!")
+            return
+        
         # Ask for save location with more format options
         filename = filedialog.asksaveasfilename(
             defaultextension=".mp4",
@@ -288,7 +496,7 @@ FPS: {config.DEFAULT_FPS}
 LOGGING:
 Log folder: output/
 CSV data: Có
-JSON data: Có
+Session log (NDJSON): Có
 Summary: Có
 
 Thời gian bắt đầu: {time.strftime('%H:%M:%S')}
@@ -336,7 +544,7 @@ Kích thước: {file_size:.1f}MB
 FILES LOG:
 Vị trí: output/
 - CSV data file
-- JSON data file  
+- NDJSON session log
 - Text summary file
 
 Bạn có muốn mở thư mục output?"""
@@ -371,70 +579,119 @@ Bạn có muốn mở thư mục output?"""
         except Exception as e:
             print(f"Could not open folder: {e}")
 
-    def process_frame(self, frame):
-        """Process each video frame"""
+    def run_inference(self, frame):
+        """Detect emotion on one frame (pipeline inference thread)"""
         try:
-            # Check if still streaming
-            if not self.is_streaming:
-                return
-            
-            # Get selected model
-            selected_model = self.main_window.model_var.get()
-            
-            # Detect emotion with error handling
+            with self.perf_monitor.measure('inference'), self.tracer.span("inference", "inference"):
+                result = self.model_manager.detect(self.selected_model, frame)
+            self.perf_monitor.tick('inference')
+            return result
+        except Exception as e:
+            print(f"Emotion detection error: {e}")
+            return EmotionResult.from_status(STATUS_ERROR)
+    
+    def annotate_packet(self, packet):
+        """Draw face rectangles, emotion labels and the HUD into a pooled buffer
+        
+        Runs on the pipeline inference thread. The returned buffer is shared by the
+        display and record sinks and goes back to the pool once both released it.
+        """
+        buffer = None
+        try:
+            with self.perf_monitor.measure('annotate'), self.tracer.span("annotate", "capture"):
+                buffer = self.annotation_pool.copy_from(packet.frame)
+                self.camera_handler.draw_result(buffer.array, packet.result)
+                if self.show_performance_hud:
+                    self.camera_handler.draw_performance_overlay(
+                        buffer.array, self.perf_monitor.get_overlay_lines()
+                    )
+            return buffer
+        except Exception as e:
+            print(f"Annotation error: {e}")
+            if buffer is not None:
+                buffer.release()
+            # Show the raw capture buffer, with its own reference so the display can hold it
+            if packet.frame_buffer is not None:
+                packet.frame_buffer.retain()
+                return packet.frame_buffer
+            return packet.frame
+    
+    def display_sink(self, packet):
+        """Post the newest annotated frame for the Tk loop (replaces any unshown frame)"""
+        if not self.is_streaming:
+            return
+        self.score_timeline.add(packet.capture_time, packet.result)
+        buffer = packet.annotated_buffer
+        if buffer is not None:
+            buffer.retain()  # Held by the mailbox until shown or replaced
+        value = (packet.emotion, packet.confidence, packet.annotated, packet.index, buffer)
+        if not self.display_mailbox.post(value):
+            self.perf_monitor.add_count('display_skipped')
+    
+    def history_sink(self, packet):
+        """Queue a label transition for the history panel (pipeline loop)"""
+        self.history_events.append((packet.emotion, packet.confidence))
+    
+    @staticmethod
+    def release_display_frame(value):
+        """Return the pooled buffer of a display value that will not be shown again"""
+        buffer = value[4]
+        if buffer is not None:
+            buffer.release()
+    
+    def poll_display(self):
+        """Render the latest frame at the display refresh rate (Tk main loop)"""
+        if not self.is_streaming or self.pipeline is None:
+            return
+        
+        while self.history_events:
+            self.emotion_panel.add_history_entry(*self.history_events.popleft())
+        
+        latest = self.display_mailbox.take()
+        if latest is not None:
             try:
-                emotion, confidence, faces = self.model_manager.detect_emotion(selected_model, frame)
-            except Exception as e:
-                print(f"Emotion detection error: {e}")
-                emotion, confidence, faces = "Lỗi phát hiện", 0.0, []
-            
-            # Log emotion data if logging is active
-            if self.emotion_logger.is_active():
-                try:
-                    self.emotion_logger.log_emotion(emotion, confidence, selected_model, len(faces))
-                except Exception as e:
-                    print(f"Logging error: {e}")
-            
-            # Draw face rectangles and emotion labels
+                self.update_gui(*latest[:4])
+            finally:
+                self.release_display_frame(latest)
+        
+        self.root.after(config.DISPLAY_REFRESH_MS, self.poll_display)
+    
+    def log_sink(self, packet):
+        """Log emotion data if logging is active"""
+        if self.emotion_logger.is_active():
             try:
-                frame_with_annotations = self.camera_handler.draw_face_rectangles(
-                    frame.copy(), faces, emotion, confidence
-                )
+                self.emotion_logger.log_result(packet.result, self.selected_model, packet.transition)
+                self.emotion_logger.log_faces(packet.index, packet.capture_time, packet.result,
+                                              packet.track_ids, packet.timings)
             except Exception as e:
-                print(f"Annotation error: {e}")
-                frame_with_annotations = frame
-            
-            # Update GUI in main thread
+                print(f"Logging error: {e}")
+    
+    def record_sink(self, packet):
+        """Record frame if recording"""
+        if self.video_recorder.is_recording_active():
             try:
-                self.root.after(0, self.update_gui, emotion, confidence, frame_with_annotations)
+                with self.perf_monitor.measure('record'):
+                    self.video_recorder.write_frame(packet.annotated)
             except Exception as e:
-                print(f"GUI update scheduling error: {e}")
-            
-            # Record frame if recording
-            if self.video_recorder.is_recording_active():
-                try:
-                    self.video_recorder.write_frame(frame_with_annotations)
-                except Exception as e:
-                    print(f"Video recording error: {e}")
-                    
-        except Exception as e:
-            print(f"Frame processing error: {e}")
+                print(f"Video recording error: {e}")
     
-    def update_gui(self, emotion, confidence, frame):
+    def update_gui(self, emotion, confidence, frame, frame_index=None):
         """Update GUI with new emotion data and video frame"""
+        display_start = time.perf_counter()
         try:
-            # Update emotion information
-            if hasattr(self, 'emotion_panel'):
-                self.emotion_panel.update_emotion_info(emotion, confidence)
-            
-            # Update video display
-            if hasattr(self, 'video_display') and frame is not None:
-                img_tk = self.camera_handler.frame_to_tkinter(frame)
-                if img_tk:
-                    self.video_display.update_frame(img_tk)
+            with self.tracer.span("tk.update_gui", "tk", frame=frame_index):
+                # Update the current emotion (history lines come from label transitions)
+                if hasattr(self, 'emotion_panel'):
+                    self.emotion_panel.set_current_emotion(emotion, confidence)
+                
+                # Update video display
+                if hasattr(self, 'video_display') and frame is not None:
+                    self.video_display.show_frame(frame)
                     
         except Exception as e:
             print(f"GUI update error: {e}")
+        finally:
+            self.perf_monitor.record_latency('display', time.perf_counter() - display_start)
 
     def run(self):
         """Run the application"""
@@ -464,6 +721,9 @@ Bạn có muốn mở thư mục output?"""
             if self.emotion_logger.is_active():
                 self.emotion_logger.stop_logging()
             
+            # Write profiling trace
+            self.tracer.stop()
+            
             # Force cleanup
             import gc
             gc.collect()
@@ -471,8 +731,23 @@ Bạn có muốn mở thư mục output?"""
         except Exception as e:
             print(f"Cleanup error: {e}")
 
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Emotion Recognition App")
+    parser.add_argument(
+        "--trace",
+        nargs="?",
+        const=config.PROFILE_TRACE_FILE,
+        default=None,
+        metavar="FILE",
+        help=f"Write Chrome trace-event JSON of pipeline spans (default: {config.PROFILE_TRACE_FILE})"
+    )
+    return parser.parse_args(argv)
+
 def main():
     """Main entry point"""
+    args = parse_args()
+    
     print("=" * 50)
     print("EMOTION RECOGNITION APP")
     print("Ứng dụng nhận dạng cảm xúc khuôn mặt")
@@ -487,7 +762,7 @@ def main():
             print("Splash screen not available")
         
         # Start main application
-        app = EmotionRecognitionApp()
+        app = EmotionRecognitionApp(trace_file=args.trace)
         app.run()
     except Exception as e:
         print(f"Lỗi khởi động ứng dụng: {e}")
@@ -4,6 +4,9 @@ Base class for emotion detection models
 from abc import ABC, abstractmethod
 from typing import Tuple, List
 
+from .emotion_result import EmotionResult
+
+
 class EmotionDetector(ABC):
     """Abstract base class for emotion detection models"""
     
@@ -21,6 +24,24 @@ class EmotionDetector(ABC):
         """
         pass
     
+    def detect_emotion_batch(self, frames) -> List[Tuple[str, float, List[Tuple[int, int, int, int]]]]:
+        """
+        Detect emotion in several frames
+        
+        Models with a native batch path can override this; the default
+        simply runs detect_emotion on each frame.
+        """
+        return [self.detect_emotion(frame) for frame in frames]
+    
+    def detect(self, frame) -> EmotionResult:
+        """
+        Detect emotion as an EmotionResult (status code, emotion index, boxes, scores)
+        
+        Models that score every face override this; the default converts
+        the detect_emotion tuple.
+        """
+        return EmotionResult.from_legacy(*self.detect_emotion(frame))
+    
     @abstractmethod
     def is_available(self) -> bool:
         """Check if the model is available for use"""
@@ -1,8 +1,11 @@
 """
 DeepFace model implementation for emotion detection
 """
+import numpy as np
 from typing import Tuple, List
 from .base_detector import EmotionDetector
+from .emotion_result import (EMOTION_INDEX, STATUS_ERROR, STATUS_OK, STATUS_UNAVAILABLE, EmotionResult,
+                             scores_from_dict)
 
 try:
     from deepface import DeepFace
@@ -19,31 +22,40 @@ class DeepFaceDetector(EmotionDetector):
     
     def detect_emotion(self, frame) -> Tuple[str, float, List[Tuple[int, int, int, int]]]:
         """Detect emotion using DeepFace"""
+        return self.detect(frame).as_tuple()
+    
+    def detect(self, frame) -> EmotionResult:
+        """Dominant emotion of the first face plus boxes and scores of every face"""
         if not self.is_available():
-            return "Model không khả dụng", 0.0, []
+            return EmotionResult.from_status(STATUS_UNAVAILABLE)
         
         try:
-            result = DeepFace.analyze(frame, actions=['emotion'], 
+            results = DeepFace.analyze(frame, actions=['emotion'], 
                                     enforce_detection=False, silent=True)
             
-            if isinstance(result, list):
-                result = result[0]
+            if not isinstance(results, list):
+                results = [results]
             
+            result = results[0]
             dominant_emotion = result['dominant_emotion']
             confidence = result['emotion'][dominant_emotion] / 100.0
             
-            # Get face region
-            region = result.get('region', {})
-            if region:
-                x, y, w, h = region['x'], region['y'], region['w'], region['h']
-                faces = [(x, y, x + w, y + h)]
-            else:
-                faces = []
+            # Get face regions (percent scores scaled to 0..1)
+            faces, rows = [], []
+            for face in results:
+                region = face.get('region', {})
+                if region:
+                    x, y, w, h = region['x'], region['y'], region['w'], region['h']
+                    faces.append((x, y, x + w, y + h))
+                    rows.append(scores_from_dict(face['emotion'], 0.01))
+            scores = np.stack(rows) if rows else None
+            boxes = np.asarray(faces, dtype=np.int32).reshape(-1, 4)
             
-            return dominant_emotion, confidence, faces
+            # DeepFace reports an emotion even when enforce_detection found no region
+            return EmotionResult(STATUS_OK, EMOTION_INDEX[dominant_emotion], float(confidence), boxes, scores)
         except Exception as e:
             print(f"DeepFace Error: {e}")
-            return "Lỗi", 0.0, []
+            return EmotionResult.from_status(STATUS_ERROR)
     
     def is_available(self) -> bool:
         """Check if DeepFace is available"""
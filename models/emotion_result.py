@@ -0,0 +1,150 @@
+"""
+Compact detection result shared by detectors, the pipeline, the logger and the recorder
+"""
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# Column order of per-face emotion score vectors (and EmotionResult.emotion indices)
+EMOTION_LABELS = ('angry', 'disgust', 'fear', 'happy', 'sad', 'surprise', 'neutral')
+EMOTION_INDEX = {label: index for index, label in enumerate(EMOTION_LABELS)}
+
+# Result status codes
+STATUS_OK = 0  # emotion holds an EMOTION_LABELS index
+STATUS_FACES_ONLY = 1  # faces found, model does not classify emotions
+STATUS_NO_FACE = 2
+STATUS_PENDING = 3
+STATUS_UNAVAILABLE = 4
+STATUS_NOT_FOUND = 5
+STATUS_ERROR = 6
+
+# Display / log text of every status (the strings detectors used to return)
+STATUS_LABELS = {
+    STATUS_FACES_ONLY: "Phát hiện khuôn mặt",
+    STATUS_NO_FACE: "Không phát hiện",
+    STATUS_PENDING: "Chưa phát hiện",
+    STATUS_UNAVAILABLE: "Model không khả dụng",
+    STATUS_NOT_FOUND: "Model không tồn tại",
+    STATUS_ERROR: "Lỗi",
+}
+_LEGACY_STATUS = {text: status for status, text in STATUS_LABELS.items()}
+_LEGACY_STATUS["Lỗi phát hiện"] = STATUS_ERROR
+
+_NO_BOXES = np.zeros((0, 4), dtype=np.int32)
+_NO_SCORES = np.zeros((0, len(EMOTION_LABELS)), dtype=np.float32)
+_NO_BOXES.setflags(write=False)
+_NO_SCORES.setflags(write=False)
+
+
+def scores_from_label(emotion: str, confidence: float, face_count: int) -> np.ndarray:
+    """Score rows for models that only give a label: first face gets its confidence"""
+    scores = np.zeros((face_count, len(EMOTION_LABELS)), dtype=np.float32)
+    index = EMOTION_INDEX.get(emotion)
+    if face_count and index is not None:
+        scores[0, index] = confidence
+    return scores
+
+
+def scores_from_dict(emotion_scores: dict, scale: float = 1.0) -> np.ndarray:
+    """One score row from an {emotion: score} dict"""
+    return np.array([emotion_scores.get(label, 0.0) * scale for label in EMOTION_LABELS], dtype=np.float32)
+
+
+class EmotionResult:
+    """Detection result for one frame
+
+    ``emotion`` is the EMOTION_LABELS index of the dominant emotion (first
+    face) or -1, ``status`` one of the STATUS_* codes, ``boxes`` an int32
+    (faces, 4) array of x1, y1, x2, y2 and ``scores`` a float32
+    (faces, len(EMOTION_LABELS)) array. ``label`` gives the display text
+    without any string building.
+    """
+
+    __slots__ = ('status', 'emotion', 'confidence', 'boxes', 'scores')
+
+    def __init__(self, status: int, emotion: int = -1, confidence: float = 0.0,
+                 boxes: Optional[np.ndarray] = None, scores: Optional[np.ndarray] = None):
+        self.status = status
+        self.emotion = emotion
+        self.confidence = confidence
+        self.boxes = _NO_BOXES if boxes is None else boxes
+        self.scores = _NO_SCORES if scores is None else scores
+
+    @classmethod
+    def from_status(cls, status: int) -> "EmotionResult":
+        """Result without faces (no face, error, model unavailable, ...)"""
+        return cls(status)
+
+    @classmethod
+    def from_faces(cls, faces, scores: Optional[np.ndarray] = None) -> "EmotionResult":
+        """Result of a model that classifies every face: dominant emotion of the first face"""
+        boxes = np.asarray(faces, dtype=np.int32).reshape(-1, 4)
+        if not len(boxes):
+            return cls(STATUS_NO_FACE)
+        if scores is None or not len(scores):
+            return cls(STATUS_FACES_ONLY, -1, 1.0, boxes)
+        scores = np.asarray(scores, dtype=np.float32)
+        emotion = int(np.argmax(scores[0]))
+        return cls(STATUS_OK, emotion, float(scores[0, emotion]), boxes, scores)
+
+    @classmethod
+    def from_legacy(cls, label: str, confidence: float, faces, scores: Optional[np.ndarray] = None) -> "EmotionResult":
+        """Convert a (label, confidence, faces) detector tuple"""
+        boxes = np.asarray(faces, dtype=np.int32).reshape(-1, 4)
+        emotion = EMOTION_INDEX.get(label)
+        if emotion is not None:
+            if scores is None:
+                scores = scores_from_label(label, confidence, len(boxes))
+            return cls(STATUS_OK, emotion, float(confidence), boxes, np.asarray(scores, dtype=np.float32))
+        status = _LEGACY_STATUS.get(label)
+        if status is None:
+            status = STATUS_FACES_ONLY if len(boxes) else STATUS_NO_FACE
+        return cls(status, -1, float(confidence), boxes)
+
+    @property
+    def label(self) -> str:
+        """Emotion name, or the status text when there is no emotion"""
+        if self.status == STATUS_OK:
+            return EMOTION_LABELS[self.emotion]
+        return STATUS_LABELS[self.status]
+
+    @property
+    def face_count(self) -> int:
+        return len(self.boxes)
+
+    @property
+    def faces(self) -> List[Tuple[int, int, int, int]]:
+        """Boxes as a list of int tuples (for code still using the tuple layout)"""
+        return [tuple(box) for box in self.boxes.tolist()]
+
+    def is_ok(self) -> bool:
+        return self.status == STATUS_OK
+
+    def face_emotions(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Per-face (emotion index, score); index -1 where a face has no scores"""
+        if len(self.scores) != len(self.boxes) or not len(self.boxes):
+            count = len(self.boxes)
+            return np.full(count, -1, dtype=np.int64), np.zeros(count, dtype=np.float32)
+        indices = np.argmax(self.scores, axis=1)
+        best = self.scores[np.arange(len(indices)), indices]
+        return np.where(best > 0, indices, -1), best
+
+    def scaled(self, scale_x: float, scale_y: float, frame_shape: Optional[tuple] = None) -> "EmotionResult":
+        """Copy with boxes mapped by the given scales, clamped to the frame"""
+        if scale_x == 1.0 and scale_y == 1.0 or not len(self.boxes):
+            return self
+        boxes = np.rint(self.boxes * np.array([scale_x, scale_y, scale_x, scale_y])).astype(np.int32)
+        if frame_shape:
+            np.clip(boxes[:, 0::2], 0, frame_shape[1] - 1, out=boxes[:, 0::2])
+            np.clip(boxes[:, 1::2], 0, frame_shape[0] - 1, out=boxes[:, 1::2])
+        return EmotionResult(self.status, self.emotion, self.confidence, boxes, self.scores)
+
+    def as_tuple(self) -> Tuple[str, float, List[Tuple[int, int, int, int]]]:
+        """The (label, confidence, faces) tuple of EmotionDetector.detect_emotion"""
+        return self.label, self.confidence, self.faces
+
+    def __repr__(self) -> str:
+        return f"EmotionResult({self.label!r}, {self.confidence:.3f}, faces={len(self.boxes)})"
+
+
+PENDING_RESULT = EmotionResult(STATUS_PENDING)
@@ -2,8 +2,11 @@
 FER (Facial Emotion Recognition) model implementation
 """
 import cv2
+import numpy as np
 from typing import Tuple, List
 from .base_detector import EmotionDetector
+from .emotion_result import (STATUS_ERROR, STATUS_NO_FACE, STATUS_UNAVAILABLE, EmotionResult,
+                             scores_from_dict)
 
 try:
     from fer import FER
@@ -25,25 +28,28 @@ class FERDetector(EmotionDetector):
     
     def detect_emotion(self, frame) -> Tuple[str, float, List[Tuple[int, int, int, int]]]:
         """Detect emotion using FER"""
+        return self.detect(frame).as_tuple()
+    
+    def detect(self, frame) -> EmotionResult:
+        """Dominant emotion of the first face plus boxes and scores of every face"""
         if not self.is_available():
-            return "Model không khả dụng", 0.0, []
+            return EmotionResult.from_status(STATUS_UNAVAILABLE)
         
         try:
             emotions = self.detector.detect_emotions(frame)
             if emotions:
-                emotion_dict = emotions[0]['emotions']
-                dominant_emotion = max(emotion_dict, key=emotion_dict.get)
-                confidence = emotion_dict[dominant_emotion]
-                
                 # Get face coordinates for drawing rectangle
-                box = emotions[0]['box']
-                faces = [(box[0], box[1], box[0] + box[2], box[1] + box[3])]
+                faces = []
+                for face in emotions:
+                    box = face['box']
+                    faces.append((box[0], box[1], box[0] + box[2], box[1] + box[3]))
+                scores = np.stack([scores_from_dict(face['emotions']) for face in emotions])
                 
-                return dominant_emotion, confidence, faces
-            return "Không phát hiện", 0.0, []
+                return EmotionResult.from_faces(faces, scores)
+            return EmotionResult.from_status(STATUS_NO_FACE)
         except Exception as e:
             print(f"FER Error: {e}")
-            return "Lỗi", 0.0, []
+            return EmotionResult.from_status(STATUS_ERROR)
     
     def is_available(self) -> bool:
         """Check if FER is available"""
@@ -1,8 +1,9 @@
 """
 Model manager to handle all emotion detection models
 """
-from typing import List, Dict
+from typing import List, Dict, Tuple
 from .base_detector import EmotionDetector
+from .emotion_result import STATUS_NOT_FOUND, EmotionResult
 from .fer_detector import FERDetector
 from .deepface_detector import DeepFaceDetector
 from .opencv_detector import OpenCVDetector
@@ -16,46 +17,40 @@ class ModelManager:
     
     def __init__(self):
         self.models: Dict[str, EmotionDetector] = {}
+        self.model_specs: Dict[str, Tuple[type, tuple]] = {}
         self.initialize_models()
     
+    def _register(self, model_class: type, *args):
+        """Add a model if available, remembering how to build more instances"""
+        model = model_class(*args)
+        if model.is_available():
+            self.models[model.get_model_name()] = model
+            self.model_specs[model.get_model_name()] = (model_class, args)
+    
     def initialize_models(self):
         """Initialize all available models"""
         # FER model
-        fer_model = FERDetector()
-        if fer_model.is_available():
-            self.models[fer_model.get_model_name()] = fer_model
+        self._register(FERDetector)
         
         # DeepFace models
         deepface_backends = ["VGG-Face", "Facenet", "OpenFace"]
         for backend in deepface_backends:
-            deepface_model = DeepFaceDetector(backend)
-            if deepface_model.is_available():
-                self.models[deepface_model.get_model_name()] = deepface_model
+            self._register(DeepFaceDetector, backend)
         
         # MediaPipe + Transformers model
-        mediapipe_model = MediaPipeTransformersDetector()
-        if mediapipe_model.is_available():
-            self.models[mediapipe_model.get_model_name()] = mediapipe_model
+        self._register(MediaPipeTransformersDetector)
         
         # MTCNN model
-        mtcnn_model = MTCNNDetector()
-        if mtcnn_model.is_available():
-            self.models[mtcnn_model.get_model_name()] = mtcnn_model
+        self._register(MTCNNDetector)
         
         # Dlib model
-        dlib_model = DlibDetector()
-        if dlib_model.is_available():
-            self.models[dlib_model.get_model_name()] = dlib_model
+        self._register(DlibDetector)
         
         # Simple CNN model
-        cnn_model = SimpleCNNDetector()
-        if cnn_model.is_available():
-            self.models[cnn_model.get_model_name()] = cnn_model
+        self._register(SimpleCNNDetector)
         
         # OpenCV fallback (always add this last)
-        opencv_model = OpenCVDetector()
-        if opencv_model.is_available():
-            self.models[opencv_model.get_model_name()] = opencv_model
+        self._register(OpenCVDetector)
     
     def get_available_models(self) -> List[str]:
         """Get list of available model names"""
@@ -65,6 +60,18 @@ class ModelManager:
         """Get a specific model by name"""
         return self.models.get(model_name)
     
+    def get_model_spec(self, model_name: str) -> Tuple[type, tuple]:
+        """Picklable (class, args) used to build the model in another process"""
+        return self.model_specs.get(model_name)
+    
+    def create_model_instance(self, model_name: str) -> EmotionDetector:
+        """Create a separate instance of a model (e.g. one per worker thread)"""
+        spec = self.model_specs.get(model_name)
+        if spec is None:
+            return None
+        model_class, args = spec
+        return model_class(*args)
+    
     def detect_emotion(self, model_name: str, frame):
         """Detect emotion using specified model"""
         model = self.get_model(model_name)
@@ -72,3 +79,11 @@ class ModelManager:
             return model.detect_emotion(frame)
         else:
             return "Model không tồn tại", 0.0, []
+    
+    def detect(self, model_name: str, frame) -> EmotionResult:
+        """Detect emotion using specified model as an EmotionResult"""
+        model = self.get_model(model_name)
+        if model:
+            return model.detect(frame)
+        else:
+            return EmotionResult.from_status(STATUS_NOT_FOUND)
@@ -5,6 +5,8 @@ import cv2
 import numpy as np
 from typing import Tuple, List
 from .base_detector import EmotionDetector
+from .emotion_result import (STATUS_ERROR, STATUS_NO_FACE, STATUS_UNAVAILABLE, EmotionResult,
+                             scores_from_label)
 
 try:
     import tensorflow as tf
@@ -65,8 +67,12 @@ class SimpleCNNDetector(EmotionDetector):
     
     def detect_emotion(self, frame) -> Tuple[str, float, List[Tuple[int, int, int, int]]]:
         """Detect emotion using simple CNN"""
+        return self.detect(frame).as_tuple()
+    
+    def detect(self, frame) -> EmotionResult:
+        """Dominant emotion of the first face plus boxes and scores of every face"""
         if not self.is_available():
-            return "Model không khả dụng", 0.0, []
+            return EmotionResult.from_status(STATUS_UNAVAILABLE)
         
         try:
             # Convert to grayscale
@@ -80,47 +86,63 @@ class SimpleCNNDetector(EmotionDetector):
                 for (x, y, w, h) in faces:
                     face_list.append((x, y, x + w, y + h))
                 
-                # Get first face for emotion detection
-                x, y, w, h = faces[0]
-                face_roi = gray[y:y+h, x:x+w]
-                
-                # Predict emotion
-                emotion, confidence = self._predict_emotion(face_roi)
-                
-                return emotion, confidence, face_list
+                # Predict all faces in one batch
+                rois = [gray[y:y+h, x:x+w] for (x, y, w, h) in faces]
+                scores = self._predict_scores(rois)
+                if scores is None:
+                    # Fall back to heuristics on the first face
+                    emotion, confidence = self._simple_heuristic_emotion(rois[0])
+                    scores = scores_from_label(emotion, confidence, len(face_list))
+                return EmotionResult.from_faces(face_list, scores)
             
-            return "Không phát hiện", 0.0, []
+            return EmotionResult.from_status(STATUS_NO_FACE)
             
         except Exception as e:
             print(f"Simple CNN Error: {e}")
-            return "Lỗi", 0.0, []
+            return EmotionResult.from_status(STATUS_ERROR)
     
-    def _predict_emotion(self, face_roi):
-        """Predict emotion using CNN model"""
+    def detect_emotion_batch(self, frames) -> List[Tuple[str, float, List[Tuple[int, int, int, int]]]]:
+        """Detect faces per frame, then classify the faces of all frames in one model call"""
+        if not self.is_available():
+            return [self.detect_emotion(frame) for frame in frames]
+        
         try:
-            # Preprocess face
-            face_resized = cv2.resize(face_roi, (48, 48))
-            face_normalized = face_resized / 255.0
-            face_expanded = np.expand_dims(face_normalized, axis=0)
-            face_expanded = np.expand_dims(face_expanded, axis=-1)
-            
-            # Predict
-            predictions = self.model.predict(face_expanded, verbose=0)
-            
-            # Emotion labels
-            emotions = ['angry', 'disgust', 'fear', 'happy', 'sad', 'surprise', 'neutral']
-            
-            # Get prediction
-            emotion_idx = np.argmax(predictions[0])
-            confidence = float(predictions[0][emotion_idx])
-            emotion = emotions[emotion_idx]
-            
-            return emotion, confidence
+            detections = []
+            rois = []
+            for frame in frames:
+                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                faces = self.face_cascade.detectMultiScale(gray, 1.1, 4)
+                detections.append((gray, faces, len(rois)))
+                rois.extend(gray[y:y+h, x:x+w] for (x, y, w, h) in faces)
+            
+            scores = self._predict_scores(rois) if rois else None
+            results = []
+            for gray, faces, offset in detections:
+                if not len(faces):
+                    results.append(EmotionResult.from_status(STATUS_NO_FACE).as_tuple())
+                    continue
+                face_list = [(x, y, x + w, y + h) for (x, y, w, h) in faces]
+                if scores is None:
+                    emotion, confidence = self._simple_heuristic_emotion(rois[offset])
+                    face_scores = scores_from_label(emotion, confidence, len(face_list))
+                else:
+                    face_scores = scores[offset:offset + len(face_list)]
+                results.append(EmotionResult.from_faces(face_list, face_scores).as_tuple())
+            return results
             
+        except Exception as e:
+            print(f"Simple CNN Error: {e}")
+            return [EmotionResult.from_status(STATUS_ERROR).as_tuple() for _ in frames]
+    
+    def _predict_scores(self, face_rois):
+        """(faces, 7) CNN scores for a batch of grayscale face crops, None on failure"""
+        try:
+            batch = np.stack([cv2.resize(roi, (48, 48)) for roi in face_rois]).astype(np.float32) / 255.0
+            predictions = self.model.predict(batch[..., np.newaxis], verbose=0)
+            return np.asarray(predictions, dtype=np.float32)
         except Exception as e:
             print(f"CNN prediction error: {e}")
-            # Fallback to simple heuristics
-            return self._simple_heuristic_emotion(face_roi)
+            return None
     
     def _simple_heuristic_emotion(self, face_roi):
         """Simple emotion detection based on pixel intensity patterns"""
@@ -0,0 +1,126 @@
+"""
+Tests for temporal smoothing of emotion results
+"""
+import sys
+import os
+
+import numpy as np
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from models.emotion_result import EMOTION_INDEX, STATUS_NO_FACE, STATUS_OK, EmotionResult
+from utils.emotion_smoother import EmotionSmoother
+
+FPS = 30.0
+BOX = [(10, 10, 60, 60)]
+
+
+def face_result(emotion: str, score: float = 0.9) -> EmotionResult:
+    scores = np.full((1, len(EMOTION_INDEX)), (1.0 - score) / (len(EMOTION_INDEX) - 1), dtype=np.float32)
+    scores[0, EMOTION_INDEX[emotion]] = score
+    return EmotionResult.from_faces(BOX, scores)
+
+
+def run(smoother, results, start_frame=0):
+    """Feed results at FPS; returns (smoothed results, transition flags)"""
+    outputs, transitions = [], []
+    for offset, result in enumerate(results):
+        track_ids = [0] if len(result.boxes) else []
+        output, transition = smoother.update(result, track_ids, (start_frame + offset) / FPS)
+        outputs.append(output)
+        transitions.append(transition)
+    return outputs, transitions
+
+
+def test_first_frame_is_a_transition():
+    smoother = EmotionSmoother()
+    _, transitions = run(smoother, [face_result('happy')] * 5)
+    assert transitions == [True, False, False, False, False]
+
+
+def test_single_frame_spike_is_ignored():
+    smoother = EmotionSmoother(min_dwell=0.5)
+    results = [face_result('happy')] * 10 + [face_result('sad')] + [face_result('happy')] * 10
+    outputs, transitions = run(smoother, results)
+    assert all(output.label == 'happy' for output in outputs)
+    assert sum(transitions) == 1
+
+
+def test_sustained_change_switches_once_after_dwell():
+    smoother = EmotionSmoother(alpha=0.4, hysteresis=0.1, min_dwell=0.5)
+    results = [face_result('happy')] * 15 + [face_result('sad')] * 45
+    outputs, transitions = run(smoother, results)
+    switch = transitions.index(True, 1)
+    assert sum(transitions) == 2
+    assert outputs[switch].label == 'sad'
+    # Not before the dwell time, and every later frame stays on the new label
+    assert (switch - 15) / FPS >= 0.5
+    assert all(output.label == 'sad' for output in outputs[switch:])
+
+
+def test_hysteresis_blocks_small_margins():
+    smoother = EmotionSmoother(alpha=1.0, hysteresis=0.2, min_dwell=0.0)
+    close = np.array([[0.0, 0.0, 0.0, 0.45, 0.0, 0.0, 0.55]], dtype=np.float32)
+    results = [face_result('happy', 0.6)] + [EmotionResult.from_faces(BOX, close)] * 10
+    outputs, transitions = run(smoother, results)
+    assert all(output.emotion == EMOTION_INDEX['happy'] for output in outputs)
+    assert sum(transitions) == 1
+
+
+def test_face_order_does_not_flip_the_label():
+    smoother = EmotionSmoother(min_dwell=0.5)
+    boxes = [(10, 10, 60, 60), (100, 10, 150, 60)]
+    happy, sad = face_result('happy').scores[0], face_result('sad').scores[0]
+    transitions = []
+    for index in range(20):
+        # The detector lists the two faces in a different order every frame
+        order = [0, 1] if index % 2 == 0 else [1, 0]
+        result = EmotionResult.from_faces([boxes[row] for row in order], np.stack([(happy, sad)[row] for row in order]))
+        output, transition = smoother.update(result, order, index / FPS)
+        assert output.label == 'happy'
+        transitions.append(transition)
+    assert sum(transitions) == 1
+
+
+def test_new_primary_face_dwells():
+    smoother = EmotionSmoother(min_dwell=0.5)
+    happy, sad = face_result('happy'), face_result('sad')
+    both = EmotionResult.from_faces([(10, 10, 60, 60), (100, 10, 150, 60)], np.concatenate([happy.scores, sad.scores]))
+    only_sad = EmotionResult.from_faces([(100, 10, 150, 60)], sad.scores)
+    outputs, transitions = [], []
+    for index in range(40):
+        result, track_ids = (both, [0, 1]) if index < 10 else (only_sad, [1])
+        output, transition = smoother.update(result, track_ids, index / FPS)
+        outputs.append(output.label)
+        transitions.append(transition)
+    # The happy face leaves; the remaining sad face takes over only after the dwell time
+    switch = transitions.index(True, 1)
+    assert outputs[switch - 1] == 'happy' and outputs[switch] == 'sad'
+    assert (switch - 10) / FPS >= 0.5
+    assert sum(transitions) == 2
+
+
+def test_brief_face_loss_is_held():
+    smoother = EmotionSmoother(min_dwell=0.5)
+    results = [face_result('happy')] * 10 + [EmotionResult.from_status(STATUS_NO_FACE)] * 3 \
+        + [face_result('happy')] * 10
+    outputs, transitions = run(smoother, results)
+    assert all(output.status == STATUS_OK for output in outputs)
+    assert sum(transitions) == 1
+
+
+def test_long_face_loss_becomes_a_transition():
+    smoother = EmotionSmoother(min_dwell=0.5)
+    results = [face_result('happy')] * 10 + [EmotionResult.from_status(STATUS_NO_FACE)] * 30
+    outputs, transitions = run(smoother, results)
+    assert outputs[-1].status == STATUS_NO_FACE
+    assert sum(transitions) == 2
+
+
+def test_unseen_tracks_expire():
+    smoother = EmotionSmoother(track_timeout=1.0)
+    run(smoother, [face_result('happy')] * 5)
+    assert smoother.get_stats()['tracks'] == 1
+    run(smoother, [EmotionResult.from_status(STATUS_NO_FACE)] * 40, start_frame=5)
+    assert smoother.get_stats()['tracks'] == 0
@@ -0,0 +1,76 @@
+"""
+Tests for face tracking and the binary per-face records
+"""
+import sys
+import os
+import tempfile
+
+import numpy as np
+import pytest
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from models.emotion_result import EMOTION_LABELS
+from utils.face_records import FACE_RECORD_DTYPE, FaceRecordSink, build_face_records, read_face_records
+from utils.face_tracker import IoUTracker
+
+
+def test_tracker_keeps_ids_for_moving_faces():
+    tracker = IoUTracker()
+    assert tracker.update([(0, 0, 50, 50), (100, 0, 150, 50)]) == [0, 1]
+    # Same faces, shifted slightly and listed in the other order
+    assert tracker.update([(104, 2, 154, 52), (3, 1, 53, 51)]) == [1, 0]
+    # A face far from both tracks gets a new ID
+    assert tracker.update([(300, 300, 350, 350)]) == [2]
+
+
+def test_tracker_survives_missed_detections():
+    tracker = IoUTracker(max_missed=2)
+    assert tracker.update([(0, 0, 50, 50)]) == [0]
+    tracker.update([])
+    tracker.update([])
+    assert tracker.update([(0, 0, 50, 50)]) == [0]
+
+    tracker.update([])
+    tracker.update([])
+    tracker.update([])
+    assert tracker.update([(0, 0, 50, 50)]) == [1]
+
+
+def test_records_round_trip():
+    scores = np.eye(len(EMOTION_LABELS), dtype=np.float32)[:2]
+    batches = [
+        build_face_records(0, 1_000_000, [(1, 2, 30, 40), (50, 60, 90, 99)], [7, 9], scores, [1.5, 20.25, 3.0]),
+        build_face_records(1, 1_033_333, [], None, None, [1.0, 0.0, 2.0]),
+    ]
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "session.faces")
+        sink = FaceRecordSink(path, {'session': "round-trip"})
+        sink.open()
+        sink.write_batch(batches)
+        sink.close()
+        # A partial trailing record (e.g. an interrupted write) is ignored
+        with open(path, 'ab') as f:
+            f.write(b"\0" * (FACE_RECORD_DTYPE.itemsize // 2))
+
+        header, records = read_face_records(path)
+
+    assert header['session'] == "round-trip"
+    assert header['emotions'] == list(EMOTION_LABELS)
+    assert records.dtype == FACE_RECORD_DTYPE and FACE_RECORD_DTYPE.itemsize == 44
+    assert records['frame_index'].tolist() == [0, 0, 1]
+    assert records['track_id'].tolist() == [7, 9, -1]
+    assert records['capture_us'].tolist() == [1_000_000, 1_000_000, 1_033_333]
+    assert records['box'][:2].tolist() == [[1, 2, 30, 40], [50, 60, 90, 99]]
+    assert np.array_equal(records['scores'][:2].astype(np.float32), scores)
+    assert records['latency_ms'][0].tolist() == [1.5, 20.25, 3.0]
+
+
+def test_reader_rejects_other_files():
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "other.bin")
+        with open(path, 'wb') as f:
+            f.write(b"not a face record file")
+        with pytest.raises(ValueError):
+            read_face_records(path)
@@ -0,0 +1,115 @@
+"""
+Tests for the reference-counted frame buffers
+"""
+import sys
+import os
+
+import numpy as np
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.frame_pool import FramePool
+from utils.pipeline import FramePacket
+
+SHAPE = (4, 6, 3)
+
+
+def test_release_returns_buffer_to_pool():
+    pool = FramePool(2)
+    buffer = pool.acquire(SHAPE)
+    assert buffer.get_refs() == 1
+    buffer.release()
+    assert pool.get_stats()['free'] == 1
+    assert pool.acquire(SHAPE) is buffer
+    assert pool.get_stats() == {'allocated': 1, 'reused': 1, 'free': 0}
+
+
+def test_retained_buffer_is_not_recycled():
+    pool = FramePool(2)
+    buffer = pool.acquire(SHAPE)
+    buffer.retain()
+    buffer.release()
+    assert buffer.get_refs() == 1
+    assert pool.get_stats()['free'] == 0
+    assert pool.acquire(SHAPE) is not buffer
+    buffer.release()
+    assert pool.get_stats()['free'] == 1
+
+
+def test_extra_release_does_not_recycle_twice():
+    pool = FramePool(4)
+    buffer = pool.acquire(SHAPE)
+    buffer.release()
+    buffer.release()
+    assert buffer.get_refs() == 0
+    assert pool.get_stats()['free'] == 1
+
+
+def test_capacity_and_shape_change():
+    pool = FramePool(1)
+    first, second = pool.acquire(SHAPE), pool.acquire(SHAPE)
+    first.release()
+    second.release()
+    assert pool.get_stats()['free'] == 1
+
+    # A new resolution drops the old buffers; old-shaped buffers are not kept
+    old = pool.acquire(SHAPE)
+    new = pool.acquire((8, 8, 3))
+    old.release()
+    assert pool.get_stats()['free'] == 0
+    new.release()
+    assert pool.acquire((8, 8, 3)) is new
+
+
+def test_copy_from_and_adopt():
+    pool = FramePool(2)
+    frame = np.arange(np.prod(SHAPE), dtype=np.uint8).reshape(SHAPE)
+    copy = pool.copy_from(frame)
+    assert copy.array is not frame and np.array_equal(copy.array, frame)
+
+    adopted = pool.adopt(frame)
+    assert adopted.array is frame and adopted.get_refs() == 1
+    adopted.release()
+    copy.release()
+    assert pool.get_stats()['free'] == 2
+
+
+def test_packet_references_cover_both_buffers():
+    pool = FramePool(2)
+    frame_buffer = pool.acquire(SHAPE)
+    packet = FramePacket(0, frame_buffer.array, 0.0, frame_buffer)
+    # Annotation fell back to the capture buffer with its own reference
+    packet.annotated_buffer = frame_buffer.retain()
+    packet.retain()
+    assert frame_buffer.get_refs() == 4
+    packet.release()
+    packet.release()
+    assert frame_buffer.get_refs() == 0
+    assert pool.get_stats()['free'] == 1
+
+
+def test_capture_loop_releases_frame_when_callback_raises():
+    import time
+    from utils.camera_handler import CameraHandler
+
+    handler = CameraHandler()
+    assert handler.start_camera("synthetic://single?size=64x48&frames=20")
+    pool = FramePool(4, "capture")
+    calls = []
+
+    def callback(buffer):
+        calls.append(buffer)
+        raise RuntimeError("callback failed")
+
+    handler.start_streaming(callback, frame_pool=pool)
+    deadline = time.time() + 5.0
+    while handler.video_thread.is_alive() and time.time() < deadline:
+        time.sleep(0.05)
+    handler.stop_streaming()
+    handler.stop_camera()
+
+    assert calls
+    assert all(buffer.get_refs() == 0 for buffer in calls)
+    stats = pool.get_stats()
+    assert stats['allocated'] <= pool.capacity and stats['free'] == stats['allocated']
@@ -0,0 +1,98 @@
+"""
+Tests for the pipeline's bounded queue policies
+"""
+import sys
+import os
+import asyncio
+
+import pytest
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.pipeline import BLOCK, DROP_OLDEST, SAMPLE, BoundedQueue
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+async def drain(queue):
+    await queue.close()
+    items = []
+    while True:
+        item = await queue.get()
+        if item is None:
+            return items
+        items.append(item)
+
+
+def test_drop_oldest_keeps_newest_items():
+    async def scenario():
+        dropped = []
+        queue = BoundedQueue("display", maxsize=2, policy=DROP_OLDEST, on_drop=dropped.append)
+        for item in range(5):
+            assert await queue.put(item)
+        return await drain(queue), dropped, queue.get_stats()
+
+    items, dropped, stats = run(scenario())
+    assert items == [3, 4]
+    assert dropped == [0, 1, 2]
+    assert stats['dropped'] == 3 and stats['put'] == 5
+
+
+def test_block_waits_for_room():
+    async def scenario():
+        queue = BoundedQueue("log", maxsize=1, policy=BLOCK)
+        await queue.put(0)
+        blocked = asyncio.ensure_future(queue.put(1))
+        await asyncio.sleep(0.01)
+        assert not blocked.done()
+        assert await queue.get() == 0
+        assert await blocked
+        return await drain(queue), queue.dropped
+
+    items, dropped = run(scenario())
+    assert items == [1]
+    assert dropped == 0
+
+
+def test_block_put_fails_when_closed():
+    async def scenario():
+        queue = BoundedQueue("log", maxsize=1, policy=BLOCK)
+        await queue.put(0)
+        blocked = asyncio.ensure_future(queue.put(1))
+        await asyncio.sleep(0.01)
+        await queue.close()
+        return await blocked, await queue.put(2)
+
+    assert run(scenario()) == (False, False)
+
+
+def test_sample_queues_every_nth_item():
+    async def scenario():
+        queue = BoundedQueue("record", maxsize=10, policy=SAMPLE, sample_every=3)
+        results = [await queue.put(item) for item in range(7)]
+        return results, await drain(queue), queue.skipped
+
+    results, items, skipped = run(scenario())
+    assert items == [0, 3, 6]
+    assert results.count(True) == 3
+    assert skipped == 4
+
+
+def test_close_with_discard_drops_pending_items():
+    async def scenario():
+        dropped = []
+        queue = BoundedQueue("display", maxsize=4, on_drop=dropped.append)
+        for item in range(3):
+            await queue.put(item)
+        await queue.close(discard=True)
+        return await queue.get(), dropped
+
+    assert run(scenario()) == (None, [0, 1, 2])
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        BoundedQueue("bad", policy="newest")
@@ -0,0 +1,34 @@
+"""
+Tests for the compact result records passed between inference processes
+"""
+import sys
+import os
+
+import numpy as np
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from models.emotion_result import EMOTION_INDEX, STATUS_NO_FACE, EmotionResult
+from utils.process_pool import pack_result, unpack_result
+
+
+def test_pack_result_round_trip():
+    scores = np.zeros((2, len(EMOTION_INDEX)), dtype=np.float32)
+    scores[0, EMOTION_INDEX['happy']] = 0.75
+    scores[1, EMOTION_INDEX['sad']] = 0.5
+    result = EmotionResult.from_faces([(1, 2, 30, 40), (50, 60, 90, 99)], scores)
+
+    restored = unpack_result(pack_result(result))
+    assert restored.status == result.status
+    assert restored.emotion == result.emotion
+    assert restored.confidence == result.confidence
+    assert restored.boxes.tolist() == [[1, 2, 30, 40], [50, 60, 90, 99]]
+    assert np.array_equal(restored.scores, scores)
+
+
+def test_pack_result_without_faces():
+    restored = unpack_result(pack_result(EmotionResult.from_status(STATUS_NO_FACE)))
+    assert restored.status == STATUS_NO_FACE
+    assert restored.boxes.shape == (0, 4)
+    assert restored.scores.shape == (0, len(EMOTION_INDEX))
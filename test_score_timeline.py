@@ -0,0 +1,75 @@
+"""
+Tests for the timeline chart's ring buffer of emotion scores
+"""
+import sys
+import os
+
+import numpy as np
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from models.emotion_result import EMOTION_INDEX, STATUS_NO_FACE, EmotionResult
+from utils.score_timeline import ScoreTimeline
+
+
+def face_result(score: float) -> EmotionResult:
+    scores = np.zeros((1, len(EMOTION_INDEX)), dtype=np.float32)
+    scores[0, EMOTION_INDEX['happy']] = score
+    return EmotionResult.from_faces([(0, 0, 10, 10)], scores)
+
+
+def happy(rows):
+    return rows[:, EMOTION_INDEX['happy']].tolist()
+
+
+def test_bins_average_their_frames():
+    timeline = ScoreTimeline(window_seconds=4.0, bin_seconds=1.0)
+    timeline.add(0.1, face_result(0.2))
+    timeline.add(0.6, face_result(0.4))
+    timeline.add(1.2, EmotionResult.from_status(STATUS_NO_FACE))
+    timeline.add(2.0, face_result(1.0))
+    sequence, rows = timeline.since(0)
+    assert sequence == 2
+    assert np.allclose(happy(rows)[0], 0.3)
+    assert np.isnan(rows[1]).all()
+
+
+def test_since_returns_only_new_bins():
+    timeline = ScoreTimeline(window_seconds=4.0, bin_seconds=1.0)
+    for second in range(4):
+        timeline.add(float(second), face_result(second / 10))
+    sequence, rows = timeline.since(0)
+    assert sequence == 3 and np.allclose(happy(rows), [0.0, 0.1, 0.2])
+    timeline.add(4.0, face_result(0.4))
+    sequence, rows = timeline.since(sequence)
+    assert sequence == 4 and np.allclose(happy(rows), [0.3])
+    assert len(timeline.since(sequence)[1]) == 0
+
+
+def test_ring_wraps_around_keeping_the_newest_window():
+    timeline = ScoreTimeline(window_seconds=4.0, bin_seconds=1.0)
+    for second in range(11):
+        timeline.add(float(second), face_result(second / 10))
+    sequence, rows = timeline.since(0)
+    assert sequence == 10
+    assert len(rows) == timeline.capacity == 4
+    assert np.allclose(happy(rows), [0.6, 0.7, 0.8, 0.9])
+
+
+def test_long_gap_fills_the_window_with_nan():
+    timeline = ScoreTimeline(window_seconds=4.0, bin_seconds=1.0)
+    timeline.add(0.0, face_result(0.5))
+    timeline.add(100.0, face_result(0.5))
+    sequence, rows = timeline.since(0)
+    assert sequence == 100
+    assert len(rows) == 4 and np.isnan(rows).all()
+
+
+def test_reset_restarts_the_sequence():
+    timeline = ScoreTimeline(window_seconds=4.0, bin_seconds=1.0)
+    timeline.add(0.0, face_result(0.5))
+    timeline.add(3.0, face_result(0.5))
+    timeline.reset()
+    assert timeline.since(0)[0] == 0
+    assert len(timeline.since(0)[1]) == 0
@@ -0,0 +1,130 @@
+"""
+Tests for event-mode session logs and their expansion back to frames
+"""
+import sys
+import os
+import csv
+import tempfile
+import threading
+
+import numpy as np
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from analyze_sessions import expand_intervals, load_session
+from utils.logger import EmotionLogger
+from utils.session_log import expand_events, iter_timeline, scan_session
+
+EVENT_ROW = {
+    'timestamp': '2026-10-19 12:00:00.000', 'time_elapsed': 1.0, 'emotion': 'happy', 'confidence': 0.8,
+    'model_used': 'OpenCV Basic', 'face_count': 1, 'duration': 2.0, 'frame_count': 4,
+    'confidence_min': 0.7, 'confidence_max': 0.9, 'reason': 'change',
+}
+
+
+def test_expand_events_spreads_frames_over_the_interval():
+    frames = list(expand_events([EVENT_ROW]))
+    assert [frame['time_elapsed'] for frame in frames] == [1.0, 1.5, 2.0, 2.5]
+    assert [frame['timestamp'] for frame in frames] == [
+        '2026-10-19 12:00:00.000', '2026-10-19 12:00:00.500',
+        '2026-10-19 12:00:01.000', '2026-10-19 12:00:01.500']
+    assert all(frame['emotion'] == 'happy' and frame['confidence'] == 0.8 for frame in frames)
+    assert 'frame_count' not in frames[0] and 'reason' not in frames[0]
+
+
+def test_expand_events_passes_frame_rows_through():
+    row = {key: EVENT_ROW[key] for key in ('timestamp', 'time_elapsed', 'emotion', 'confidence')}
+    assert list(expand_events([row])) == [row]
+
+
+def test_expand_intervals_matches_expand_events():
+    elapsed, codes, confidence = expand_intervals(
+        np.array([0.0, 3.0]), np.array([0, 1], dtype=np.int32), np.array([0.5, 0.9], dtype=np.float32),
+        np.array([3.0, 1.0]), np.array([3, 2]))
+    assert np.allclose(elapsed, [0.0, 1.0, 2.0, 3.0, 3.5])
+    assert codes.tolist() == [0, 0, 0, 1, 1]
+    assert np.allclose(confidence, [0.5, 0.5, 0.5, 0.9, 0.9])
+
+
+def log_sequence(logger, sequence):
+    for emotion, face_count in sequence:
+        logger.log_emotion(emotion, 0.5 if emotion == 'sad' else 0.9, 'OpenCV Basic', face_count)
+
+
+def test_event_log_round_trip():
+    sequence = [('happy', 1)] * 10 + [('happy', 2)] * 3 + [('sad', 2)] * 7
+    with tempfile.TemporaryDirectory() as folder:
+        logger = EmotionLogger(log_mode="events", keyframe_interval=60.0)
+        logger.output_folder = folder
+        assert logger.start_logging("events")
+        log_sequence(logger, sequence)
+        logger.stop_logging()
+
+        with open(logger.csv_filename, newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+        assert [row['reason'] for row in rows] == ['faces', 'change', 'end']
+        assert [int(row['frame_count']) for row in rows] == [10, 3, 7]
+
+        timeline = list(iter_timeline(logger.ndjson_filename))
+        assert [(frame['emotion'], frame['face_count']) for frame in timeline] == sequence
+        elapsed = [frame['time_elapsed'] for frame in timeline]
+        assert elapsed == sorted(elapsed)
+
+        scanned = scan_session(logger.ndjson_filename)
+        assert scanned['records_read'] == len(sequence)
+        for path in (logger.csv_filename, logger.ndjson_filename):
+            _, labels, codes, _ = load_session(path)
+            assert [labels[code] for code in codes] == [emotion for emotion, _ in sequence]
+
+
+def test_keyframes_split_long_intervals():
+    with tempfile.TemporaryDirectory() as folder:
+        logger = EmotionLogger(log_mode="events", keyframe_interval=0.0)
+        logger.output_folder = folder
+        assert logger.start_logging("keyframes")
+        log_sequence(logger, [('happy', 1)] * 5)
+        logger.stop_logging()
+        with open(logger.csv_filename, newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+        assert [row['reason'] for row in rows] == ['keyframe'] * 4 + ['end']
+
+
+def test_stop_while_logging_keeps_every_frame():
+    with tempfile.TemporaryDirectory() as folder:
+        logger = EmotionLogger(max_queue=1_000_000, log_mode="events", keyframe_interval=0.01)
+        logger.output_folder = folder
+        assert logger.start_logging("race")
+        stop = threading.Event()
+
+        def produce():
+            index = 0
+            while not stop.is_set():
+                logger.log_emotion('happy' if index % 20 < 10 else 'sad', 0.9, 'OpenCV Basic', 1)
+                index += 1
+
+        thread = threading.Thread(target=produce)
+        thread.start()
+        threading.Event().wait(0.2)
+        logger.stop_logging()
+        stop.set()
+        thread.join()
+
+        with open(logger.csv_filename, newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+        assert rows[-1]['reason'] == 'end'
+        assert sum(int(row['frame_count']) for row in rows) == logger.aggregator.total_records
+
+
+def test_frames_mode_writes_only_transitions():
+    with tempfile.TemporaryDirectory() as folder:
+        logger = EmotionLogger(log_mode="frames")
+        logger.output_folder = folder
+        assert logger.start_logging("frames")
+        for index in range(10):
+            logger.log_emotion('happy' if index < 6 else 'sad', 0.9, 'OpenCV Basic', 1, index in (0, 6))
+        logger.stop_logging()
+        with open(logger.csv_filename, newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+        assert [row['emotion'] for row in rows] == ['happy', 'sad']
+        assert logger.aggregator.total_records == 10
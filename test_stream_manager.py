@@ -0,0 +1,62 @@
+"""
+Tests for publishing multi-stream inference results
+"""
+import sys
+import os
+
+import pytest
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from models.emotion_result import STATUS_NO_FACE, EmotionResult
+from utils.camera_handler import CameraHandler
+from utils.stream_manager import StreamManager, StreamState
+
+SHAPE = (48, 64, 3)
+
+
+def make_manager():
+    manager = StreamManager(model_manager=None)
+    state = StreamState(0, "test", CameraHandler())
+    manager.streams[0] = state
+    return manager, state
+
+
+def make_item(state, capture_time, result_scale=(1.0, 1.0)):
+    capture = state.capture_pool.acquire(SHAPE)
+    small = state.resize_pool.acquire((24, 32, 3))
+    return (small.array, capture_time, 0, capture.array, result_scale, (capture, small)), capture, small
+
+
+def test_out_of_order_result_is_not_published():
+    manager, state = make_manager()
+    published = []
+    manager.result_callback = lambda stream_id, frame, result: published.append(frame)
+    result = EmotionResult.from_status(STATUS_NO_FACE)
+
+    newer, newer_capture, _ = make_item(state, 2.0)
+    older, older_capture, older_small = make_item(state, 1.0)
+    manager._on_result(0, newer, result)
+    manager._on_result(0, older, result)
+
+    assert state.latest_buffer is newer_capture and state.latest_capture_time == 2.0
+    assert len(published) == 1 and state.frames_stale == 1
+    assert older_capture.get_refs() == 0 and older_small.get_refs() == 0
+    manager.stop()
+    assert newer_capture.get_refs() == 0
+
+
+def test_failed_result_scaling_releases_buffers():
+    manager, state = make_manager()
+
+    class BrokenResult:
+        def scaled(self, *args):
+            raise RuntimeError("scaling failed")
+
+    item, capture, small = make_item(state, 1.0, (2.0, 2.0))
+    with pytest.raises(RuntimeError):
+        manager._on_result(0, item, BrokenResult())
+    assert capture.get_refs() == 0 and small.get_refs() == 0
+    assert state.latest_buffer is None
+    manager.stop()
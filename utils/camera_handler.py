@@ -4,19 +4,36 @@ Camera handler for video capture and processing
 import cv2
 import threading
 import time
+from functools import lru_cache
 from typing import Callable, Optional
-from PIL import Image, ImageTk
+from models.emotion_result import EMOTION_LABELS
+from .trace_recorder import get_tracer
+from .frame_pool import FramePool
+from .frame_sources import FrameSource, DeviceSource, create_frame_source
+
+@lru_cache(maxsize=2048)
+def _label_text(label: str, permille: int) -> str:
+    """Cached "label: 93.4%" text (confidence in 0.1% steps)"""
+    return f"{label}: {permille / 10:.1f}%"
+
 
 class CameraHandler:
     """Handle camera operations and video processing"""
     
     def __init__(self):
-        self.cap: Optional[cv2.VideoCapture] = None
+        self.source: Optional[FrameSource] = None
         self.is_streaming = False
         self.video_thread: Optional[threading.Thread] = None
         self.frame_callback: Optional[Callable] = None
+        self.frame_pool: Optional[FramePool] = None
         self._lock = threading.Lock()
         self.available_cameras = []
+        self.perf_monitor = None
+        self.max_fps = 30.0  # Upper bound on frames handed to the callback
+        
+    def set_performance_monitor(self, perf_monitor):
+        """Set performance monitor for capture statistics"""
+        self.perf_monitor = perf_monitor
         
     def detect_available_cameras(self) -> list:
         """Detect all available cameras"""
@@ -25,25 +42,21 @@ class CameraHandler:
         # Test camera indices 0-9
         for index in range(10):
             try:
-                cap = cv2.VideoCapture(index)
-                if cap.isOpened():
-                    ret, frame = cap.read()
-                    if ret and frame is not None:
-                        # Get camera info
-                        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-                        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-                        fps = cap.get(cv2.CAP_PROP_FPS)
-                        
-                        camera_info = {
-                            'index': index,
-                            'name': f"Camera {index}",
-                            'resolution': f"{width}x{height}",
-                            'fps': fps,
-                            'type': 'USB/Built-in'
-                        }
-                        available_cameras.append(camera_info)
-                        print(f"Found camera {index}: {width}x{height} @ {fps}fps")
-                cap.release()
+                source = DeviceSource(index)
+                if source.open():
+                    width, height = source.get_frame_size()
+                    fps = source.get_native_fps()
+                    
+                    camera_info = {
+                        'index': index,
+                        'name': f"Camera {index}",
+                        'resolution': f"{width}x{height}",
+                        'fps': fps,
+                        'type': 'USB/Built-in'
+                    }
+                    available_cameras.append(camera_info)
+                    print(f"Found camera {index}: {width}x{height} @ {fps}fps")
+                source.release()
             except Exception as e:
                 pass
         
@@ -52,125 +65,45 @@ class CameraHandler:
         return available_cameras
     
     def start_camera(self, camera_input) -> bool:
-        """Start camera capture with flexible input"""
+        """Start camera capture with flexible input (index, device, URL, file, images, synthetic)"""
         try:
             with self._lock:
-                # Release existing camera first
-                if self.cap is not None:
-                    self.cap.release()
-                    self.cap = None
+                # Release existing source first
+                if self.source is not None:
+                    self.source.release()
+                    self.source = None
                 
-                # Determine camera input type
-                camera_index = self._parse_camera_input(camera_input)
-                
-                # Try to open camera with different backends
-                backends = [cv2.CAP_DSHOW, cv2.CAP_MSMF, cv2.CAP_ANY]
-                
-                for backend in backends:
-                    try:
-                        if isinstance(camera_index, str):
-                            # File path or IP camera
-                            self.cap = cv2.VideoCapture(camera_index)
-                        else:
-                            # Camera index
-                            self.cap = cv2.VideoCapture(camera_index, backend)
-                            
-                        if self.cap.isOpened():
-                            # Set camera properties for stability
-                            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-                            if isinstance(camera_index, int):
-                                self.cap.set(cv2.CAP_PROP_FPS, 30)
-                                self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-                                self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-                            
-                            # Test reading a frame
-                            ret, frame = self.cap.read()
-                            if ret and frame is not None:
-                                print(f"Camera opened successfully: {camera_input} with backend: {backend}")
-                                return True
-                            else:
-                                self.cap.release()
-                                self.cap = None
-                    except Exception as e:
-                        print(f"Failed to open camera {camera_input} with backend {backend}: {e}")
-                        if self.cap:
-                            self.cap.release()
-                            self.cap = None
+                source = create_frame_source(camera_input)
+                if source.open():
+                    self.source = source
+                    print(f"Camera opened successfully: {camera_input} ({source.source_type})")
+                    return True
                 
+                source.release()
                 return False
                 
         except Exception as e:
             print(f"Error starting camera: {e}")
             return False
     
-    def _parse_camera_input(self, camera_input):
-        """Parse different types of camera input"""
-        if isinstance(camera_input, int):
-            return camera_input
-        
-        if isinstance(camera_input, str):
-            # Check if it's a number string
-            if camera_input.isdigit():
-                return int(camera_input)
-            
-            # Check if it's a file path
-            if any(camera_input.endswith(ext) for ext in ['.mp4', '.avi', '.mov', '.mkv', '.wmv']):
-                return camera_input
-            
-            # Check if it's an IP camera URL
-            if camera_input.startswith(('http://', 'https://', 'rtsp://', 'rtmp://')):
-                return camera_input
-            
-            # Try to extract number from string like "Camera 0"
-            import re
-            match = re.search(r'(\d+)', camera_input)
-            if match:
-                return int(match.group(1))
-        
-        # Default to camera 0
-        return 0
-    
     def get_camera_info(self) -> dict:
         """Get current camera information"""
-        if not self.cap or not self.cap.isOpened():
+        if not self.source or not self.source.is_opened():
             return {}
         
         try:
-            info = {
-                'width': int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
-                'height': int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
-                'fps': self.cap.get(cv2.CAP_PROP_FPS),
-                'brightness': self.cap.get(cv2.CAP_PROP_BRIGHTNESS),
-                'contrast': self.cap.get(cv2.CAP_PROP_CONTRAST),
-                'saturation': self.cap.get(cv2.CAP_PROP_SATURATION),
-            }
-            return info
+            return self.source.get_info()
         except Exception as e:
             print(f"Error getting camera info: {e}")
             return {}
     
     def set_camera_property(self, property_name: str, value: float) -> bool:
         """Set camera property"""
-        if not self.cap or not self.cap.isOpened():
+        if not self.source or not self.source.is_opened():
             return False
         
         try:
-            property_map = {
-                'brightness': cv2.CAP_PROP_BRIGHTNESS,
-                'contrast': cv2.CAP_PROP_CONTRAST,
-                'saturation': cv2.CAP_PROP_SATURATION,
-                'hue': cv2.CAP_PROP_HUE,
-                'gain': cv2.CAP_PROP_GAIN,
-                'exposure': cv2.CAP_PROP_EXPOSURE,
-                'width': cv2.CAP_PROP_FRAME_WIDTH,
-                'height': cv2.CAP_PROP_FRAME_HEIGHT,
-                'fps': cv2.CAP_PROP_FPS,
-            }
-            
-            if property_name in property_map:
-                return self.cap.set(property_map[property_name], value)
-            
-            return False
+            return self.source.set_property(property_name, value)
         except Exception as e:
             print(f"Error setting camera property {property_name}: {e}")
             return False
@@ -186,13 +119,13 @@ class CameraHandler:
                     self.video_thread.join(timeout=2.0)
                 
                 # Release camera
-                if self.cap:
+                if self.source:
                     try:
-                        self.cap.release()
+                        self.source.release()
                     except Exception as e:
                         print(f"Error releasing camera: {e}")
                     finally:
-                        self.cap = None
+                        self.source = None
                 
                 # Force garbage collection
                 import gc
@@ -201,17 +134,24 @@ class CameraHandler:
         except Exception as e:
             print(f"Error stopping camera: {e}")
     
-    def start_streaming(self, frame_callback: Callable):
-        """Start video streaming with callback for each frame"""
-        if not self.cap or not self.cap.isOpened():
+    def start_streaming(self, frame_callback: Callable, frame_pool: Optional[FramePool] = None):
+        """Start video streaming with callback for each frame
+
+        With a frame_pool, frames are read into recycled buffers and the
+        callback receives a PooledFrame whose reference it must release.
+        The callback owns the frame only if it returns normally; if it
+        raises, it must not have kept the frame and it is released here.
+        """
+        if not self.source or not self.source.is_opened():
             return False
         
         try:
             self.is_streaming = True
             self.frame_callback = frame_callback
+            self.frame_pool = frame_pool
             
             # Start video processing thread
-            self.video_thread = threading.Thread(target=self._process_video, daemon=True)
+            self.video_thread = threading.Thread(target=self._process_video, name="CameraCapture", daemon=True)
             self.video_thread.start()
             
             return True
@@ -239,19 +179,30 @@ class CameraHandler:
         frame_count = 0
         last_error_time = 0
         error_count = 0
+        tracer = get_tracer()
+        source = self.source
+        frame_pool = self.frame_pool
         
         while self.is_streaming:
             try:
                 # Check if camera is still valid
-                if not self.cap or not self.cap.isOpened():
-                    print("Camera connection lost")
+                if not source or not source.is_opened():
+                    print("Camera connection lost or end of input")
                     break
                 
-                # Try to read frame with timeout
-                ret, frame = self.cap.read()
+                # Read next frame; live sources block, file sources pace themselves
+                read_start = time.perf_counter()
+                tracer.set_frame(frame_count)
+                with tracer.span("capture.read", "capture"):
+                    if frame_pool is not None:
+                        ret, frame = source.read_pooled(frame_pool)
+                    else:
+                        ret, frame = source.read()
                 
                 if not ret or frame is None:
                     # Handle read error
+                    if self.perf_monitor:
+                        self.perf_monitor.add_count('dropped')
                     current_time = time.time()
                     if current_time - last_error_time > 1.0:  # Reset error count every second
                         error_count = 0
@@ -269,24 +220,31 @@ class CameraHandler:
                 # Reset error count on successful read
                 error_count = 0
                 
-                # Resize frame for better performance
-                try:
-                    frame = cv2.resize(frame, (640, 480))
-                except Exception as e:
-                    print(f"Error resizing frame: {e}")
-                    continue
+                if self.perf_monitor:
+                    self.perf_monitor.record_latency('capture', time.perf_counter() - read_start)
+                    self.perf_monitor.tick('capture')
+                    if hasattr(source, 'get_queue_depth'):
+                        self.perf_monitor.set_queue_depth('read_ahead', source.get_queue_depth())
                 
-                # Call callback with frame
+                # Call callback with frame (a pooled frame is owned by the callback once it returns)
                 if self.frame_callback and self.is_streaming:
                     try:
-                        self.frame_callback(frame)
+                        with tracer.span("process_frame", "capture"):
+                            self.frame_callback(frame)
                     except Exception as e:
                         print(f"Error in frame callback: {e}")
+                        if frame_pool is not None:
+                            frame.release()
+                elif frame_pool is not None:
+                    frame.release()
                 
                 frame_count += 1
                 
-                # Control frame rate
-                time.sleep(0.03)  # ~30 FPS
+                # Cap the frame rate without adding a fixed delay
+                if self.max_fps > 0:
+                    remaining = 1.0 / self.max_fps - (time.perf_counter() - read_start)
+                    if remaining > 0:
+                        time.sleep(remaining)
                 
             except Exception as e:
                 print(f"Error in video processing loop: {e}")
@@ -301,31 +259,44 @@ class CameraHandler:
         print(f"Video processing stopped. Processed {frame_count} frames.")
     
     @staticmethod
-    def frame_to_tkinter(frame):
-        """Convert OpenCV frame to Tkinter PhotoImage"""
+    def draw_result(frame, result):
+        """Draw an EmotionResult: each face's box and its own emotion label
+        
+        Faces without a score row (models that only label the first face)
+        get the frame's label.
+        """
         try:
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            img = Image.fromarray(frame_rgb)
-            return ImageTk.PhotoImage(img)
+            emotions, face_scores = result.face_emotions()
+            frame_text = _label_text(result.label, int(round(result.confidence * 1000)))
+            for (x1, y1, x2, y2), emotion, score in zip(result.boxes.tolist(), emotions.tolist(),
+                                                        face_scores.tolist()):
+                cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+                text = _label_text(EMOTION_LABELS[emotion], int(round(score * 1000))) if emotion >= 0 else frame_text
+                cv2.putText(frame, text, (x1, y1 - 10),
+                           cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+            
+            return frame
         except Exception as e:
-            print(f"Error converting frame to tkinter: {e}")
-            return None
+            print(f"Error drawing face rectangles: {e}")
+            return frame
     
     @staticmethod
-    def draw_face_rectangles(frame, faces, emotion=None, confidence=None):
-        """Draw rectangles around detected faces with emotion labels"""
+    def draw_performance_overlay(frame, lines):
+        """Draw performance HUD text in the top-left corner of the frame"""
         try:
-            for (x1, y1, x2, y2) in faces:
-                # Draw rectangle
-                cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                
-                # Draw emotion label if provided
-                if emotion and confidence is not None:
-                    label = f"{emotion}: {confidence:.1%}"
-                    cv2.putText(frame, label, (x1, y1 - 10), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+            if not lines:
+                return frame
+            
+            line_height = 18
+            width = max(len(line) for line in lines) * 8 + 10
+            height = len(lines) * line_height + 8
+            cv2.rectangle(frame, (0, 0), (width, height), (0, 0, 0), -1)
+            
+            for i, line in enumerate(lines):
+                cv2.putText(frame, line, (5, (i + 1) * line_height),
+                           cv2.FONT_HERSHEY_SIMPLEX, 0.45, (0, 255, 255), 1)
             
             return frame
         except Exception as e:
-            print(f"Error drawing face rectangles: {e}")
+            print(f"Error drawing performance overlay: {e}")
             return frame
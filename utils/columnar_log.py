@@ -0,0 +1,268 @@
+"""
+Typed columnar session logs (Parquet or Arrow IPC) and a converter for old sessions
+
+Columns: timestamp_us (int64, epoch microseconds), time_elapsed (float64),
+emotion and model_used (dictionary-encoded strings), confidence (float32),
+face_count (int16). Event logs (see EmotionLogger log_mode) add duration
+(float32 seconds), frame_count (int32), confidence_min / confidence_max
+(float32) and reason (dictionary-encoded). Requires pyarrow.
+
+Usage:
+    python -m utils.columnar_log output/*.csv output/*.ndjson --format parquet
+"""
+import argparse
+import csv
+import glob
+import json
+import os
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+COLUMNAR_FORMATS = {'parquet': ".parquet", 'arrow': ".arrow"}
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+
+
+def get_schema(events: bool = False):
+    fields = [
+        ('timestamp_us', pa.int64()),
+        ('time_elapsed', pa.float64()),
+        ('emotion', pa.dictionary(pa.int32(), pa.string())),
+        ('confidence', pa.float32()),
+        ('model_used', pa.dictionary(pa.int32(), pa.string())),
+        ('face_count', pa.int16()),
+    ]
+    if events:
+        fields += [
+            ('duration', pa.float32()),
+            ('frame_count', pa.int32()),
+            ('confidence_min', pa.float32()),
+            ('confidence_max', pa.float32()),
+            ('reason', pa.dictionary(pa.int32(), pa.string())),
+        ]
+    return pa.schema(fields)
+
+
+def parse_timestamp_us(text: str) -> int:
+    """Log timestamp string (local time) to epoch microseconds"""
+    value = datetime.strptime(text, TIMESTAMP_FORMAT)
+    return int(round(value.timestamp() * 1_000_000))
+
+
+class _Dictionary:
+    """Append-only string dictionary shared by all row groups of one file"""
+
+    def __init__(self):
+        self.values: List[str] = []
+        self.index: Dict[str, int] = {}
+
+    def encode(self, value) -> int:
+        value = str(value)
+        code = self.index.get(value)
+        if code is None:
+            code = len(self.values)
+            self.index[value] = code
+            self.values.append(value)
+        return code
+
+    def to_array(self, codes: List[int]):
+        return pa.DictionaryArray.from_arrays(pa.array(codes, type=pa.int32()),
+                                              pa.array(self.values, type=pa.string()))
+
+
+class ColumnarSink:
+    """AsyncLogWriter sink buffering rows into typed columns
+
+    A row group (Parquet) or record batch (Arrow IPC) is written every
+    ``row_group_seconds`` (or ``row_group_rows`` rows, if set) and on close.
+    Dictionaries only grow, so Arrow IPC files use dictionary deltas.
+    """
+
+    def __init__(self, path: str, fmt: str = "parquet", row_group_seconds: float = 10.0,
+                 row_group_rows: int = 0, events: bool = False):
+        if not PYARROW_AVAILABLE:
+            raise RuntimeError("pyarrow chưa được cài đặt")
+        if fmt not in COLUMNAR_FORMATS:
+            raise ValueError(f"Định dạng không hỗ trợ: {fmt}")
+        self.path = path
+        self.fmt = fmt
+        self.row_group_seconds = row_group_seconds
+        self.row_group_rows = row_group_rows
+        self.events = events
+        self.schema = get_schema(events)
+        self.row_groups = 0
+        self._writer = None
+        self._sink = None
+        self._reset_buffers()
+        self._emotions = _Dictionary()
+        self._models = _Dictionary()
+        self._reasons = _Dictionary()
+        self._last_flush = 0.0
+
+    def _reset_buffers(self):
+        self._columns = {name: [] for name in self.schema.names}
+
+    def open(self):
+        if self.fmt == "parquet":
+            self._writer = pq.ParquetWriter(self.path, self.schema)
+        else:
+            self._sink = pa.OSFile(self.path, 'wb')
+            options = pa_ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+            self._writer = pa_ipc.new_file(self._sink, self.schema, options=options)
+        self._last_flush = time.monotonic()
+
+    def write_batch(self, rows: List[Dict]):
+        columns = self._columns
+        for row in rows:
+            columns['timestamp_us'].append(parse_timestamp_us(row['timestamp']))
+            columns['time_elapsed'].append(float(row['time_elapsed']))
+            columns['emotion'].append(self._emotions.encode(row['emotion']))
+            columns['confidence'].append(float(row['confidence']))
+            columns['model_used'].append(self._models.encode(row['model_used']))
+            columns['face_count'].append(int(row['face_count']))
+            if self.events:
+                columns['duration'].append(float(row['duration']))
+                columns['frame_count'].append(int(row['frame_count']))
+                columns['confidence_min'].append(float(row['confidence_min']))
+                columns['confidence_max'].append(float(row['confidence_max']))
+                columns['reason'].append(self._reasons.encode(row['reason']))
+
+        pending = len(columns['timestamp_us'])
+        if self.row_group_rows and pending >= self.row_group_rows:
+            self.flush()
+        elif self.row_group_seconds and time.monotonic() - self._last_flush >= self.row_group_seconds:
+            self.flush()
+
+    def flush(self):
+        """Write buffered rows as one row group / record batch"""
+        self._last_flush = time.monotonic()
+        columns = self._columns
+        if not columns['timestamp_us']:
+            return
+        arrays = [
+            pa.array(columns['timestamp_us'], type=pa.int64()),
+            pa.array(columns['time_elapsed'], type=pa.float64()),
+            self._emotions.to_array(columns['emotion']),
+            pa.array(columns['confidence'], type=pa.float32()),
+            self._models.to_array(columns['model_used']),
+            pa.array(columns['face_count'], type=pa.int16()),
+        ]
+        if self.events:
+            arrays += [
+                pa.array(columns['duration'], type=pa.float32()),
+                pa.array(columns['frame_count'], type=pa.int32()),
+                pa.array(columns['confidence_min'], type=pa.float32()),
+                pa.array(columns['confidence_max'], type=pa.float32()),
+                self._reasons.to_array(columns['reason']),
+            ]
+        batch = pa.record_batch(arrays, schema=self.schema)
+        self._writer.write_batch(batch)
+        self.row_groups += 1
+        self._reset_buffers()
+
+    def close(self):
+        if self._writer is None:
+            return
+        try:
+            self.flush()
+        finally:
+            self._writer.close()
+            if self._sink is not None:
+                self._sink.close()
+            self._writer = None
+            self._sink = None
+
+
+def read_columnar(path: str):
+    """Load a Parquet or Arrow IPC session file as a pyarrow Table"""
+    if not PYARROW_AVAILABLE:
+        raise RuntimeError("pyarrow chưa được cài đặt")
+    if path.endswith(COLUMNAR_FORMATS['arrow']):
+        with pa.memory_map(path, 'r') as source:
+            return pa_ipc.open_file(source).read_all()
+    return pq.read_table(path)
+
+
+def iter_session_rows(path: str) -> Iterator[Dict]:
+    """Records of an existing session file (.csv, .ndjson or the old .json)"""
+    if path.endswith(".csv"):
+        with open(path, newline='', encoding='utf-8') as f:
+            yield from csv.DictReader(f)
+    elif path.endswith(".ndjson"):
+        from .session_log import iter_records
+        yield from iter_records(path)
+    elif path.endswith(".json"):
+        with open(path, encoding='utf-8') as f:
+            yield from json.load(f).get('data', [])
+    else:
+        raise ValueError(f"Không nhận dạng được file session: {path}")
+
+
+def convert_session(path: str, output: Optional[str] = None, fmt: str = "parquet",
+                    row_group_rows: int = 65536) -> str:
+    """Convert one CSV/NDJSON/JSON session (per-frame or event rows) to a columnar file"""
+    if output is None:
+        output = os.path.splitext(path)[0] + COLUMNAR_FORMATS[fmt]
+    rows = iter_session_rows(path)
+    first = next(rows, None)
+    events = first is not None and bool(first.get('frame_count'))
+    sink = ColumnarSink(output, fmt, row_group_seconds=0, row_group_rows=row_group_rows, events=events)
+    sink.open()
+    try:
+        batch = [first] if first is not None else []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= 1024:
+                sink.write_batch(batch)
+                batch = []
+        if batch:
+            sink.write_batch(batch)
+    finally:
+        sink.close()
+    return output
+
+
+def expand_inputs(patterns: Iterable[str]) -> List[str]:
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern))
+        paths.extend(matches if matches else [pattern])
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert emotion session logs to Parquet / Arrow IPC")
+    parser.add_argument("inputs", nargs="+", help="Session files (.csv, .ndjson, .json) or glob patterns")
+    parser.add_argument("--format", choices=sorted(COLUMNAR_FORMATS), default="parquet")
+    parser.add_argument("--output-dir", help="Write converted files here (default: next to the input)")
+    args = parser.parse_args(argv)
+
+    if not PYARROW_AVAILABLE:
+        print("Cần cài đặt pyarrow: pip install pyarrow")
+        return 1
+
+    failed = 0
+    for path in expand_inputs(args.inputs):
+        output = None
+        if args.output_dir:
+            os.makedirs(args.output_dir, exist_ok=True)
+            name = os.path.splitext(os.path.basename(path))[0] + COLUMNAR_FORMATS[args.format]
+            output = os.path.join(args.output_dir, name)
+        try:
+            print(f"{path} -> {convert_session(path, output, args.format)}")
+        except Exception as e:
+            print(f"Lỗi chuyển đổi {path}: {e}")
+            failed += 1
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,149 @@
+"""
+Temporal smoothing of emotion results per tracked face
+"""
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from models.emotion_result import STATUS_OK, EmotionResult
+
+
+class _TrackState:
+    """Smoothed scores and the stable label of one tracked face"""
+
+    __slots__ = ('scores', 'label', 'candidate', 'candidate_since', 'last_seen')
+
+    def __init__(self, scores: np.ndarray, timestamp: float):
+        self.scores = scores.copy()
+        self.label = int(np.argmax(scores)) if scores.any() else -1
+        self.candidate = -1
+        self.candidate_since = timestamp
+        self.last_seen = timestamp
+
+
+class EmotionSmoother:
+    """EMA over each face's score vector, hysteresis and a minimum dwell time
+
+    A face's label changes only when another emotion's smoothed score beats
+    the current one by ``hysteresis`` for at least ``min_dwell`` seconds.
+    Frame-level status changes (faces lost or found, untracked labels) must
+    also last ``min_dwell``, so a face missed for a frame or two does not
+    flip the output. With several faces the result emotion follows one
+    primary track (the current one while it is visible, else the oldest
+    track), so the detector's face order does not matter; switching to
+    another primary track also has to last ``min_dwell``. update() reports whether the frame is a transition,
+    i.e. its stable (status, emotion) differs from the previous frame's.
+    """
+
+    def __init__(self, alpha: float = 0.4, hysteresis: float = 0.1, min_dwell: float = 0.5,
+                 track_timeout: float = 2.0):
+        self.alpha = alpha
+        self.hysteresis = hysteresis
+        self.min_dwell = min_dwell
+        self.track_timeout = track_timeout
+        self.transitions = 0
+        self.frames = 0
+        self.reset()
+
+    def reset(self):
+        self._tracks: Dict[int, _TrackState] = {}
+        self._stable: Optional[EmotionResult] = None
+        self._stable_track: Optional[int] = None  # Primary track of the stable result
+        self._candidate_key: Optional[Tuple[int, int]] = None
+        self._candidate_since = 0.0
+
+    def update(self, result: EmotionResult, track_ids: Optional[Sequence[int]],
+               timestamp: float) -> Tuple[EmotionResult, bool]:
+        """Smoothed result for one frame and whether it is a label transition"""
+        self.frames += 1
+        result, primary = self._smooth_faces(result, track_ids, timestamp)
+        key = (result.status, result.emotion)
+
+        if self._stable is None:
+            self._stable = result
+            self._stable_track = primary
+            self.transitions += 1
+            return result, True
+
+        stable_key = (self._stable.status, self._stable.emotion)
+        if key == stable_key:
+            self._candidate_key = None
+            self._stable = result
+            self._stable_track = primary
+            return result, False
+
+        # The primary track's label already dwelt; status changes (faces lost/found)
+        # and a new primary track dwell here
+        if key != self._candidate_key:
+            self._candidate_key = key
+            self._candidate_since = timestamp
+        settled = primary is not None and primary == self._stable_track and key[0] == stable_key[0]
+        if settled or timestamp - self._candidate_since >= self.min_dwell:
+            self._candidate_key = None
+            self._stable = result
+            self._stable_track = primary
+            self.transitions += 1
+            return result, True
+
+        # Not dwelt long enough: keep the previous label on the current boxes
+        held = EmotionResult(self._stable.status, self._stable.emotion, self._stable.confidence,
+                             result.boxes, result.scores)
+        return held, False
+
+    def _smooth_faces(self, result: EmotionResult, track_ids,
+                      timestamp: float) -> Tuple[EmotionResult, Optional[int]]:
+        """EMA + per-face hysteresis; the primary track's stable label becomes the result emotion
+
+        Returns the result and the primary track ID (None when no tracked face has a label).
+        """
+        primary = None
+        count = len(result.boxes)
+        if count and len(result.scores) == count and track_ids is not None and len(track_ids) == count:
+            smoothed = np.empty_like(result.scores)
+            labels = []
+            for row, track_id in enumerate(track_ids):
+                state = self._tracks.get(track_id)
+                if state is None:
+                    state = _TrackState(result.scores[row], timestamp)
+                    self._tracks[track_id] = state
+                else:
+                    state.scores += self.alpha * (result.scores[row] - state.scores)
+                    self._update_label(state, timestamp)
+                state.last_seen = timestamp
+                smoothed[row] = state.scores
+                labels.append(state.label)
+            labelled = {track_id: row for row, track_id in enumerate(track_ids) if labels[row] >= 0}
+            if result.status == STATUS_OK and labelled:
+                primary = self._stable_track if self._stable_track in labelled else min(labelled)  # IoUTracker IDs increase: lowest is oldest
+                row = labelled[primary]
+                result = EmotionResult(STATUS_OK, labels[row], float(smoothed[row, labels[row]]),
+                                       result.boxes, smoothed)
+
+        expired = [track_id for track_id, state in self._tracks.items()
+                   if timestamp - state.last_seen > self.track_timeout]
+        for track_id in expired:
+            del self._tracks[track_id]
+        return result, primary
+
+    def _update_label(self, state: _TrackState, timestamp: float):
+        scores = state.scores
+        best = int(np.argmax(scores))
+        if state.label < 0:
+            state.label = best if scores[best] > 0 else -1
+            return
+        if best == state.label or scores[best] - scores[state.label] < self.hysteresis:
+            state.candidate = -1
+            return
+        if best != state.candidate:
+            state.candidate = best
+            state.candidate_since = timestamp
+        if timestamp - state.candidate_since >= self.min_dwell:
+            state.label = best
+            state.candidate = -1
+
+    def get_stats(self) -> Dict:
+        return {
+            'frames': self.frames,
+            'transitions': self.transitions,
+            'tracks': len(self._tracks),
+        }
@@ -0,0 +1,88 @@
+"""
+Lightweight IoU tracker giving detected faces stable IDs across frames
+"""
+from typing import Dict, List
+
+import numpy as np
+
+
+def iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU of (N, 4) and (M, 4) x1, y1, x2, y2 boxes"""
+    if len(boxes_a) == 0 or len(boxes_b) == 0:
+        return np.zeros((len(boxes_a), len(boxes_b)), dtype=np.float32)
+    a = boxes_a[:, None, :].astype(np.float32)
+    b = boxes_b[None, :, :].astype(np.float32)
+    width = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    height = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    intersection = width * height
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    union = area_a + area_b - intersection
+    return np.where(union > 0, intersection / np.maximum(union, 1e-6), 0.0)
+
+
+class IoUTracker:
+    """Greedy IoU matching of each frame's boxes to the previous frame's tracks
+
+    A box that overlaps a live track by at least ``iou_threshold`` keeps its
+    ID; others start new tracks. Tracks unseen for more than ``max_missed``
+    frames are forgotten.
+    """
+
+    def __init__(self, iou_threshold: float = 0.3, max_missed: int = 10):
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self._next_id = 0
+        self._ids: List[int] = []
+        self._boxes = np.zeros((0, 4), dtype=np.float32)
+        self._missed: Dict[int, int] = {}
+
+    def reset(self):
+        self._next_id = 0
+        self._ids = []
+        self._boxes = np.zeros((0, 4), dtype=np.float32)
+        self._missed = {}
+
+    def update(self, faces) -> List[int]:
+        """Track IDs for this frame's (x1, y1, x2, y2) boxes, in the same order"""
+        boxes = np.asarray(faces, dtype=np.float32).reshape(-1, 4)
+        ids = [-1] * len(boxes)
+        overlap = iou_matrix(boxes, self._boxes)
+
+        # Best pairs first; each box and track is used once
+        if overlap.size:
+            order = np.argsort(overlap, axis=None)[::-1]
+            used_tracks = set()
+            for flat in order:
+                box_index, track_index = divmod(int(flat), overlap.shape[1])
+                if overlap[box_index, track_index] < self.iou_threshold:
+                    break
+                if ids[box_index] != -1 or track_index in used_tracks:
+                    continue
+                ids[box_index] = self._ids[track_index]
+                used_tracks.add(track_index)
+
+        for box_index, track_id in enumerate(ids):
+            if track_id == -1:
+                ids[box_index] = self._next_id
+                self._next_id += 1
+
+        # Keep unmatched tracks alive for a few frames (e.g. a missed detection)
+        seen = set(ids)
+        kept_ids, kept_boxes = list(ids), [boxes]
+        for track_id, box in zip(self._ids, self._boxes):
+            if track_id in seen:
+                continue
+            missed = self._missed.get(track_id, 0) + 1
+            if missed <= self.max_missed:
+                self._missed[track_id] = missed
+                kept_ids.append(track_id)
+                kept_boxes.append(box[None, :])
+            else:
+                self._missed.pop(track_id, None)
+        for track_id in ids:
+            self._missed.pop(track_id, None)
+
+        self._ids = kept_ids
+        self._boxes = np.concatenate(kept_boxes) if kept_boxes else np.zeros((0, 4), dtype=np.float32)
+        return ids
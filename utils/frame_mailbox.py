@@ -0,0 +1,66 @@
+"""
+Latest-value mailbox between worker threads and the Tk main loop
+"""
+import threading
+from typing import Any, Callable, Dict, Optional
+
+
+class FrameMailbox:
+    """Single-slot mailbox that always holds the most recent value
+
+    Producers overwrite the slot instead of queueing callbacks, so a slow
+    consumer (the Tk loop) never accumulates frames. Values overwritten before
+    being taken are counted as skipped and passed to ``on_discard`` (e.g. to
+    release a pooled frame buffer).
+    """
+
+    def __init__(self, on_discard: Optional[Callable] = None):
+        self.on_discard = on_discard
+        self._lock = threading.Lock()
+        self._value: Optional[Any] = None
+        self._has_value = False
+        self.posted = 0
+        self.taken = 0
+        self.skipped = 0
+
+    def post(self, value) -> bool:
+        """Store a value; returns False if it replaced one that was never taken"""
+        with self._lock:
+            replaced = self._has_value
+            discarded = self._value
+            if replaced:
+                self.skipped += 1
+            self._value = value
+            self._has_value = True
+            self.posted += 1
+        if replaced and self.on_discard:
+            self.on_discard(discarded)
+        return not replaced
+
+    def take(self):
+        """Return the latest value and empty the slot (None if nothing new)"""
+        with self._lock:
+            if not self._has_value:
+                return None
+            value = self._value
+            self._value = None
+            self._has_value = False
+            self.taken += 1
+            return value
+
+    def clear(self):
+        """Drop any pending value and reset counters"""
+        with self._lock:
+            pending = self._value if self._has_value else None
+            had_value = self._has_value
+            self._value = None
+            self._has_value = False
+            self.posted = 0
+            self.taken = 0
+            self.skipped = 0
+        if had_value and self.on_discard:
+            self.on_discard(pending)
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'posted': self.posted, 'taken': self.taken, 'skipped': self.skipped}
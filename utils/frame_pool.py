@@ -0,0 +1,106 @@
+"""
+Reusable, reference-counted frame buffers
+"""
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class PooledFrame:
+    """A preallocated frame buffer that returns to its pool when released
+
+    Every consumer that keeps the buffer beyond the call that handed it over
+    must retain() it and release() it when done. The buffer goes back to the
+    pool when the count drops to zero and must not be used after that.
+    """
+
+    __slots__ = ('array', '_pool', '_refs')
+
+    def __init__(self, array: np.ndarray, pool: 'FramePool'):
+        self.array = array
+        self._pool = pool
+        self._refs = 0
+
+    def retain(self) -> 'PooledFrame':
+        with self._pool._lock:
+            self._refs += 1
+        return self
+
+    def release(self):
+        with self._pool._lock:
+            self._refs -= 1
+            if self._refs > 0:
+                return
+            if self._refs < 0:
+                print("Frame buffer released too many times")
+                self._refs = 0
+                return
+        self._pool._recycle(self)
+
+    def get_refs(self) -> int:
+        return self._refs
+
+
+class FramePool:
+    """Small pool of same-shaped frame buffers
+
+    acquire() hands out a free buffer (reference count 1) or allocates a new
+    one if all are in use; released buffers are kept up to ``capacity``. When
+    the requested shape changes (new resolution) the old buffers are dropped.
+    """
+
+    def __init__(self, capacity: int = 4, name: str = "frames"):
+        self.capacity = max(1, capacity)
+        self.name = name
+        self._lock = threading.Lock()
+        self._free: List[PooledFrame] = []
+        self._shape: Optional[Tuple] = None
+        self._dtype = np.uint8
+        self.allocated = 0
+        self.reused = 0
+
+    def acquire(self, shape: tuple, dtype=np.uint8) -> PooledFrame:
+        """Get a buffer of the given shape with one reference held by the caller"""
+        shape = tuple(shape)
+        with self._lock:
+            if shape != self._shape or np.dtype(dtype) != self._dtype:
+                self._free.clear()
+                self._shape = shape
+                self._dtype = np.dtype(dtype)
+            if self._free:
+                buffer = self._free.pop()
+                self.reused += 1
+            else:
+                buffer = PooledFrame(np.empty(shape, dtype=dtype), self)
+                self.allocated += 1
+            buffer._refs = 1
+        return buffer
+
+    def adopt(self, array: np.ndarray) -> PooledFrame:
+        """Wrap an existing array (reference count 1); kept on release if it fits the pool"""
+        buffer = PooledFrame(array, self)
+        buffer._refs = 1
+        with self._lock:
+            if array.shape != self._shape or array.dtype != self._dtype:
+                self._free.clear()
+                self._shape = array.shape
+                self._dtype = array.dtype
+            self.allocated += 1
+        return buffer
+
+    def copy_from(self, frame: np.ndarray) -> PooledFrame:
+        """Pooled copy of a frame"""
+        buffer = self.acquire(frame.shape, frame.dtype)
+        np.copyto(buffer.array, frame)
+        return buffer
+
+    def _recycle(self, buffer: PooledFrame):
+        with self._lock:
+            if (buffer.array.shape == self._shape and buffer.array.dtype == self._dtype
+                    and len(self._free) < self.capacity):
+                self._free.append(buffer)
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'allocated': self.allocated, 'reused': self.reused, 'free': len(self._free)}
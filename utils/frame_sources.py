@@ -0,0 +1,547 @@
+"""
+Frame sources for camera devices, network streams, video files,
+image sequences and synthetic input
+"""
+import glob
+import os
+import platform
+import queue
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .frame_pool import FramePool, PooledFrame
+from .synthetic_video import SyntheticCapture
+
+VIDEO_FILE_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv', '.webm')
+IMAGE_FILE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+STREAM_PREFIXES = ('http://', 'https://', 'rtsp://', 'rtmp://')
+
+CAPTURE_PROPERTIES = {
+    'brightness': cv2.CAP_PROP_BRIGHTNESS,
+    'contrast': cv2.CAP_PROP_CONTRAST,
+    'saturation': cv2.CAP_PROP_SATURATION,
+    'hue': cv2.CAP_PROP_HUE,
+    'gain': cv2.CAP_PROP_GAIN,
+    'exposure': cv2.CAP_PROP_EXPOSURE,
+    'width': cv2.CAP_PROP_FRAME_WIDTH,
+    'height': cv2.CAP_PROP_FRAME_HEIGHT,
+    'fps': cv2.CAP_PROP_FPS,
+}
+
+
+def get_device_backends() -> list:
+    """OpenCV capture backends to try for local cameras on this platform"""
+    system = platform.system()
+    if system == "Windows":
+        return [cv2.CAP_DSHOW, cv2.CAP_MSMF, cv2.CAP_ANY]
+    if system == "Darwin":
+        return [cv2.CAP_AVFOUNDATION, cv2.CAP_ANY]
+    return [cv2.CAP_V4L2, cv2.CAP_ANY]
+
+
+class FrameSource(ABC):
+    """Abstract base class for anything that produces BGR frames"""
+
+    source_type = "unknown"
+
+    def __init__(self, realtime: bool = False):
+        # realtime: pace read() at the native FPS (files / image sequences)
+        self.realtime = realtime
+        self.frames_read = 0
+        self._decode_latency_ms = 0.0
+        self._next_deadline = None
+        self._pooled_shape = None
+
+    @abstractmethod
+    def open(self) -> bool:
+        """Open the source, returns True when frames can be read"""
+        pass
+
+    @abstractmethod
+    def _read_frame(self, image=None) -> Tuple[bool, Optional[np.ndarray]]:
+        """Read the next frame, optionally into a preallocated image"""
+        pass
+
+    @abstractmethod
+    def release(self):
+        """Release the underlying resources"""
+        pass
+
+    @abstractmethod
+    def is_opened(self) -> bool:
+        """Check if the source is open"""
+        pass
+
+    def read(self, image=None) -> Tuple[bool, Optional[np.ndarray]]:
+        """Read the next frame, tracking decode latency and pacing if realtime"""
+        start = time.perf_counter()
+        ret, frame = self._read_frame(image)
+        if ret:
+            self._record_decode_latency(time.perf_counter() - start)
+            self.frames_read += 1
+            if self.realtime:
+                self._pace()
+        return ret, frame
+
+    def read_pooled(self, pool: FramePool) -> Tuple[bool, Optional[PooledFrame]]:
+        """Read the next frame into a buffer from pool (caller owns one reference)
+
+        Once the frame shape is known, read(image) fills a recycled buffer so the
+        steady state allocates nothing. If the source returns a different array
+        (first frame, size change) that array is adopted by the pool instead.
+        """
+        buffer = pool.acquire(self._pooled_shape) if self._pooled_shape else None
+        ret, frame = self.read(buffer.array if buffer is not None else None)
+        if not ret or frame is None:
+            if buffer is not None:
+                buffer.release()
+            return False, None
+        if buffer is not None and frame is buffer.array:
+            return True, buffer
+        if buffer is not None:
+            buffer.release()
+        self._pooled_shape = frame.shape
+        return True, pool.adopt(frame)
+
+    def _record_decode_latency(self, seconds: float):
+        """Exponential moving average keeps this O(1) per frame"""
+        self._decode_latency_ms += 0.1 * (seconds * 1000.0 - self._decode_latency_ms)
+
+    def _pace(self):
+        """Sleep until the next frame is due at the native FPS"""
+        fps = self.get_native_fps()
+        if fps <= 0:
+            return
+        interval = 1.0 / fps
+        now = time.perf_counter()
+        if self._next_deadline is None:
+            self._next_deadline = now
+        delay = self._next_deadline - now
+        if delay > 0:
+            time.sleep(delay)
+        self._next_deadline = max(self._next_deadline, now - interval) + interval
+
+    def get_native_fps(self) -> float:
+        """Native frame rate reported by the source (0 if unknown)"""
+        return 0.0
+
+    def get_decode_latency_ms(self) -> float:
+        """Average time spent decoding one frame"""
+        return self._decode_latency_ms
+
+    def get_frame_size(self) -> Tuple[int, int]:
+        """Frame size as (width, height), (0, 0) if unknown"""
+        return 0, 0
+
+    def set_property(self, property_name: str, value: float) -> bool:
+        """Set a capture property, unsupported by default"""
+        return False
+
+    def get_info(self) -> dict:
+        """Get source information"""
+        width, height = self.get_frame_size()
+        return {
+            'type': self.source_type,
+            'width': width,
+            'height': height,
+            'fps': self.get_native_fps(),
+            'decode_latency_ms': round(self.get_decode_latency_ms(), 2),
+            'frames_read': self.frames_read,
+        }
+
+
+class CaptureSource(FrameSource):
+    """Frame source backed by cv2.VideoCapture"""
+
+    def __init__(self, target, backends=None):
+        super().__init__()
+        self.target = target
+        self.backends = backends or [cv2.CAP_ANY]
+        self.backend = None
+        self.cap: Optional[cv2.VideoCapture] = None
+
+    def _configure(self):
+        """Set capture properties after opening"""
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+    def open(self) -> bool:
+        for backend in self.backends:
+            try:
+                self.cap = cv2.VideoCapture(self.target, backend)
+                if self.cap.isOpened():
+                    self._configure()
+                    # Test reading a frame
+                    ret, frame = self.cap.read()
+                    if ret and frame is not None:
+                        self.backend = backend
+                        print(f"Opened {self.source_type} source: {self.target} with backend: {self.cap.getBackendName()}")
+                        return True
+                self.cap.release()
+                self.cap = None
+            except Exception as e:
+                print(f"Failed to open {self.target} with backend {backend}: {e}")
+                if self.cap:
+                    self.cap.release()
+                    self.cap = None
+        return False
+
+    def _read_frame(self, image=None):
+        if self.cap is None:
+            return False, None
+        return self.cap.read(image) if image is not None else self.cap.read()
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+    def is_opened(self) -> bool:
+        return self.cap is not None and self.cap.isOpened()
+
+    def get_native_fps(self) -> float:
+        return self.cap.get(cv2.CAP_PROP_FPS) if self.cap is not None else 0.0
+
+    def get_frame_size(self) -> Tuple[int, int]:
+        if self.cap is None:
+            return 0, 0
+        return int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+    def set_property(self, property_name: str, value: float) -> bool:
+        if self.cap is None or property_name not in CAPTURE_PROPERTIES:
+            return False
+        return self.cap.set(CAPTURE_PROPERTIES[property_name], value)
+
+    def get_info(self) -> dict:
+        info = super().get_info()
+        if self.cap is not None:
+            info.update({
+                'backend': self.cap.getBackendName(),
+                'brightness': self.cap.get(cv2.CAP_PROP_BRIGHTNESS),
+                'contrast': self.cap.get(cv2.CAP_PROP_CONTRAST),
+                'saturation': self.cap.get(cv2.CAP_PROP_SATURATION),
+            })
+        return info
+
+
+class DeviceSource(CaptureSource):
+    """Local camera (V4L2 on Linux, DirectShow/MSMF on Windows, AVFoundation on macOS)"""
+
+    source_type = "device"
+
+    def __init__(self, device, width: int = 640, height: int = 480, fps: float = 30):
+        super().__init__(device, get_device_backends())
+        self.requested_size = (width, height)
+        self.requested_fps = fps
+
+    def _configure(self):
+        super()._configure()
+        self.cap.set(cv2.CAP_PROP_FPS, self.requested_fps)
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.requested_size[0])
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.requested_size[1])
+
+
+class StreamSource(CaptureSource):
+    """RTSP / HTTP / RTMP network stream"""
+
+    source_type = "stream"
+
+    def __init__(self, url: str):
+        super().__init__(url, [cv2.CAP_FFMPEG, cv2.CAP_ANY])
+
+
+class ReadAheadSource(FrameSource):
+    """Frame source decoding on a background thread into a bounded queue
+
+    Subclasses implement _open_decoder, _decode_next and _close_decoder. When
+    realtime is True read() is paced at the native FPS, otherwise frames are
+    returned as fast as the decoder produces them. The decoder fills buffers
+    from its own FramePool; read_pooled() hands them to the consumer without
+    a copy.
+    """
+
+    def __init__(self, read_ahead: int = 8, realtime: bool = True):
+        super().__init__(realtime)
+        self.read_ahead = max(1, read_ahead)
+        self._queue: "queue.Queue" = queue.Queue(maxsize=self.read_ahead)
+        self._pool = FramePool(self.read_ahead + 4, f"{self.source_type}-decoder")
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self._finished = False
+
+    @abstractmethod
+    def _open_decoder(self) -> bool:
+        pass
+
+    @abstractmethod
+    def _decode_next(self, image=None) -> Optional[np.ndarray]:
+        """Decode one frame (into image when possible), None at end of input"""
+        pass
+
+    @abstractmethod
+    def _close_decoder(self):
+        pass
+
+    def open(self) -> bool:
+        if not self._open_decoder():
+            return False
+        self._running = True
+        self._finished = False
+        self._thread = threading.Thread(target=self._decode_loop, name=f"{self.source_type}-decoder", daemon=True)
+        self._thread.start()
+        return True
+
+    def _decode_loop(self):
+        """Decode frames ahead of the consumer"""
+        shape = None
+        while self._running:
+            start = time.perf_counter()
+            buffer = self._pool.acquire(shape) if shape else None
+            try:
+                frame = self._decode_next(buffer.array if buffer is not None else None)
+            except Exception as e:
+                print(f"Decode error: {e}")
+                frame = None
+
+            if frame is None:
+                if buffer is not None:
+                    buffer.release()
+                break
+            self._record_decode_latency(time.perf_counter() - start)
+            if buffer is None or frame is not buffer.array:
+                if buffer is not None:
+                    buffer.release()
+                buffer = self._pool.adopt(frame)
+                shape = frame.shape
+
+            while self._running:
+                try:
+                    self._queue.put(buffer, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+        self._finished = True
+
+    def _take_buffer(self) -> Optional[PooledFrame]:
+        """Next decoded buffer, None at end of input"""
+        while True:
+            try:
+                return self._queue.get(timeout=0.1)
+            except queue.Empty:
+                if self._finished or not self._running:
+                    return None
+
+    def _read_frame(self, image=None):
+        buffer = self._take_buffer()
+        if buffer is None:
+            return False, None
+
+        frame = buffer.array
+        if image is None or image.shape != frame.shape:
+            # No image or a new resolution: copy into a fresh array of the new shape
+            image = np.empty_like(frame)
+        np.copyto(image, frame)
+        buffer.release()  # Back to the decoder pool in every case
+        return True, image
+
+    def read(self, image=None) -> Tuple[bool, Optional[np.ndarray]]:
+        """Take a decoded frame; decode latency is measured on the decoder thread"""
+        ret, frame = self._read_frame(image)
+        if ret:
+            self._after_read()
+        return ret, frame
+
+    def read_pooled(self, pool: FramePool) -> Tuple[bool, Optional[PooledFrame]]:
+        """Hand over the decoder's buffer directly (it returns to the decoder pool on release)"""
+        buffer = self._take_buffer()
+        if buffer is None:
+            return False, None
+        self._after_read()
+        return True, buffer
+
+    def _after_read(self):
+        self.frames_read += 1
+        if self.realtime:
+            self._pace()
+
+    def get_queue_depth(self) -> int:
+        """Number of decoded frames waiting to be read"""
+        return self._queue.qsize()
+
+    def release(self):
+        self._running = False
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=2.0)
+        self._thread = None
+        self._close_decoder()
+
+    def is_opened(self) -> bool:
+        return self._running and not (self._finished and self._queue.empty())
+
+    def get_info(self) -> dict:
+        info = super().get_info()
+        info['read_ahead_depth'] = self.get_queue_depth()
+        return info
+
+
+class VideoFileSource(ReadAheadSource):
+    """Video file decoded on a separate thread with read-ahead"""
+
+    source_type = "file"
+
+    def __init__(self, path: str, read_ahead: int = 8, realtime: bool = True, loop: bool = False):
+        super().__init__(read_ahead, realtime)
+        self.path = path
+        self.loop = loop
+        self.cap: Optional[cv2.VideoCapture] = None
+        self._fps = 0.0
+        self._size = (0, 0)
+
+    def _open_decoder(self) -> bool:
+        self.cap = cv2.VideoCapture(self.path)
+        if not self.cap.isOpened():
+            self.cap.release()
+            self.cap = None
+            return False
+        self._fps = self.cap.get(cv2.CAP_PROP_FPS) or 0.0
+        self._size = (int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        print(f"Opened video file: {self.path} ({self._size[0]}x{self._size[1]} @ {self._fps:.1f}fps)")
+        return True
+
+    def _decode_next(self, image=None):
+        ret, frame = self.cap.read(image)
+        if not ret and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read(image)
+        return frame if ret else None
+
+    def _close_decoder(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+    def get_native_fps(self) -> float:
+        return self._fps
+
+    def get_frame_size(self) -> Tuple[int, int]:
+        return self._size
+
+
+class ImageSequenceSource(ReadAheadSource):
+    """Folder or glob pattern of still images played back as a stream"""
+
+    source_type = "images"
+
+    def __init__(self, pattern: str, fps: float = 30.0, read_ahead: int = 8,
+                 realtime: bool = True, loop: bool = False):
+        super().__init__(read_ahead, realtime)
+        self.pattern = pattern
+        self.fps = fps
+        self.loop = loop
+        self.paths = []
+        self._index = 0
+        self._size = (0, 0)
+
+    def _open_decoder(self) -> bool:
+        if os.path.isdir(self.pattern):
+            paths = []
+            for ext in IMAGE_FILE_EXTENSIONS:
+                paths.extend(glob.glob(os.path.join(self.pattern, f"*{ext}")))
+        else:
+            paths = glob.glob(self.pattern)
+        self.paths = sorted(paths)
+        self._index = 0
+        if not self.paths:
+            return False
+        first = cv2.imread(self.paths[0], cv2.IMREAD_COLOR)
+        if first is None:
+            return False
+        self._size = (first.shape[1], first.shape[0])
+        print(f"Opened image sequence: {self.pattern} ({len(self.paths)} images)")
+        return True
+
+    def _decode_next(self, image=None):
+        if self._index >= len(self.paths):
+            if not self.loop:
+                return None
+            self._index = 0
+        path = self.paths[self._index]
+        self._index += 1
+        return cv2.imread(path, cv2.IMREAD_COLOR)
+
+    def _close_decoder(self):
+        self.paths = []
+
+    def get_native_fps(self) -> float:
+        return self.fps
+
+    def get_frame_size(self) -> Tuple[int, int]:
+        return self._size
+
+
+class SyntheticSource(FrameSource):
+    """Generated faces from utils.synthetic_video"""
+
+    source_type = "synthetic"
+
+    def __init__(self, capture):
+        super().__init__()
+        self.capture = SyntheticCapture.from_url(capture) if isinstance(capture, str) else capture
+        # Pace here so render time is reported separately from the frame interval
+        self.realtime = self.capture.realtime
+        self.capture.realtime = False
+
+    def open(self) -> bool:
+        return self.capture.isOpened()
+
+    def _read_frame(self, image=None):
+        return self.capture.read(image)
+
+    def release(self):
+        self.capture.release()
+
+    def is_opened(self) -> bool:
+        return self.capture.isOpened()
+
+    def get_native_fps(self) -> float:
+        return self.capture.fps
+
+    def get_frame_size(self) -> Tuple[int, int]:
+        return self.capture.generator.width, self.capture.generator.height
+
+
+def create_frame_source(camera_input, realtime: bool = True) -> FrameSource:
+    """Create the matching frame source for a camera selection, path or URL"""
+    if isinstance(camera_input, FrameSource):
+        return camera_input
+    if isinstance(camera_input, SyntheticCapture):
+        return SyntheticSource(camera_input)
+    if isinstance(camera_input, int):
+        return DeviceSource(camera_input)
+
+    text = str(camera_input).strip()
+    if text.isdigit():
+        return DeviceSource(int(text))
+    if text.startswith('synthetic://'):
+        return SyntheticSource(text)
+    if text.startswith(STREAM_PREFIXES):
+        return StreamSource(text)
+    if text.startswith('/dev/video'):
+        return DeviceSource(text)
+    if text.lower().endswith(VIDEO_FILE_EXTENSIONS):
+        return VideoFileSource(text, realtime=realtime)
+    if os.path.isdir(text) or any(ch in text for ch in '*?[') or text.lower().endswith(IMAGE_FILE_EXTENSIONS):
+        return ImageSequenceSource(text, realtime=realtime)
+
+    # Try to extract number from string like "Camera 0"
+    match = re.search(r'(\d+)', text)
+    if match:
+        return DeviceSource(int(match.group(1)))
+
+    # Default to camera 0
+    return DeviceSource(0)
@@ -0,0 +1,175 @@
+"""
+Shared inference worker pool with fair round-robin scheduling across streams
+"""
+import threading
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+from .trace_recorder import get_tracer
+
+
+class InferencePool:
+    """Bounded pool of inference worker threads shared by several streams
+
+    Each stream gets its own small queue. When a stream's queue is full the
+    oldest pending frame is dropped, so a slow model never makes live video
+    fall behind. Workers take work from the streams in round-robin order so
+    one busy camera cannot starve the others.
+
+    Submitted items are owned by the pool: every item either reaches
+    result_callback or is passed to ``on_drop`` (dropped, discarded on stop
+    or failed), e.g. to release pooled frame buffers.
+    """
+
+    def __init__(self, infer_fn: Callable, result_callback: Callable,
+                 num_workers: int = 2, per_stream_capacity: int = 2, on_drop: Optional[Callable] = None):
+        self.infer_fn = infer_fn
+        self.result_callback = result_callback
+        self.on_drop = on_drop
+        self.num_workers = max(1, num_workers)
+        self.per_stream_capacity = max(1, per_stream_capacity)
+
+        self._queues: Dict[int, deque] = {}
+        self._order: List[int] = []
+        self._cursor = 0
+        self._pending = 0
+        self._dropped: Dict[int, int] = {}
+        self._condition = threading.Condition()
+        self._workers: List[threading.Thread] = []
+        self._running = False
+
+    def register_stream(self, stream_id: int):
+        """Create the queue for a stream"""
+        with self._condition:
+            if stream_id not in self._queues:
+                self._queues[stream_id] = deque()
+                self._dropped[stream_id] = 0
+                self._order.append(stream_id)
+
+    def unregister_stream(self, stream_id: int):
+        """Remove a stream and discard its pending frames"""
+        with self._condition:
+            pending = self._queues.pop(stream_id, None)
+            if pending is not None:
+                self._pending -= len(pending)
+                self._order.remove(stream_id)
+                self._cursor = 0
+        if pending:
+            self._discard(pending)
+
+    def start(self):
+        """Start worker threads"""
+        if self._running:
+            return
+        self._running = True
+        self._workers = [
+            threading.Thread(target=self._worker_loop, name=f"InferenceWorker-{i}", daemon=True)
+            for i in range(self.num_workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def stop(self, timeout: float = 2.0):
+        """Stop workers and drop pending work"""
+        with self._condition:
+            self._running = False
+            discarded = self._clear_queues()
+            self._condition.notify_all()
+        self._discard(discarded)
+        for worker in self._workers:
+            worker.join(timeout=timeout)
+        self._workers = []
+
+    def _clear_queues(self) -> list:
+        """Empty all stream queues, returns the removed items (caller holds the lock)"""
+        discarded = []
+        for pending in self._queues.values():
+            discarded.extend(pending)
+            pending.clear()
+        self._pending = 0
+        return discarded
+
+    def _discard(self, items):
+        """Hand items that will not reach result_callback to on_drop"""
+        if self.on_drop is None:
+            return
+        for item in items:
+            try:
+                self.on_drop(item)
+            except Exception as e:
+                print(f"Inference pool drop callback error: {e}")
+
+    def submit(self, stream_id: int, item) -> bool:
+        """Queue an item for a stream; returns False if it or an older item was dropped"""
+        with self._condition:
+            pending = self._queues.get(stream_id)
+            if pending is None or not self._running:
+                dropped = item
+            else:
+                dropped = None
+                if len(pending) >= self.per_stream_capacity:
+                    dropped = pending.popleft()
+                    self._pending -= 1
+                    self._dropped[stream_id] += 1
+
+                pending.append(item)
+                self._pending += 1
+                self._condition.notify()
+
+        if dropped is None:
+            return True
+        self._discard((dropped,))
+        return False
+
+    def _next_item(self):
+        """Pop the next item in round-robin order (caller holds the lock)"""
+        count = len(self._order)
+        for offset in range(count):
+            index = (self._cursor + offset) % count
+            stream_id = self._order[index]
+            pending = self._queues[stream_id]
+            if pending:
+                self._cursor = (index + 1) % count
+                self._pending -= 1
+                return stream_id, pending.popleft()
+        return None, None
+
+    def _worker_loop(self):
+        """Take items fairly across streams and run inference"""
+        tracer = get_tracer()
+        while True:
+            with self._condition:
+                while self._running and self._pending == 0:
+                    self._condition.wait()
+                if not self._running:
+                    return
+                stream_id, item = self._next_item()
+
+            if item is None:
+                continue
+
+            try:
+                with tracer.span("pool.inference", "inference", stream=stream_id):
+                    result = self.infer_fn(stream_id, item)
+            except Exception as e:
+                print(f"Inference worker error (stream {stream_id}): {e}")
+                self._discard((item,))
+                continue
+
+            try:
+                self.result_callback(stream_id, item, result)
+            except Exception as e:
+                print(f"Inference worker error (stream {stream_id}): {e}")
+
+    def get_queue_depths(self) -> Dict[int, int]:
+        """Pending items per stream"""
+        with self._condition:
+            return {stream_id: len(pending) for stream_id, pending in self._queues.items()}
+
+    def get_dropped_counts(self) -> Dict[int, int]:
+        """Frames dropped per stream because the pool was busy"""
+        with self._condition:
+            return dict(self._dropped)
+
+    def is_running(self) -> bool:
+        return self._running
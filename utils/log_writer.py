@@ -0,0 +1,229 @@
+"""
+Background writer for session logs: batches rows off the capture thread
+"""
+import csv
+import json
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+
+class CSVSink:
+    """Append rows to a CSV file kept open for the whole session"""
+
+    def __init__(self, path: str, fieldnames: List[str]):
+        self.path = path
+        self.fieldnames = fieldnames
+        self._file = None
+        self._writer = None
+
+    def open(self):
+        self._file = open(self.path, 'w', newline='', encoding='utf-8')
+        self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames)
+        self._writer.writeheader()
+        self._file.flush()
+
+    def write_batch(self, rows: List[Dict]):
+        self._writer.writerows(rows)
+        self._file.flush()
+
+    def close(self):
+        if self._file:
+            self._file.close()
+        self._file = None
+        self._writer = None
+
+
+class JSONLinesSink:
+    """Append rows as one compact JSON object per line"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def open(self):
+        self._file = open(self.path, 'w', encoding='utf-8')
+
+    def write_batch(self, rows: List[Dict]):
+        self._file.write(''.join(json.dumps(row, ensure_ascii=False) + '\n' for row in rows))
+        self._file.flush()
+
+    def write_line(self, value: Dict):
+        self._file.write(json.dumps(value, ensure_ascii=False) + '\n')
+        self._file.flush()
+
+    def close(self):
+        if self._file:
+            self._file.close()
+        self._file = None
+
+
+class NDJSONSessionSink(JSONLinesSink):
+    """Append-only session log: header, records, periodic checkpoints, footer
+
+    Records are plain objects; control lines carry a ``type`` key
+    ("header", "checkpoint", "footer"). Every batch is flushed, so a crash
+    loses at most the rows still queued and the last checkpoint bounds the
+    summary. See utils/session_log.py for the reader.
+    """
+
+    def __init__(self, path: str, header: Dict, checkpoint_fn: Optional[Callable] = None,
+                 checkpoint_interval: float = 60.0, footer_fn: Optional[Callable] = None):
+        super().__init__(path)
+        self.header = header
+        self.checkpoint_fn = checkpoint_fn
+        self.checkpoint_interval = checkpoint_interval
+        self.footer_fn = footer_fn
+        self.records_written = 0
+        self._last_checkpoint = 0.0
+
+    def open(self):
+        super().open()
+        self.records_written = 0
+        self._last_checkpoint = time.monotonic()
+        self.write_line({"type": "header", **self.header})
+
+    def write_batch(self, rows: List[Dict]):
+        super().write_batch(rows)
+        self.records_written += len(rows)
+        if self.checkpoint_fn and time.monotonic() - self._last_checkpoint >= self.checkpoint_interval:
+            self._last_checkpoint = time.monotonic()
+            self.write_line({"type": "checkpoint", **self.checkpoint_fn(), "records_written": self.records_written})
+
+    def close(self):
+        if self._file and self.footer_fn:
+            try:
+                self.write_line({"type": "footer", **self.footer_fn(), "records_written": self.records_written})
+            except Exception as e:
+                print(f"Lỗi ghi footer log: {e}")
+        super().close()
+
+
+class AsyncLogWriter:
+    """Bounded queue + one writer thread feeding one or more sinks
+
+    write() never blocks: when the queue is full the row is dropped and
+    counted. The writer thread hands rows to every sink in batches, flushing
+    when ``batch_size`` rows are waiting or ``flush_interval`` seconds have
+    passed since the last flush. close() drains the queue before returning.
+    Sinks provide open(), write_batch(rows) and close(). Rows are routed by
+    channel: a sink receives the rows of its ``channel`` attribute ("rows"
+    if unset), so e.g. binary face records share the thread with CSV rows.
+    ``formatters`` maps a channel to a function turning its queued values
+    into sink rows on the writer thread (once per batch, before the sinks).
+    """
+
+    def __init__(self, sinks: List, max_queue: int = 1000, batch_size: int = 50,
+                 flush_interval: float = 1.0, formatters: Optional[Dict[str, Callable]] = None):
+        self.sinks = list(sinks)
+        self.formatters = formatters or {}
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max(1, max_queue))
+        self._thread: Optional[threading.Thread] = None
+        self._stop = object()
+        self.written = 0
+        self.dropped = 0
+        self.dropped_by_channel: Dict[str, int] = {}
+        self.flushes = 0
+
+    def start(self) -> bool:
+        """Open all sinks and start the writer thread"""
+        opened = []
+        try:
+            for sink in self.sinks:
+                sink.open()
+                opened.append(sink)
+        except Exception as e:
+            print(f"Lỗi mở file log: {e}")
+            for sink in opened:
+                sink.close()
+            return False
+
+        self._thread = threading.Thread(target=self._run, name="LogWriter", daemon=True)
+        self._thread.start()
+        return True
+
+    def write(self, row, channel: str = "rows") -> bool:
+        """Queue a row; returns False (and counts it) if the queue is full
+
+        ``dropped`` counts the default "rows" channel only; every channel is
+        counted in ``dropped_by_channel``.
+        """
+        try:
+            self._queue.put_nowait((channel, row))
+            return True
+        except queue.Full:
+            if channel == "rows":
+                self.dropped += 1
+            self.dropped_by_channel[channel] = self.dropped_by_channel.get(channel, 0) + 1
+            return False
+
+    def close(self, timeout: float = 5.0):
+        """Flush everything still queued, then close the sinks"""
+        if self._thread is None:
+            return
+        self._queue.put(self._stop)
+        self._thread.join(timeout=timeout)
+        if self._thread.is_alive():
+            print("Warning: Log writer did not stop gracefully")
+        self._thread = None
+
+    def _run(self):
+        batch = []
+        last_flush = time.monotonic()
+        running = True
+        while running:
+            timeout = max(0.0, self.flush_interval - (time.monotonic() - last_flush))
+            try:
+                row = self._queue.get(timeout=timeout)
+                if row is self._stop:
+                    running = False
+                else:
+                    batch.append(row)
+            except queue.Empty:
+                pass
+
+            due = time.monotonic() - last_flush >= self.flush_interval
+            if batch and (len(batch) >= self.batch_size or due or not running):
+                self._flush(batch)
+                batch = []
+            if due or not batch:
+                last_flush = time.monotonic()
+
+        for sink in self.sinks:
+            try:
+                sink.close()
+            except Exception as e:
+                print(f"Lỗi đóng file log: {e}")
+
+    def _flush(self, batch: List):
+        channels: Dict[str, List] = {}
+        for channel, row in batch:
+            channels.setdefault(channel, []).append(row)
+        for channel, formatter in self.formatters.items():
+            if channel in channels:
+                try:
+                    channels[channel] = [formatter(row) for row in channels[channel]]
+                except Exception as e:
+                    print(f"Lỗi ghi log: {e}")
+                    channels.pop(channel)
+        for sink in self.sinks:
+            rows = channels.get(getattr(sink, 'channel', "rows"))
+            if not rows:
+                continue
+            try:
+                sink.write_batch(rows)
+            except Exception as e:
+                print(f"Lỗi ghi log: {e}")
+        self.written += len(batch)
+        self.flushes += 1
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            'queued': self._queue.qsize(),
+            'written': self.written,
+            'dropped': self.dropped,
+            'flushes': self.flushes,
+        }
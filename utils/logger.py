@@ -2,22 +2,118 @@
 Logger utility for emotion recognition sessions
 """
 import os
-import csv
-import json
+import threading
+import time
 from datetime import datetime
 from typing import List, Dict, Optional
 
+from .columnar_log import COLUMNAR_FORMATS, PYARROW_AVAILABLE, ColumnarSink
+from .face_records import FaceRecordSink, build_face_records
+from .log_writer import AsyncLogWriter, CSVSink, NDJSONSessionSink
+from .session_log import SESSION_LOG_VERSION, export_session_json
+from .session_store import SQLiteSink
+from .session_stats import SessionAggregator
+
+CSV_FIELDS = ['timestamp', 'time_elapsed', 'emotion', 'confidence', 'model_used', 'face_count']
+# Event rows: an interval starting at timestamp; confidence is the interval mean
+EVENT_FIELDS = CSV_FIELDS + ['duration', 'frame_count', 'confidence_min', 'confidence_max', 'reason']
+
+LOG_MODE_FRAMES = "frames"  # One row per logged frame
+LOG_MODE_EVENTS = "events"  # One row per interval of unchanged emotion / face count
+LOG_MODES = (LOG_MODE_FRAMES, LOG_MODE_EVENTS)
+
+
+class _EventInterval:
+    """Frames since the last event row (same emotion, model and face count)"""
+
+    __slots__ = ('start', 'time_elapsed', 'emotion', 'model_name', 'face_count',
+                 'frames', 'confidence_sum', 'confidence_min', 'confidence_max')
+
+    def __init__(self, start: float, time_elapsed: float, emotion: str, confidence: float,
+                 model_name: str, face_count: int):
+        self.start = start
+        self.time_elapsed = time_elapsed
+        self.emotion = emotion
+        self.model_name = model_name
+        self.face_count = face_count
+        self.frames = 1
+        self.confidence_sum = confidence
+        self.confidence_min = confidence
+        self.confidence_max = confidence
+
+    def add(self, confidence: float):
+        self.frames += 1
+        self.confidence_sum += confidence
+        if confidence < self.confidence_min:
+            self.confidence_min = confidence
+        elif confidence > self.confidence_max:
+            self.confidence_max = confidence
+
+    def to_entry(self, end: float, reason: str) -> tuple:
+        return (self.start, self.time_elapsed, self.emotion, self.confidence_sum / self.frames,
+                self.model_name, self.face_count, end - self.start, self.frames,
+                self.confidence_min, self.confidence_max, reason)
+
+
 class EmotionLogger:
-    """Logger for emotion recognition sessions"""
+    """Logger for emotion recognition sessions
+
+    Rows are written to disk by a background AsyncLogWriter: log_result() /
+    log_emotion() only queue a plain tuple, and the timestamp string and row
+    dict are built on the writer thread. Records are not kept in memory: a
+    SessionAggregator keeps the running summary, and the session is streamed
+    to an append-only NDJSON log (header, records, checkpoints, footer). The
+    old single-JSON layout is rebuilt on demand with export_json().
+    With columnar_format ("parquet" or "arrow", needs pyarrow) a typed
+    columnar copy of the records is written as well, and with sqlite_path
+    every session is also inserted into a shared SQLite store
+    (utils/session_store.py) for cross-session queries. With face_records
+    every frame's faces (box, track ID, score vector, stage latencies) are
+    appended to a compact binary file (utils/face_records.py).
+    In "frames" mode the pipeline passes transition=False for frames whose
+    smoothed label did not change: they only update the running summary.
+    In "events" mode every frame extends the open interval, and a row is
+    written only when the emotion, model or face count changes, or every
+    ``keyframe_interval`` seconds; each row covers an interval (duration,
+    frame_count, confidence mean/min/max, reason).
+    utils.session_log.expand_events turns it back into per-frame rows.
+    """
     
-    def __init__(self):
+    def __init__(self, max_queue: int = 1000, batch_size: int = 50, flush_interval: float = 1.0,
+                 checkpoint_interval: float = 60.0, columnar_format: Optional[str] = None,
+                 row_group_seconds: float = 10.0, sqlite_path: Optional[str] = None,
+                 face_records: bool = False, log_mode: str = LOG_MODE_FRAMES,
+                 keyframe_interval: float = 10.0):
         self.is_logging = False
-        self.log_data = []
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.checkpoint_interval = checkpoint_interval
+        self.columnar_format = columnar_format
+        self.row_group_seconds = row_group_seconds
+        self.sqlite_path = sqlite_path
+        self.face_records = face_records
+        if log_mode not in LOG_MODES:
+            print(f"Chế độ log không hỗ trợ: {log_mode}, dùng {LOG_MODE_FRAMES}")
+            log_mode = LOG_MODE_FRAMES
+        self.log_mode = log_mode
+        self.keyframe_interval = keyframe_interval
+        self._interval: Optional[_EventInterval] = None
+        self._event_lock = threading.Lock()
+        self.writer: Optional[AsyncLogWriter] = None
+        self.aggregator = SessionAggregator()
         self.session_start_time = None
+        self.session_end_time = None
+        self.session_name = ""
         self.output_folder = "output"
         self.csv_filename = ""
         self.json_filename = ""
+        self.ndjson_filename = ""
+        self.columnar_filename = ""
+        self.faces_filename = ""
         self.summary_filename = ""
+        self._clock_offset = 0.0
+        self._start_epoch = 0.0
         
         # Ensure output folder exists
         os.makedirs(self.output_folder, exist_ok=True)
@@ -31,19 +127,62 @@ class EmotionLogger:
                 timestamp = self.session_start_time.strftime("%Y%m%d_%H%M%S")
                 session_name = f"emotion_session_{timestamp}"
             
+            self.session_name = session_name
+            self.session_end_time = None
+            
             # Create file paths
             self.csv_filename = os.path.join(self.output_folder, f"{session_name}.csv")
             self.json_filename = os.path.join(self.output_folder, f"{session_name}.json")
+            self.ndjson_filename = os.path.join(self.output_folder, f"{session_name}.ndjson")
             self.summary_filename = os.path.join(self.output_folder, f"{session_name}_summary.txt")
             
-            # Initialize CSV file with headers
-            with open(self.csv_filename, 'w', newline='', encoding='utf-8') as csvfile:
-                fieldnames = ['timestamp', 'time_elapsed', 'emotion', 'confidence', 'model_used', 'face_count']
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                writer.writeheader()
+            # Open the CSV file (with headers) and the session log on the background writer
+            events = self.log_mode == LOG_MODE_EVENTS
+            fields = EVENT_FIELDS if events else CSV_FIELDS
+            header = {
+                'version': SESSION_LOG_VERSION,
+                'session': session_name,
+                'start_time': self.session_start_time.isoformat(),
+                'mode': self.log_mode,
+                'fields': fields
+            }
+            sinks = [
+                CSVSink(self.csv_filename, fields),
+                NDJSONSessionSink(self.ndjson_filename, header, self._checkpoint,
+                                  self.checkpoint_interval, self._footer)
+            ]
+            self.columnar_filename = ""
+            if self.columnar_format:
+                if not PYARROW_AVAILABLE:
+                    print("pyarrow chưa được cài đặt, bỏ qua file log dạng cột")
+                elif self.columnar_format not in COLUMNAR_FORMATS:
+                    print(f"Định dạng log không hỗ trợ: {self.columnar_format}")
+                else:
+                    self.columnar_filename = os.path.join(
+                        self.output_folder, session_name + COLUMNAR_FORMATS[self.columnar_format])
+                    sinks.append(ColumnarSink(self.columnar_filename, self.columnar_format,
+                                              self.row_group_seconds, events=events))
+            if self.sqlite_path:
+                sinks.append(SQLiteSink(self.sqlite_path, session_name, self.session_start_time, self._footer))
+            self.faces_filename = ""
+            if self.face_records:
+                self.faces_filename = os.path.join(self.output_folder, f"{session_name}.faces.bin")
+                sinks.append(FaceRecordSink(self.faces_filename, {
+                    'session': session_name,
+                    'start_time': self.session_start_time.isoformat()
+                }))
+            # Capture times come from time.perf_counter(); map them to epoch time
+            self._clock_offset = time.time() - time.perf_counter()
+            self._start_epoch = self.session_start_time.timestamp()
+            writer = AsyncLogWriter(sinks, self.max_queue, self.batch_size, self.flush_interval,
+                                    {'rows': self._format_event if events else self._format_row})
+            if not writer.start():
+                return False
+            self.writer = writer
             
             # Clear previous data
-            self.log_data = []
+            self.aggregator.reset()
+            self._interval = None
             self.is_logging = True
             
             print(f"Bắt đầu logging: {session_name}")
@@ -53,64 +192,114 @@ class EmotionLogger:
             print(f"Lỗi khởi tạo logger: {e}")
             return False
     
-    def log_emotion(self, emotion: str, confidence: float, model_name: str, face_count: int = 0):
+    def log_result(self, result, model_name: str, transition: bool = True):
+        """Log an EmotionResult; in frames mode transition=False only updates the running summary"""
+        self.log_emotion(result.label, result.confidence, model_name, result.face_count, transition)
+    
+    def log_emotion(self, emotion: str, confidence: float, model_name: str, face_count: int = 0,
+                    write_row: bool = True):
         """Log emotion detection result"""
         if not self.is_logging:
             return
         
         try:
-            current_time = datetime.now()
-            time_elapsed = (current_time - self.session_start_time).total_seconds()
-            
-            # Create log entry
-            log_entry = {
-                'timestamp': current_time.strftime('%Y-%m-%d %H:%M:%S.%f')[:-3],
-                'time_elapsed': round(time_elapsed, 3),
-                'emotion': emotion,
-                'confidence': round(confidence, 4),
-                'model_used': model_name,
-                'face_count': face_count
-            }
-            
-            # Add to in-memory data
-            self.log_data.append(log_entry)
+            now = time.time()
+            time_elapsed = now - self._start_epoch
             
-            # Append to CSV file
-            with open(self.csv_filename, 'a', newline='', encoding='utf-8') as csvfile:
-                fieldnames = ['timestamp', 'time_elapsed', 'emotion', 'confidence', 'model_used', 'face_count']
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                writer.writerow(log_entry)
+            # Queue for the writer thread (dropped and counted if it falls behind)
+            if self.log_mode == LOG_MODE_EVENTS:
+                self._log_event(now, time_elapsed, emotion, confidence, model_name, face_count)
+            else:
+                self.aggregator.update(emotion, confidence, model_name, time_elapsed)
+                if write_row:
+                    self.writer.write((now, time_elapsed, emotion, confidence, model_name, face_count))
             
         except Exception as e:
             print(f"Lỗi ghi log: {e}")
     
+    def _log_event(self, now: float, time_elapsed: float, emotion: str, confidence: float,
+                   model_name: str, face_count: int):
+        """Extend the current interval or close it and start a new one"""
+        with self._event_lock:
+            if not self.is_logging:
+                return  # stop_logging already closed the last interval
+            # Counted here so the summary matches the frames in the written intervals
+            self.aggregator.update(emotion, confidence, model_name, time_elapsed)
+            interval = self._interval
+            if interval is not None:
+                if emotion != interval.emotion or model_name != interval.model_name:
+                    reason = "change"
+                elif face_count != interval.face_count:
+                    reason = "faces"
+                elif now - interval.start >= self.keyframe_interval:
+                    reason = "keyframe"
+                else:
+                    interval.add(confidence)
+                    return
+                self.writer.write(interval.to_entry(now, reason))
+            self._interval = _EventInterval(now, time_elapsed, emotion, confidence, model_name, face_count)
+    
+    def _close_interval(self):
+        """Stop logging and write the open interval, ending now"""
+        with self._event_lock:
+            self.is_logging = False
+            if self._interval is not None:
+                self.writer.write(self._interval.to_entry(time.time(), "end"))
+            self._interval = None
+    
+    @staticmethod
+    def _format_row(entry) -> Dict:
+        """Queued log tuple to the CSV / session-log row (writer thread)"""
+        now, time_elapsed, emotion, confidence, model_name, face_count = entry
+        return {
+            'timestamp': datetime.fromtimestamp(now).strftime('%Y-%m-%d %H:%M:%S.%f')[:-3],
+            'time_elapsed': round(time_elapsed, 3),
+            'emotion': emotion,
+            'confidence': round(float(confidence), 4),
+            'model_used': model_name,
+            'face_count': int(face_count)
+        }
+    
+    @classmethod
+    def _format_event(cls, entry) -> Dict:
+        """Queued interval tuple to an event row (writer thread)"""
+        row = cls._format_row(entry[:6])
+        duration, frames, confidence_min, confidence_max, reason = entry[6:]
+        row['duration'] = round(duration, 3)
+        row['frame_count'] = frames
+        row['confidence_min'] = round(float(confidence_min), 4)
+        row['confidence_max'] = round(float(confidence_max), 4)
+        row['reason'] = reason
+        return row
+    
+    def log_faces(self, frame_index: int, capture_time: float, result, track_ids=None, timings=None):
+        """Queue one frame's per-face records (capture_time from time.perf_counter())"""
+        if not self.is_logging or not self.faces_filename:
+            return
+        
+        try:
+            capture_us = int(round((capture_time + self._clock_offset) * 1_000_000))
+            records = build_face_records(frame_index, capture_us, result.boxes, track_ids, result.scores,
+                                         timings if timings is not None else (0.0, 0.0, 0.0))
+            self.writer.write(records, channel="faces")
+            
+        except Exception as e:
+            print(f"Lỗi ghi face records: {e}")
+    
     def stop_logging(self) -> Dict:
         """Stop logging and generate summary"""
         if not self.is_logging:
             return {}
         
         try:
-            self.is_logging = False
-            session_end_time = datetime.now()
-            session_duration = (session_end_time - self.session_start_time).total_seconds()
-            
-            # Generate summary statistics
-            summary = self._generate_summary(session_duration)
+            # Under the event lock, so no log_emotion can open an interval after the close
+            self._close_interval()
+            self.session_end_time = datetime.now()
+            session_duration = (self.session_end_time - self.session_start_time).total_seconds()
             
-            # Save JSON data
-            session_data = {
-                'session_info': {
-                    'start_time': self.session_start_time.isoformat(),
-                    'end_time': session_end_time.isoformat(),
-                    'duration_seconds': session_duration,
-                    'total_records': len(self.log_data)
-                },
-                'summary': summary,
-                'data': self.log_data
-            }
-            
-            with open(self.json_filename, 'w', encoding='utf-8') as jsonfile:
-                json.dump(session_data, jsonfile, indent=2, ensure_ascii=False)
+            # Flush queued rows; the writer appends the footer with the final summary
+            self._close_writer()
+            summary = self.aggregator.get_summary(session_duration)
             
             # Save text summary
             self._save_text_summary(summary, session_duration)
@@ -122,53 +311,49 @@ class EmotionLogger:
             print(f"Lỗi dừng logger: {e}")
             return {}
     
-    def _generate_summary(self, duration: float) -> Dict:
-        """Generate session summary statistics"""
-        if not self.log_data:
-            return {}
-        
-        emotions = [entry['emotion'] for entry in self.log_data]
-        confidences = [entry['confidence'] for entry in self.log_data]
-        models = [entry['model_used'] for entry in self.log_data]
-        
-        # Emotion distribution
-        emotion_counts = {}
-        for emotion in emotions:
-            emotion_counts[emotion] = emotion_counts.get(emotion, 0) + 1
-        
-        emotion_percentages = {}
-        total_records = len(self.log_data)
-        for emotion, count in emotion_counts.items():
-            emotion_percentages[emotion] = round((count / total_records) * 100, 2)
-        
-        # Confidence statistics
-        avg_confidence = sum(confidences) / len(confidences)
-        max_confidence = max(confidences)
-        min_confidence = min(confidences)
-        
-        # Most common emotion
-        most_common_emotion = max(emotion_counts, key=emotion_counts.get)
-        
-        # Model usage
-        model_counts = {}
-        for model in models:
-            model_counts[model] = model_counts.get(model, 0) + 1
-        
+    def _close_writer(self):
+        """Flush queued rows to disk and report rows dropped during the session"""
+        if self.writer is None:
+            return
+        self.writer.close()
+        dropped = self.writer.dropped
+        if dropped:
+            print(f"Cảnh báo: {dropped} dòng log bị bỏ qua do hàng đợi ghi bị đầy")
+    
+    def get_dropped_rows(self) -> int:
+        """Rows not written to CSV because the writer queue was full"""
+        return self.writer.dropped if self.writer else 0
+    
+    def _checkpoint(self) -> Dict:
+        """Running summary written periodically into the session log (writer thread)"""
+        duration = (datetime.now() - self.session_start_time).total_seconds()
+        return {'time_elapsed': round(duration, 3), 'summary': self.aggregator.get_summary(duration)}
+    
+    def _footer(self) -> Dict:
+        """Final session info and summary appended on stop (writer thread)"""
+        end_time = self.session_end_time or datetime.now()
+        duration = (end_time - self.session_start_time).total_seconds()
         return {
-            'total_records': total_records,
-            'duration_minutes': round(duration / 60, 2),
-            'avg_records_per_minute': round(total_records / (duration / 60), 2),
-            'emotion_distribution': emotion_counts,
-            'emotion_percentages': emotion_percentages,
-            'most_common_emotion': most_common_emotion,
-            'confidence_stats': {
-                'average': round(avg_confidence, 4),
-                'maximum': round(max_confidence, 4),
-                'minimum': round(min_confidence, 4)
-            },
-            'model_usage': model_counts
+            'end_time': end_time.isoformat(),
+            'duration_seconds': duration,
+            'total_records': self.aggregator.total_records,
+            'dropped_rows': self.writer.dropped if self.writer else 0,
+            'summary': self.aggregator.get_summary(duration)
         }
     
+    def export_json(self, json_path: Optional[str] = None) -> Optional[str]:
+        """Rebuild the single-file JSON (session_info, summary, data) from the session log"""
+        if not self.ndjson_filename or not os.path.exists(self.ndjson_filename):
+            return None
+        return export_session_json(self.ndjson_filename, json_path or self.json_filename)
+    
+    def get_live_summary(self) -> Dict:
+        """Summary of the running session so far ({} if not logging)"""
+        if not self.is_logging:
+            return {}
+        duration = (datetime.now() - self.session_start_time).total_seconds()
+        return self.aggregator.get_summary(duration)
+    
     def _save_text_summary(self, summary: Dict, duration: float):
         """Save human-readable summary to text file"""
         try:
@@ -203,8 +388,15 @@ class EmotionLogger:
                     f.write(f"{model}: {count} lần\n")
                 
                 f.write(f"\n\nFiles được tạo:\n")
-                f.write(f"- CSV data: {os.path.basename(self.csv_filename)}\n")
-                f.write(f"- JSON data: {os.path.basename(self.json_filename)}\n")
+                mode = " (events)" if self.log_mode == LOG_MODE_EVENTS else ""
+                f.write(f"- CSV data{mode}: {os.path.basename(self.csv_filename)}\n")
+                f.write(f"- Session log (NDJSON): {os.path.basename(self.ndjson_filename)}\n")
+                if self.columnar_filename:
+                    f.write(f"- Columnar data: {os.path.basename(self.columnar_filename)}\n")
+                if self.sqlite_path:
+                    f.write(f"- Session database: {self.sqlite_path}\n")
+                if self.faces_filename:
+                    f.write(f"- Face records: {os.path.basename(self.faces_filename)}\n")
                 f.write(f"- Summary: {os.path.basename(self.summary_filename)}\n")
                 
         except Exception as e:
@@ -223,7 +415,8 @@ class EmotionLogger:
             'start_time': self.session_start_time.strftime('%H:%M:%S'),
             'duration_seconds': duration,
             'duration_formatted': f"{int(duration//60):02d}:{int(duration%60):02d}",
-            'records_count': len(self.log_data),
+            'records_count': self.aggregator.total_records,
+            'dropped_rows': self.get_dropped_rows(),
             'output_folder': self.output_folder
         }
     
@@ -0,0 +1,197 @@
+"""
+Performance monitor for the capture / inference / display pipeline
+"""
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = int(round(q / 100.0 * (len(sorted_values) - 1)))
+    return sorted_values[min(max(index, 0), len(sorted_values) - 1)]
+
+
+def get_process_rss_mb() -> float:
+    """Get resident set size of the current process in MB"""
+    try:
+        if PSUTIL_AVAILABLE:
+            return psutil.Process().memory_info().rss / (1024 * 1024)
+
+        # Linux fallback without psutil
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except Exception:
+        return 0.0
+
+
+def get_peak_rss_mb() -> float:
+    """Get peak resident set size of the current process in MB"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and in KB elsewhere
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        if PSUTIL_AVAILABLE:
+            memory_info = psutil.Process().memory_info()
+            return getattr(memory_info, 'peak_wset', memory_info.rss) / (1024 * 1024)
+        return get_process_rss_mb()
+
+
+class PerformanceMonitor:
+    """Collect FPS, latency, drop and queue statistics from pipeline threads
+
+    Recording is O(1) per event. Rates, percentiles and RSS are only computed
+    when a snapshot is older than ``refresh_interval`` seconds, so the HUD and
+    the control panel can poll freely without adding per-frame cost.
+    """
+
+    def __init__(self, window_size: int = 300, refresh_interval: float = 1.0):
+        self.window_size = window_size
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._tick_counts: Dict[str, int] = {}
+        self._latencies: Dict[str, deque] = {}
+        self._counters: Dict[str, int] = {}
+        self._queue_depths: Dict[str, int] = {}
+
+        self._last_tick_counts: Dict[str, int] = {}
+        self._snapshot: Dict = {}
+        self._snapshot_time = time.perf_counter()
+        self._overlay_lines: List[str] = []
+
+    def tick(self, name: str):
+        """Count one event of a rate (e.g. 'capture', 'inference')"""
+        with self._lock:
+            self._tick_counts[name] = self._tick_counts.get(name, 0) + 1
+
+    def record_latency(self, stage: str, seconds: float):
+        """Record the duration of one pipeline stage"""
+        with self._lock:
+            samples = self._latencies.get(stage)
+            if samples is None:
+                samples = deque(maxlen=self.window_size)
+                self._latencies[stage] = samples
+            samples.append(seconds * 1000.0)
+
+    @contextmanager
+    def measure(self, stage: str):
+        """Context manager recording the latency of a block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_latency(stage, time.perf_counter() - start)
+
+    def add_count(self, name: str, amount: int = 1):
+        """Increase a cumulative counter (e.g. dropped frames)"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def set_queue_depth(self, name: str, depth: int):
+        """Set the current depth of a named queue"""
+        with self._lock:
+            self._queue_depths[name] = depth
+
+    def adjust_queue_depth(self, name: str, delta: int):
+        """Change the depth of a named queue by delta"""
+        with self._lock:
+            self._queue_depths[name] = max(0, self._queue_depths.get(name, 0) + delta)
+
+    def get_snapshot(self, force: bool = False) -> Dict:
+        """Get aggregated statistics, recomputed at most once per refresh interval"""
+        now = time.perf_counter()
+        with self._lock:
+            elapsed = now - self._snapshot_time
+            if not force and self._snapshot and elapsed < self.refresh_interval:
+                return self._snapshot
+
+            rates = {}
+            for name, count in self._tick_counts.items():
+                previous = self._last_tick_counts.get(name, 0)
+                rates[name] = (count - previous) / elapsed if elapsed > 0 else 0.0
+            self._last_tick_counts = dict(self._tick_counts)
+
+            latencies = {}
+            for stage, samples in self._latencies.items():
+                ordered = sorted(samples)
+                latencies[stage] = {
+                    'p50': percentile(ordered, 50),
+                    'p95': percentile(ordered, 95),
+                    'p99': percentile(ordered, 99),
+                }
+
+            counters = dict(self._counters)
+            queue_depths = dict(self._queue_depths)
+            self._snapshot_time = now
+
+        snapshot = {
+            'fps': rates,
+            'latency_ms': latencies,
+            'counters': counters,
+            'queue_depths': queue_depths,
+            'rss_mb': get_process_rss_mb(),
+        }
+        lines = self.format_lines(snapshot)
+
+        with self._lock:
+            self._snapshot = snapshot
+            self._overlay_lines = lines
+        return snapshot
+
+    def get_overlay_lines(self) -> List[str]:
+        """Get HUD text lines, refreshing the snapshot only when stale"""
+        self.get_snapshot()
+        return self._overlay_lines
+
+    @staticmethod
+    def format_lines(snapshot: Dict) -> List[str]:
+        """Format a snapshot as short human-readable lines"""
+        fps = snapshot.get('fps', {})
+        counters = snapshot.get('counters', {})
+        lines = [
+            f"Capture: {fps.get('capture', 0.0):.1f} FPS  "
+            f"Infer: {fps.get('inference', 0.0):.1f} FPS",
+            f"Dropped: {counters.get('dropped', 0)}  "
+            f"Skipped: {counters.get('display_skipped', 0)}  "
+            f"RSS: {snapshot.get('rss_mb', 0.0):.0f} MB",
+        ]
+
+        for stage, stats in snapshot.get('latency_ms', {}).items():
+            lines.append(
+                f"{stage}: p50 {stats['p50']:.1f} / p95 {stats['p95']:.1f} / "
+                f"p99 {stats['p99']:.1f} ms"
+            )
+
+        queue_depths = snapshot.get('queue_depths', {})
+        if queue_depths:
+            queues = "  ".join(f"{name}={depth}" for name, depth in queue_depths.items())
+            lines.append(f"Queues: {queues}")
+
+        return lines
+
+    def reset(self):
+        """Clear all collected statistics"""
+        with self._lock:
+            self._tick_counts.clear()
+            self._last_tick_counts.clear()
+            self._latencies.clear()
+            self._counters.clear()
+            self._queue_depths.clear()
+            self._snapshot = {}
+            self._overlay_lines = []
+            self._snapshot_time = time.perf_counter()
@@ -0,0 +1,492 @@
+"""
+Asyncio pipeline core: source -> inference -> sinks over bounded queues
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from models.emotion_result import PENDING_RESULT, EmotionResult
+from .frame_pool import FramePool, PooledFrame
+from .resolution import crop_faces, resize_for_inference
+from .trace_recorder import get_tracer
+
+# Backpressure policies for BoundedQueue
+DROP_OLDEST = "drop_oldest"  # Full queue discards its oldest item (live video)
+BLOCK = "block"  # Producer waits for room (recording, logging)
+SAMPLE = "sample"  # Only every Nth item is queued, oldest dropped when full
+QUEUE_POLICIES = (DROP_OLDEST, BLOCK, SAMPLE)
+
+# Per-packet stage latencies, in FramePacket.timings order
+TIMING_STAGES = ('capture', 'inference', 'annotate')
+
+
+class FramePacket:
+    """One frame travelling through the pipeline
+
+    ``frame`` stays at capture resolution; ``result`` (an EmotionResult)
+    has its boxes in those coordinates even when inference ran on a smaller
+    copy. ``frame`` and ``annotated`` live in pooled buffers
+    (``frame_buffer``, ``annotated_buffer``): the pipeline holds one
+    reference per queue that holds the packet and releases it after the
+    stage/sink ran or the packet was dropped. ``track_ids`` holds the
+    tracker's IDs, ``timings`` milliseconds per TIMING_STAGES and
+    ``transition`` whether the (smoothed) label changed with this frame.
+    """
+
+    __slots__ = ('index', 'frame', 'capture_time', 'result', 'annotated',
+                 'frame_buffer', 'annotated_buffer', 'track_ids', 'timings', 'transition')
+
+    def __init__(self, index: int, frame, capture_time: float, frame_buffer: Optional[PooledFrame] = None):
+        self.index = index
+        self.frame = frame
+        self.frame_buffer = frame_buffer
+        self.capture_time = capture_time
+        self.result = PENDING_RESULT
+        self.annotated = frame
+        self.annotated_buffer = None
+        self.track_ids = None
+        self.timings = [0.0] * len(TIMING_STAGES)
+        self.transition = False
+
+    @property
+    def emotion(self) -> str:
+        return self.result.label
+
+    @property
+    def confidence(self) -> float:
+        return self.result.confidence
+
+    @property
+    def faces(self):
+        """(faces, 4) int32 boxes at capture resolution"""
+        return self.result.boxes
+
+    def retain(self):
+        """Take a reference on the pooled frame buffers"""
+        if self.frame_buffer is not None:
+            self.frame_buffer.retain()
+        if self.annotated_buffer is not None:
+            self.annotated_buffer.retain()
+
+    def release(self):
+        """Drop a reference on the pooled frame buffers"""
+        if self.frame_buffer is not None:
+            self.frame_buffer.release()
+        if self.annotated_buffer is not None:
+            self.annotated_buffer.release()
+
+    def face_crops(self, margin: float = 0.0) -> list:
+        """Full-resolution crops of the detected faces"""
+        return crop_faces(self.frame, self.faces, margin)
+
+
+class BoundedQueue:
+    """asyncio queue with an explicit backpressure policy
+
+    Must be created inside the event loop that uses it. get() returns None
+    once the queue is closed and drained.
+    """
+
+    def __init__(self, name: str, maxsize: int = 2, policy: str = DROP_OLDEST, sample_every: int = 1,
+                 on_drop: Optional[Callable] = None):
+        if policy not in QUEUE_POLICIES:
+            raise ValueError(f"Policy không hợp lệ: {policy}")
+        self.name = name
+        self.maxsize = max(1, maxsize)
+        self.policy = policy
+        self.sample_every = max(1, sample_every)
+        self.on_drop = on_drop
+        self.put_count = 0
+        self.dropped = 0
+        self.skipped = 0
+        self._items = deque()
+        self._closed = False
+        self._condition = asyncio.Condition()
+
+    async def put(self, item) -> bool:
+        """Queue an item according to the policy; False if it was not queued"""
+        async with self._condition:
+            self.put_count += 1
+            if self._closed:
+                return False
+            if self.policy == SAMPLE and (self.put_count - 1) % self.sample_every:
+                self.skipped += 1
+                return False
+
+            if len(self._items) >= self.maxsize:
+                if self.policy == BLOCK:
+                    while len(self._items) >= self.maxsize and not self._closed:
+                        await self._condition.wait()
+                    if self._closed:
+                        return False
+                else:
+                    self._drop(self._items.popleft())
+
+            self._items.append(item)
+            self._condition.notify_all()
+            return True
+
+    async def get(self):
+        """Next item, or None when closed and empty"""
+        async with self._condition:
+            while not self._items and not self._closed:
+                await self._condition.wait()
+            if not self._items:
+                return None
+            item = self._items.popleft()
+            self._condition.notify_all()
+            return item
+
+    async def close(self, discard: bool = False):
+        """Stop accepting items; pending ones are still delivered unless discarded"""
+        async with self._condition:
+            self._closed = True
+            if discard:
+                while self._items:
+                    self._drop(self._items.popleft())
+            self._condition.notify_all()
+
+    def _drop(self, item):
+        self.dropped += 1
+        if self.on_drop:
+            self.on_drop(item)
+
+    def qsize(self) -> int:
+        return len(self._items)
+
+    def get_stats(self) -> Dict:
+        return {
+            'policy': self.policy,
+            'depth': len(self._items),
+            'maxsize': self.maxsize,
+            'put': self.put_count,
+            'dropped': self.dropped,
+            'skipped': self.skipped,
+        }
+
+
+class Pipeline:
+    """Frame pipeline connecting a FrameSource, an inference stage and sinks
+
+    The event loop runs in its own thread (start) or in the caller's (run).
+    Blocking work - reading frames, inference, writing video/logs - runs in
+    executors so the loop only moves packets between bounded queues:
+
+        source -> [inference queue] -> inference workers -> [sink queue] -> sink
+
+    Every sink has its own queue and policy, so a slow recorder can apply
+    backpressure (block) while the display keeps only the newest frame
+    (drop_oldest) and a logger can take a subset (sample).
+
+    infer_fn returns an EmotionResult (a detector's (emotion, confidence,
+    faces) tuple is converted). An optional tracker (update(faces) -> ids)
+    assigns track IDs and an optional smoother (EmotionSmoother) filters
+    the result per track before annotation, in frame-completion order.
+    Sinks added with transitions_only only receive packets whose label
+    changed.
+    """
+
+    def __init__(self, source, infer_fn: Callable, annotate_fn: Optional[Callable] = None,
+                 inference_size: Optional[Tuple[int, int]] = None, max_fps: float = 0.0,
+                 inference_workers: int = 1, inference_queue: Optional[Dict] = None,
+                 perf_monitor=None, max_frames: int = 0, capture_pool_size: int = 8, tracker=None,
+                 smoother=None):
+        self.source = source
+        self.infer_fn = infer_fn
+        self.annotate_fn = annotate_fn
+        self.inference_size = inference_size
+        self.max_fps = max_fps
+        self.inference_workers = max(1, inference_workers)
+        self.inference_queue_options = inference_queue or {'maxsize': 2, 'policy': DROP_OLDEST}
+        self.perf_monitor = perf_monitor
+        self.max_frames = max_frames
+        self.tracker = tracker
+        self.smoother = smoother
+        self._track_lock = threading.Lock()
+        self._last_key = None
+        self.capture_pool = FramePool(capture_pool_size, "capture")
+        self._resize_buffers = threading.local()
+
+        self.sinks: List[Dict] = []
+        self.frames_read = 0
+        self.frames_processed = 0
+        self._queues: Dict[str, BoundedQueue] = {}
+        self._executors: List[ThreadPoolExecutor] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop_requested = False
+        self._discard_on_stop = False
+        self._running = False
+
+    def add_sink(self, name: str, fn: Callable, maxsize: int = 4, policy: str = DROP_OLDEST,
+                 sample_every: int = 1, blocking: bool = True, transitions_only: bool = False):
+        """Attach a sink; fn(packet) runs in its own thread when blocking, else on the loop"""
+        if policy not in QUEUE_POLICIES:
+            raise ValueError(f"Policy không hợp lệ: {policy}")
+        self.sinks.append({
+            'name': name,
+            'fn': fn,
+            'maxsize': maxsize,
+            'policy': policy,
+            'sample_every': sample_every,
+            'blocking': blocking,
+            'transitions_only': transitions_only,
+        })
+
+    def start(self) -> bool:
+        """Run the pipeline on a background event-loop thread"""
+        if self._running:
+            return False
+        self._running = True
+        self._thread = threading.Thread(target=self.run, name="PipelineLoop", daemon=True)
+        self._thread.start()
+        return True
+
+    def run(self):
+        """Run the pipeline in the calling thread until the source ends or stop()"""
+        self._running = True
+        self._stop_requested = False
+        try:
+            asyncio.run(self._main())
+        except Exception as e:
+            print(f"Pipeline error: {e}")
+        finally:
+            self._running = False
+            self._loop = None
+
+    def stop(self, drain: bool = False, timeout: float = 3.0):
+        """Ask the source to stop; pending packets are flushed to sinks if drain"""
+        self._stop_requested = True
+        self._discard_on_stop = not drain
+        loop = self._loop
+        if loop is not None and self._queues:
+            try:
+                asyncio.run_coroutine_threadsafe(self._close_queues(), loop)
+            except RuntimeError:
+                pass
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=timeout)
+            if self._thread.is_alive():
+                print("Warning: Pipeline thread did not stop gracefully")
+        self._thread = None
+
+    def is_running(self) -> bool:
+        return self._running
+
+    def get_stats(self) -> Dict:
+        """Frame counters and per-queue depth / drop statistics"""
+        stats = {
+            'frames_read': self.frames_read,
+            'frames_processed': self.frames_processed,
+            'queues': {name: q.get_stats() for name, q in list(self._queues.items())},
+        }
+        if self.smoother is not None:
+            stats['smoothing'] = self.smoother.get_stats()
+        return stats
+
+    async def _close_queues(self):
+        """Wake blocked producers/consumers when stopping without drain"""
+        if self._discard_on_stop:
+            for q in list(self._queues.values()):
+                await q.close(discard=True)
+
+    async def _main(self):
+        """Create queues and executors inside the loop, then run all stages"""
+        self._loop = asyncio.get_running_loop()
+        self._queues = {
+            'inference': BoundedQueue('inference', on_drop=FramePacket.release, **self.inference_queue_options)
+        }
+        for sink in self.sinks:
+            self._queues[sink['name']] = BoundedQueue(
+                sink['name'], sink['maxsize'], sink['policy'], sink['sample_every'], on_drop=FramePacket.release
+            )
+
+        capture_executor = ThreadPoolExecutor(1, thread_name_prefix="PipelineCapture")
+        inference_executor = ThreadPoolExecutor(self.inference_workers, thread_name_prefix="PipelineInference")
+        self._executors = [capture_executor, inference_executor]
+
+        sink_tasks = []
+        for sink in self.sinks:
+            executor = None
+            if sink['blocking']:
+                executor = ThreadPoolExecutor(1, thread_name_prefix=f"PipelineSink-{sink['name']}")
+                self._executors.append(executor)
+            sink_tasks.append(asyncio.ensure_future(self._sink_loop(sink, executor)))
+
+        inference_tasks = [
+            asyncio.ensure_future(self._inference_loop(inference_executor))
+            for _ in range(self.inference_workers)
+        ]
+
+        try:
+            await self._source_loop(capture_executor)
+            await self._queues['inference'].close(discard=self._discard_on_stop)
+            await asyncio.gather(*inference_tasks)
+            for sink in self.sinks:
+                await self._queues[sink['name']].close(discard=self._discard_on_stop)
+            await asyncio.gather(*sink_tasks)
+        finally:
+            for executor in self._executors:
+                executor.shutdown(wait=True)
+            self._executors = []
+            print(f"Pipeline stopped. Read {self.frames_read}, processed {self.frames_processed} frames.")
+
+    def _read_frame(self, index: int) -> Optional[PooledFrame]:
+        """Read one frame at capture resolution into a recycled buffer (capture thread)"""
+        tracer = get_tracer()
+        tracer.set_frame(index)
+        with tracer.span("capture.read", "capture"):
+            ret, buffer = self.source.read_pooled(self.capture_pool)
+        return buffer if ret else None
+
+    async def _source_loop(self, executor):
+        """Read frames until the source ends, stop() or max_frames"""
+        loop = asyncio.get_running_loop()
+        inference_queue = self._queues['inference']
+        last_error_time = 0
+        error_count = 0
+
+        while not self._stop_requested:
+            if not self.source or not self.source.is_opened():
+                print("Camera connection lost or end of input")
+                break
+            if self.max_frames and self.frames_read >= self.max_frames:
+                break
+
+            read_start = time.perf_counter()
+            try:
+                frame = await loop.run_in_executor(executor, self._read_frame, self.frames_read)
+            except Exception as e:
+                print(f"Error reading frame: {e}")
+                frame = None
+
+            if frame is None:
+                if self.perf_monitor:
+                    self.perf_monitor.add_count('dropped')
+                current_time = time.time()
+                if current_time - last_error_time > 1.0:
+                    error_count = 0
+                error_count += 1
+                last_error_time = current_time
+                if error_count > 5:
+                    print("Too many camera read errors, stopping stream")
+                    break
+                await asyncio.sleep(0.1)
+                continue
+
+            error_count = 0
+            read_time = time.perf_counter() - read_start
+            if self.perf_monitor:
+                self.perf_monitor.record_latency('capture', read_time)
+                self.perf_monitor.tick('capture')
+                if hasattr(self.source, 'get_queue_depth'):
+                    self.perf_monitor.set_queue_depth('read_ahead', self.source.get_queue_depth())
+
+            packet = FramePacket(self.frames_read, frame.array, read_start, frame_buffer=frame)
+            packet.timings[0] = read_time * 1000
+            if not await inference_queue.put(packet):
+                packet.release()
+            self.frames_read += 1
+            self._update_queue_stats(inference_queue)
+
+            # Cap the frame rate without adding a fixed delay
+            if self.max_fps > 0:
+                remaining = 1.0 / self.max_fps - (time.perf_counter() - read_start)
+                if remaining > 0:
+                    await asyncio.sleep(remaining)
+
+    def _process_packet(self, packet: FramePacket) -> FramePacket:
+        """Inference and annotation for one packet (inference thread)"""
+        tracer = get_tracer()
+        tracer.set_frame(packet.index)
+        inference_start = time.perf_counter()
+        with tracer.span("inference.resize", "inference"):
+            small, scale_x, scale_y = resize_for_inference(
+                packet.frame, self.inference_size, getattr(self._resize_buffers, 'buffer', None)
+            )
+            if small is not packet.frame:
+                self._resize_buffers.buffer = small
+        result = self.infer_fn(small)
+        if not isinstance(result, EmotionResult):
+            result = EmotionResult.from_legacy(*result)
+        packet.result = result.scaled(scale_x, scale_y, packet.frame.shape)
+        self._track(packet)
+        annotate_start = time.perf_counter()
+        packet.timings[1] = (annotate_start - inference_start) * 1000
+        if self.annotate_fn:
+            annotated = self.annotate_fn(packet)
+            if isinstance(annotated, PooledFrame):
+                packet.annotated_buffer = annotated
+                packet.annotated = annotated.array
+            else:
+                packet.annotated = annotated
+            packet.timings[2] = (time.perf_counter() - annotate_start) * 1000
+        return packet
+
+    def _track(self, packet: FramePacket):
+        """Track IDs, temporal smoothing and the transition flag (one packet at a time)"""
+        with self._track_lock:
+            if self.tracker is not None:
+                packet.track_ids = self.tracker.update(packet.result.boxes)
+            if self.smoother is not None:
+                packet.result, packet.transition = self.smoother.update(
+                    packet.result, packet.track_ids, packet.capture_time)
+            else:
+                key = (packet.result.status, packet.result.emotion)
+                packet.transition = key != self._last_key
+                self._last_key = key
+
+    async def _inference_loop(self, executor):
+        """Take packets from the inference queue and fan results out to sinks"""
+        loop = asyncio.get_running_loop()
+        inference_queue = self._queues['inference']
+        while True:
+            packet = await inference_queue.get()
+            if packet is None:
+                return
+            self._update_queue_stats(inference_queue)
+            try:
+                packet = await loop.run_in_executor(executor, self._process_packet, packet)
+            except Exception as e:
+                print(f"Pipeline inference error: {e}")
+                packet.release()
+                continue
+
+            # Hand one reference to every sink queue, then drop the annotate stage's own
+            self.frames_processed += 1
+            for sink in self.sinks:
+                if sink['transitions_only'] and not packet.transition:
+                    continue
+                sink_queue = self._queues[sink['name']]
+                packet.retain()
+                if not await sink_queue.put(packet):
+                    packet.release()
+                self._update_queue_stats(sink_queue)
+            packet.release()
+
+    async def _sink_loop(self, sink: Dict, executor):
+        """Deliver packets to one sink"""
+        loop = asyncio.get_running_loop()
+        sink_queue = self._queues[sink['name']]
+        while True:
+            packet = await sink_queue.get()
+            if packet is None:
+                return
+            self._update_queue_stats(sink_queue)
+            try:
+                if executor is not None:
+                    await loop.run_in_executor(executor, sink['fn'], packet)
+                else:
+                    sink['fn'](packet)
+            except Exception as e:
+                print(f"Pipeline sink '{sink['name']}' error: {e}")
+            finally:
+                packet.release()
+
+    def _update_queue_stats(self, q: BoundedQueue):
+        """Publish queue depth and drops to the performance monitor"""
+        if self.perf_monitor:
+            self.perf_monitor.set_queue_depth(q.name, q.qsize())
@@ -0,0 +1,265 @@
+"""
+Process-based inference backend fed through a shared-memory frame ring
+"""
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+from operator import itemgetter
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+from models.emotion_result import EMOTION_LABELS, STATUS_ERROR, EmotionResult
+from .inference_pool import InferencePool
+from .trace_recorder import get_tracer
+
+
+class SharedFrameRing:
+    """Fixed number of frame slots in one shared memory block
+
+    The parent copies a frame into a free slot and only sends the slot index,
+    shape and dtype to the worker process, which maps the same block and reads
+    the frame without any pickling.
+    """
+
+    def __init__(self, slot_count: int, slot_bytes: int, name: Optional[str] = None):
+        self.slot_count = slot_count
+        self.slot_bytes = slot_bytes
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=slot_count * slot_bytes)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def write(self, slot: int, frame) -> Tuple[tuple, str]:
+        """Copy a frame into a slot, returns (shape, dtype) needed to read it back"""
+        frame = np.ascontiguousarray(frame)
+        if frame.nbytes > self.slot_bytes:
+            raise ValueError(f"Frame {frame.shape} lớn hơn slot ({self.slot_bytes} bytes)")
+        self.view(slot, frame.shape, frame.dtype.str)[...] = frame
+        return frame.shape, frame.dtype.str
+
+    def view(self, slot: int, shape: tuple, dtype: str) -> np.ndarray:
+        """Array backed directly by the slot memory"""
+        return np.ndarray(shape, dtype=np.dtype(dtype), buffer=self.shm.buf,
+                          offset=slot * self.slot_bytes)
+
+    def close(self):
+        """Detach from the block; the owner also frees it"""
+        try:
+            self.shm.close()
+            if self.owner:
+                self.shm.unlink()
+        except (FileNotFoundError, BufferError):
+            pass
+
+
+def pack_result(result: EmotionResult) -> tuple:
+    """EmotionResult as plain values and raw array bytes (compact result record)"""
+    return (result.status, result.emotion, float(result.confidence),
+            np.ascontiguousarray(result.boxes, dtype=np.int32).tobytes(),
+            np.ascontiguousarray(result.scores, dtype=np.float32).tobytes())
+
+
+def unpack_result(packed: tuple) -> EmotionResult:
+    """Inverse of pack_result"""
+    status, emotion, confidence, boxes, scores = packed
+    return EmotionResult(status, emotion, confidence,
+                         np.frombuffer(boxes, dtype=np.int32).reshape(-1, 4),
+                         np.frombuffer(scores, dtype=np.float32).reshape(-1, len(EMOTION_LABELS)))
+
+
+def _worker_main(model_spec, ring_name, slot_count, slot_bytes, task_queue, result_queue):
+    """Worker process: build the detector once, then run it on frames from the ring"""
+    model_class, args = model_spec
+    detector = model_class(*args)
+    ring = SharedFrameRing(slot_count, slot_bytes, name=ring_name)
+
+    try:
+        while True:
+            task = task_queue.get()
+            if task is None:
+                break
+
+            seq, slot, shape, dtype = task
+            start = time.perf_counter()
+            try:
+                frame = ring.view(slot, shape, dtype)
+                result = detector.detect(frame)
+                del frame
+            except Exception as e:
+                print(f"Inference process {os.getpid()} error: {e}")
+                result = EmotionResult.from_status(STATUS_ERROR)
+            result_queue.put((seq, slot, pack_result(result), time.perf_counter() - start))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        ring.close()
+
+
+class ProcessInferencePool(InferencePool):
+    """InferencePool that runs the detector in worker processes
+
+    Scheduling (per-stream queues, drop-oldest, round-robin) is inherited from
+    InferencePool. A dispatcher thread copies the next frame into a free slot
+    of a SharedFrameRing and sends a small task tuple to the workers; a
+    collector thread turns the compact result records back into
+    EmotionResults and calls result_callback. The number of
+    frames in flight is bounded by the number of ring slots.
+    """
+
+    def __init__(self, result_callback: Callable, num_workers: int = 2, per_stream_capacity: int = 2,
+                 model_spec=None, slot_bytes: int = 1920 * 1080 * 3, slots_per_worker: int = 2,
+                 frame_getter: Callable = itemgetter(0), on_drop: Optional[Callable] = None):
+        super().__init__(None, result_callback, num_workers, per_stream_capacity, on_drop)
+        self.model_spec = model_spec
+        self.slot_bytes = slot_bytes
+        self.slot_count = self.num_workers * max(1, slots_per_worker)
+        self.frame_getter = frame_getter
+
+        self._ring: Optional[SharedFrameRing] = None
+        self._free_slots: List[int] = []
+        self._in_flight = {}
+        self._seq = 0
+        self._processes = []
+        self._task_queue = None
+        self._result_queue = None
+        self._threads: List[threading.Thread] = []
+
+    def set_model_spec(self, model_spec):
+        """(class, args) of the detector built in each worker (see ModelManager.get_model_spec)"""
+        self.model_spec = model_spec
+
+    def start(self):
+        """Create the frame ring, spawn worker processes and the dispatcher/collector threads"""
+        if self._running:
+            return
+        if self.model_spec is None:
+            raise ValueError("Chưa chọn model cho process pool")
+
+        ctx = multiprocessing.get_context("spawn")
+        self._ring = SharedFrameRing(self.slot_count, self.slot_bytes)
+        self._free_slots = list(range(self.slot_count))
+        self._in_flight = {}
+        self._task_queue = ctx.Queue()
+        self._result_queue = ctx.Queue()
+        self._processes = [
+            ctx.Process(
+                target=_worker_main,
+                args=(self.model_spec, self._ring.name, self.slot_count, self.slot_bytes,
+                      self._task_queue, self._result_queue),
+                name=f"InferenceProcess-{i}",
+                daemon=True
+            )
+            for i in range(self.num_workers)
+        ]
+        for process in self._processes:
+            process.start()
+
+        self._running = True
+        self._threads = [
+            threading.Thread(target=self._dispatch_loop, name="InferenceDispatcher", daemon=True),
+            threading.Thread(target=self._collect_loop, name="InferenceCollector", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        """Stop threads and worker processes, then free the shared memory"""
+        with self._condition:
+            was_running = self._running
+            self._running = False
+            discarded = self._clear_queues()
+            self._condition.notify_all()
+        self._discard(discarded)
+        if not was_running and not self._processes:
+            return
+
+        for _ in self._processes:
+            self._task_queue.put(None)
+        for process in self._processes:
+            process.join(timeout=timeout)
+            if process.is_alive():
+                process.terminate()
+                process.join(timeout=timeout)
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+
+        for q in (self._task_queue, self._result_queue):
+            q.close()
+            q.join_thread()
+        self._processes = []
+        self._threads = []
+        with self._condition:
+            in_flight = [item for _, item in self._in_flight.values()]
+            self._in_flight = {}
+        self._discard(in_flight)
+        self._ring.close()
+        self._ring = None
+
+    def _dispatch_loop(self):
+        """Copy the next frame (round-robin across streams) into a free slot"""
+        tracer = get_tracer()
+        while True:
+            with self._condition:
+                while self._running and (self._pending == 0 or not self._free_slots):
+                    self._condition.wait()
+                if not self._running:
+                    return
+                stream_id, item = self._next_item()
+                if item is None:
+                    continue
+                slot = self._free_slots.pop()
+                seq = self._seq
+                self._seq += 1
+
+            try:
+                with tracer.span("pool.dispatch", "inference", stream=stream_id):
+                    shape, dtype = self._ring.write(slot, self.frame_getter(item))
+            except Exception as e:
+                print(f"Process pool dispatch error (stream {stream_id}): {e}")
+                with self._condition:
+                    self._free_slots.append(slot)
+                    self._dropped[stream_id] = self._dropped.get(stream_id, 0) + 1
+                self._discard((item,))
+                continue
+
+            with self._condition:
+                self._in_flight[seq] = (stream_id, item)
+            self._task_queue.put((seq, slot, shape, dtype))
+
+    def _collect_loop(self):
+        """Turn result records from the workers back into detector results"""
+        while self._running:
+            try:
+                record = self._result_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                return
+
+            seq, slot, packed, _ = record
+            with self._condition:
+                entry = self._in_flight.pop(seq, None)
+                self._free_slots.append(slot)
+                self._condition.notify()
+            if entry is None:
+                continue
+
+            stream_id, item = entry
+            try:
+                self.result_callback(stream_id, item, unpack_result(packed))
+            except Exception as e:
+                print(f"Inference result error (stream {stream_id}): {e}")
+
+    def get_in_flight(self) -> int:
+        """Frames currently being processed by worker processes"""
+        with self._condition:
+            return len(self._in_flight)
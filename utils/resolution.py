@@ -0,0 +1,60 @@
+"""
+Resolution helpers: separate inference, display and recording frame sizes
+"""
+from typing import Optional, Tuple
+
+import cv2
+
+
+def fit_size(width: int, height: int, max_width: int, max_height: int,
+             allow_upscale: bool = False) -> Tuple[int, int]:
+    """Largest size with the same aspect ratio that fits in max_width x max_height"""
+    if width <= 0 or height <= 0 or max_width <= 0 or max_height <= 0:
+        return width, height
+    scale = min(max_width / width, max_height / height)
+    if not allow_upscale:
+        scale = min(scale, 1.0)
+    return max(1, int(round(width * scale))), max(1, int(round(height * scale)))
+
+
+def resize_to_fit(frame, max_size: Optional[Tuple[int, int]], allow_upscale: bool = False, dst=None):
+    """Resize keeping aspect ratio; returns the frame unchanged if it already fits
+
+    ``dst`` is reused as the output buffer when it already has the target shape.
+    """
+    if frame is None or not max_size:
+        return frame
+    height, width = frame.shape[:2]
+    target = fit_size(width, height, max_size[0], max_size[1], allow_upscale)
+    if target == (width, height):
+        return frame
+    interpolation = cv2.INTER_AREA if target[0] < width else cv2.INTER_LINEAR
+    if dst is not None and dst.shape[:2] == (target[1], target[0]) and dst.shape[2:] == frame.shape[2:]:
+        return cv2.resize(frame, target, dst=dst, interpolation=interpolation)
+    return cv2.resize(frame, target, interpolation=interpolation)
+
+
+def resize_for_inference(frame, max_size: Optional[Tuple[int, int]], dst=None):
+    """Downscale a frame for the detector (into dst when it has the right shape)
+
+    Returns (inference_frame, scale_x, scale_y) where the scales map box
+    coordinates on the inference frame back to the original frame.
+    """
+    small = resize_to_fit(frame, max_size, dst=dst)
+    if small is frame:
+        return frame, 1.0, 1.0
+    return small, frame.shape[1] / small.shape[1], frame.shape[0] / small.shape[0]
+
+
+def crop_faces(frame, faces, margin: float = 0.0) -> list:
+    """Full-resolution face crops for classifiers (optional margin as a fraction of box size)"""
+    crops = []
+    height, width = frame.shape[:2]
+    for (x1, y1, x2, y2) in faces:
+        pad_x = int((x2 - x1) * margin)
+        pad_y = int((y2 - y1) * margin)
+        x1, y1 = max(0, x1 - pad_x), max(0, y1 - pad_y)
+        x2, y2 = min(width, x2 + pad_x), min(height, y2 + pad_y)
+        if x2 > x1 and y2 > y1:
+            crops.append(frame[y1:y2, x1:x2])
+    return crops
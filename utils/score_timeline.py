@@ -0,0 +1,74 @@
+"""
+Fixed-size ring buffer of per-emotion scores for the live timeline chart
+"""
+import threading
+from typing import Tuple
+
+import numpy as np
+
+from models.emotion_result import EMOTION_LABELS
+
+
+class ScoreTimeline:
+    """Per-emotion scores of the first face, averaged into fixed time bins
+
+    The last ``window_seconds`` are kept as ``window_seconds / bin_seconds``
+    rows of a preallocated float32 array. Bins without a classified face
+    are NaN (a gap in the chart). add() runs on the pipeline thread,
+    since() on the Tk thread.
+    """
+
+    def __init__(self, window_seconds: float = 120.0, bin_seconds: float = 0.5):
+        self.bin_seconds = bin_seconds
+        self.capacity = max(int(round(window_seconds / bin_seconds)), 2)
+        self._rows = np.full((self.capacity, len(EMOTION_LABELS)), np.nan, dtype=np.float32)
+        self._sum = np.zeros(len(EMOTION_LABELS), dtype=np.float64)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._rows.fill(np.nan)
+            self._sum.fill(0.0)
+            self._samples = 0
+            self._bin = None  # Index (timestamp // bin_seconds) of the open bin
+            self.sequence = 0  # Closed bins so far
+
+    def add(self, timestamp: float, result):
+        """Add one frame's EmotionResult (timestamp in seconds, monotonic)"""
+        current = int(timestamp // self.bin_seconds)
+        with self._lock:
+            if self._bin is None:
+                self._bin = current
+            elif current > self._bin:
+                self._close_bins(current - self._bin)
+                self._bin = current
+            if result.is_ok() and len(result.scores):
+                self._sum += result.scores[0]
+                self._samples += 1
+
+    def _close_bins(self, count: int):
+        """Write the open bin's mean and NaN for ``count - 1`` empty bins after it"""
+        row = self.sequence % self.capacity
+        if self._samples:
+            self._rows[row] = self._sum / self._samples
+        else:
+            self._rows[row] = np.nan
+        self._sum.fill(0.0)
+        self._samples = 0
+        self.sequence += 1
+        for _ in range(min(count - 1, self.capacity)):
+            self._rows[self.sequence % self.capacity] = np.nan
+            self.sequence += 1
+        if count - 1 > self.capacity:
+            self.sequence += count - 1 - self.capacity
+
+    def since(self, sequence: int) -> Tuple[int, np.ndarray]:
+        """(current sequence, copy of the bins closed after ``sequence``, oldest first, at most capacity)"""
+        with self._lock:
+            end = self.sequence
+            count = min(end - sequence, self.capacity)
+            if count <= 0:
+                return end, self._rows[:0].copy()
+            indices = np.arange(end - count, end) % self.capacity
+            return end, self._rows[indices]
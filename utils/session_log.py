@@ -0,0 +1,175 @@
+"""
+Reader for NDJSON emotion session logs
+
+A session log is written by EmotionLogger while recording:
+
+    {"type": "header", "version": 1, "session": ..., "start_time": ..., "fields": [...]}
+    {"timestamp": ..., "time_elapsed": ..., "emotion": ..., "confidence": ..., ...}
+    {"type": "checkpoint", "time_elapsed": ..., "summary": {...}, "records_written": ...}
+    {"type": "footer", "end_time": ..., "duration_seconds": ..., "summary": {...}, ...}
+
+The footer is missing if the app stopped abruptly; the reader then rebuilds
+the summary from the records. A truncated last line is ignored. In events
+mode (header "mode": "events") each record is an interval with duration,
+frame_count, confidence_min/max and reason; expand_events / iter_timeline
+turn it back into one row per frame.
+
+Usage:
+    python -m utils.session_log output/session.ndjson -o output/session.json
+"""
+import argparse
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from .session_stats import SessionAggregator
+
+SESSION_LOG_VERSION = 1
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+EVENT_KEYS = ('duration', 'frame_count', 'confidence_min', 'confidence_max', 'reason')
+
+
+def iter_session_log(path: str) -> Iterator[Tuple[str, Dict]]:
+    """Yield (kind, object) per line; kind is header, record, checkpoint or footer"""
+    with open(path, encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                value = json.loads(line)
+            except ValueError:
+                print(f"Bỏ qua dòng log lỗi {line_number} trong {os.path.basename(path)}")
+                continue
+            yield value.pop('type', 'record'), value
+
+
+def iter_records(path: str) -> Iterator[Dict]:
+    """Only the per-frame records of a session log"""
+    for kind, value in iter_session_log(path):
+        if kind == 'record':
+            yield value
+
+
+def expand_events(rows: Iterable[Dict]) -> Iterator[Dict]:
+    """Per-frame rows from event rows: frame_count frames spread evenly over the duration
+
+    Each frame gets the interval's emotion and mean confidence. Per-frame
+    rows (no frame_count) pass through unchanged, so any session works.
+    """
+    for row in rows:
+        frames = int(row.get('frame_count') or 1)
+        base = {key: value for key, value in row.items() if key not in EVENT_KEYS}
+        if frames == 1 and 'frame_count' not in row:
+            yield base
+            continue
+        elapsed = float(row['time_elapsed'])
+        step = float(row.get('duration') or 0.0) / frames
+        start = datetime.strptime(row['timestamp'], TIMESTAMP_FORMAT) if row.get('timestamp') else None
+        for index in range(frames):
+            frame = dict(base)
+            offset = index * step
+            frame['time_elapsed'] = round(elapsed + offset, 3)
+            if start is not None:
+                frame['timestamp'] = (start + timedelta(seconds=offset)).strftime(TIMESTAMP_FORMAT)[:-3]
+            yield frame
+
+
+def iter_timeline(path: str) -> Iterator[Dict]:
+    """Per-frame timeline of a session log, whatever its log mode"""
+    return expand_events(iter_records(path))
+
+
+def scan_session(path: str) -> Dict:
+    """Session info and summary without keeping the records in memory"""
+    header, footer, last_checkpoint = {}, None, None
+    aggregator = SessionAggregator()
+    last_elapsed = 0.0
+    for kind, value in iter_session_log(path):
+        if kind == 'header':
+            header = value
+        elif kind == 'footer':
+            footer = value
+        elif kind == 'checkpoint':
+            last_checkpoint = value
+        elif kind == 'record':
+            elapsed = value.get('time_elapsed', last_elapsed)
+            aggregator.update(value.get('emotion'), value.get('confidence', 0.0),
+                              value.get('model_used'), elapsed, value.get('frame_count', 1))
+            last_elapsed = elapsed + value.get('duration', 0.0)
+
+    start_time = header.get('start_time')
+    if footer is not None:
+        session_info = {
+            'start_time': start_time,
+            'end_time': footer.get('end_time'),
+            'duration_seconds': footer.get('duration_seconds', last_elapsed),
+            'total_records': footer.get('total_records', aggregator.total_records)
+        }
+        summary = footer.get('summary', {})
+    else:
+        # Interrupted session: end at the last record
+        end_time = None
+        if start_time:
+            end_time = (datetime.fromisoformat(start_time) + timedelta(seconds=last_elapsed)).isoformat()
+        session_info = {
+            'start_time': start_time,
+            'end_time': end_time,
+            'duration_seconds': last_elapsed,
+            'total_records': aggregator.total_records,
+            'incomplete': True
+        }
+        summary = aggregator.get_summary(last_elapsed)
+
+    return {
+        'header': header,
+        'session_info': session_info,
+        'summary': summary,
+        'last_checkpoint': last_checkpoint,
+        'records_read': aggregator.total_records
+    }
+
+
+def read_session(path: str) -> Dict:
+    """Rebuild the old single-JSON layout {session_info, summary, data} in memory (data as logged)"""
+    scanned = scan_session(path)
+    return {
+        'session_info': scanned['session_info'],
+        'summary': scanned['summary'],
+        'data': list(iter_records(path))
+    }
+
+
+def export_session_json(path: str, json_path: Optional[str] = None) -> str:
+    """Write the old single-JSON layout, streaming records from the log"""
+    if json_path is None:
+        json_path = os.path.splitext(path)[0] + ".json"
+    scanned = scan_session(path)
+
+    def indented(value) -> str:
+        return json.dumps(value, indent=2, ensure_ascii=False).replace('\n', '\n  ')
+
+    with open(json_path, 'w', encoding='utf-8') as jsonfile:
+        jsonfile.write('{\n  "session_info": ' + indented(scanned['session_info']))
+        jsonfile.write(',\n  "summary": ' + indented(scanned['summary']))
+        jsonfile.write(',\n  "data": [')
+        separator = '\n    '
+        for record in iter_records(path):
+            jsonfile.write(separator + json.dumps(record, ensure_ascii=False))
+            separator = ',\n    '
+        jsonfile.write('\n  ]\n}\n')
+    return json_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert an NDJSON session log to the single-file JSON layout")
+    parser.add_argument("log", help="Session log (.ndjson)")
+    parser.add_argument("-o", "--output", help="Output JSON file (default: next to the log)")
+    args = parser.parse_args(argv)
+    print(f"Đã xuất: {export_session_json(args.log, args.output)}")
+    return 0
+
+
+if __name__ == "__main__":
+    main()
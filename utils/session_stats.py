@@ -0,0 +1,74 @@
+"""
+Incremental statistics for emotion logging sessions
+"""
+import threading
+from typing import Dict, Optional
+
+
+class SessionAggregator:
+    """Running session summary updated in O(1) per record
+
+    Keeps counts per emotion and model, running confidence mean/min/max and a
+    per-minute emotion histogram, so the summary can be read at any time
+    without keeping the records themselves.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.total_records = 0
+            self.emotion_counts: Dict[str, int] = {}
+            self.model_counts: Dict[str, int] = {}
+            self.confidence_sum = 0.0
+            self.confidence_min: Optional[float] = None
+            self.confidence_max: Optional[float] = None
+            self.per_minute: Dict[int, Dict[str, int]] = {}
+
+    def update(self, emotion: str, confidence: float, model_name: str, time_elapsed: float,
+               frames: int = 1):
+        """Add one record (or an event row standing for ``frames`` records)"""
+        with self._lock:
+            self.total_records += frames
+            self.emotion_counts[emotion] = self.emotion_counts.get(emotion, 0) + frames
+            self.model_counts[model_name] = self.model_counts.get(model_name, 0) + frames
+            self.confidence_sum += confidence * frames
+            if self.confidence_min is None or confidence < self.confidence_min:
+                self.confidence_min = confidence
+            if self.confidence_max is None or confidence > self.confidence_max:
+                self.confidence_max = confidence
+            minute = self.per_minute.setdefault(int(time_elapsed // 60), {})
+            minute[emotion] = minute.get(emotion, 0) + frames
+
+    def get_summary(self, duration: float) -> Dict:
+        """Session summary (same keys as the end-of-session summary), {} if empty"""
+        with self._lock:
+            total_records = self.total_records
+            if total_records == 0:
+                return {}
+
+            emotion_counts = dict(self.emotion_counts)
+            emotion_percentages = {
+                emotion: round((count / total_records) * 100, 2)
+                for emotion, count in emotion_counts.items()
+            }
+            minutes = duration / 60
+            return {
+                'total_records': total_records,
+                'duration_minutes': round(minutes, 2),
+                'avg_records_per_minute': round(total_records / minutes, 2) if minutes > 0 else 0.0,
+                'emotion_distribution': emotion_counts,
+                'emotion_percentages': emotion_percentages,
+                'most_common_emotion': max(emotion_counts, key=emotion_counts.get),
+                'confidence_stats': {
+                    'average': round(self.confidence_sum / total_records, 4),
+                    'maximum': round(self.confidence_max, 4),
+                    'minimum': round(self.confidence_min, 4)
+                },
+                'model_usage': dict(self.model_counts),
+                'emotions_per_minute': {
+                    str(minute): dict(counts) for minute, counts in sorted(self.per_minute.items())
+                }
+            }
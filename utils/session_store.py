@@ -0,0 +1,329 @@
+"""
+SQLite store for emotion sessions with indexed cross-session queries
+
+One database holds every session (table ``sessions``) and its per-frame
+records (table ``records``). Event-mode logs store one row per interval
+with its ``duration`` and ``frame_count``; counts and averages weight rows
+by frame_count. The database runs in WAL mode so queries can run while a
+session is being written.
+
+Usage:
+    python -m utils.session_store output/sessions.db sessions --days 7
+    python -m utils.session_store output/sessions.db distribution --since 2026-10-01
+    python -m utils.session_store output/sessions.db find angry --min-share 20 --days 7
+    python -m utils.session_store output/sessions.db import output/*.ndjson
+"""
+import argparse
+import itertools
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from .columnar_log import expand_inputs, iter_session_rows, parse_timestamp_us
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    start_us INTEGER NOT NULL,
+    end_us INTEGER,
+    duration_seconds REAL,
+    total_records INTEGER DEFAULT 0,
+    dropped_rows INTEGER DEFAULT 0,
+    summary TEXT
+);
+CREATE TABLE IF NOT EXISTS records (
+    session_id INTEGER NOT NULL REFERENCES sessions(id),
+    timestamp_us INTEGER NOT NULL,
+    time_elapsed REAL,
+    emotion TEXT,
+    confidence REAL,
+    model_used TEXT,
+    face_count INTEGER,
+    duration REAL,
+    frame_count INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_start ON sessions(start_us);
+CREATE INDEX IF NOT EXISTS idx_records_session ON records(session_id, timestamp_us);
+CREATE INDEX IF NOT EXISTS idx_records_timestamp ON records(timestamp_us);
+CREATE INDEX IF NOT EXISTS idx_records_emotion ON records(emotion, timestamp_us);
+CREATE INDEX IF NOT EXISTS idx_records_model ON records(model_used, timestamp_us);
+"""
+
+
+def to_us(value) -> Optional[int]:
+    """datetime, ISO string or epoch seconds to epoch microseconds (None passes through)"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if isinstance(value, datetime):
+        return int(round(value.timestamp() * 1_000_000))
+    return int(round(float(value) * 1_000_000))
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """Open (and create) the store in WAL mode"""
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    # Databases created before event rows: add the interval columns
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(records)")}
+    if 'frame_count' not in columns:
+        with conn:
+            conn.execute("ALTER TABLE records ADD COLUMN duration REAL")
+            conn.execute("ALTER TABLE records ADD COLUMN frame_count INTEGER NOT NULL DEFAULT 1")
+    return conn
+
+
+def _record_tuple(session_id: int, row: Dict) -> tuple:
+    duration = row.get('duration')
+    return (session_id, parse_timestamp_us(row['timestamp']), float(row['time_elapsed']), row['emotion'],
+            float(row['confidence']), row['model_used'], int(row['face_count']),
+            float(duration) if duration not in (None, "") else None, int(row.get('frame_count') or 1))
+
+
+INSERT_RECORD = ("INSERT INTO records (session_id, timestamp_us, time_elapsed, emotion, confidence, "
+                 "model_used, face_count, duration, frame_count) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)")
+
+
+class SQLiteSink:
+    """AsyncLogWriter sink inserting each batch in one transaction"""
+
+    def __init__(self, path: str, session_name: str, start_time: datetime,
+                 footer_fn: Optional[Callable] = None):
+        self.path = path
+        self.session_name = session_name
+        self.start_time = start_time
+        self.footer_fn = footer_fn
+        self.session_id: Optional[int] = None
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def open(self):
+        self._conn = connect(self.path)
+        with self._conn:
+            cursor = self._conn.execute("INSERT INTO sessions (name, start_us) VALUES (?, ?)",
+                                        (self.session_name, to_us(self.start_time)))
+        self.session_id = cursor.lastrowid
+
+    def write_batch(self, rows: List[Dict]):
+        with self._conn:
+            self._conn.executemany(INSERT_RECORD, [_record_tuple(self.session_id, row) for row in rows])
+
+    def close(self):
+        if self._conn is None:
+            return
+        try:
+            if self.footer_fn:
+                footer = self.footer_fn()
+                with self._conn:
+                    self._conn.execute(
+                        "UPDATE sessions SET end_us = ?, duration_seconds = ?, total_records = ?, "
+                        "dropped_rows = ?, summary = ? WHERE id = ?",
+                        (to_us(footer.get('end_time')), footer.get('duration_seconds'),
+                         footer.get('total_records', 0), footer.get('dropped_rows', 0),
+                         json.dumps(footer.get('summary', {}), ensure_ascii=False), self.session_id)
+                    )
+        finally:
+            self._conn.close()
+            self._conn = None
+
+
+class SessionStore:
+    """Query API over the session database
+
+    Time bounds (``since``/``until``) accept datetimes, ISO strings or epoch
+    seconds and filter on the record timestamps.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = connect(path)
+        self.conn.row_factory = sqlite3.Row
+
+    def close(self):
+        self.conn.close()
+
+    @staticmethod
+    def _time_filter(since, until, column: str = "timestamp_us"):
+        clauses, params = [], []
+        if since is not None:
+            clauses.append(f"{column} >= ?")
+            params.append(to_us(since))
+        if until is not None:
+            clauses.append(f"{column} < ?")
+            params.append(to_us(until))
+        return clauses, params
+
+    def list_sessions(self, since=None, until=None) -> List[Dict]:
+        """Sessions that started in the time range, newest first"""
+        clauses, params = self._time_filter(since, until, "start_us")
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self.conn.execute(
+            f"SELECT id, name, start_us, end_us, duration_seconds, total_records, dropped_rows "
+            f"FROM sessions {where} ORDER BY start_us DESC", params
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_summary(self, session_id: int) -> Dict:
+        """Stored end-of-session summary ({} while the session is running)"""
+        row = self.conn.execute("SELECT summary FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        return json.loads(row['summary']) if row and row['summary'] else {}
+
+    def records(self, session_id: Optional[int] = None, since=None, until=None,
+                emotion: Optional[str] = None, model: Optional[str] = None, limit: int = 0) -> List[Dict]:
+        """Raw records (frames or event intervals) filtered by session, time range, emotion and model"""
+        clauses, params = self._time_filter(since, until)
+        for column, value in (('session_id', session_id), ('emotion', emotion), ('model_used', model)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = f"SELECT * FROM records {where} ORDER BY timestamp_us"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return [dict(row) for row in self.conn.execute(sql, params)]
+
+    def emotion_distribution(self, session_id: Optional[int] = None, since=None, until=None) -> Dict[str, Dict]:
+        """Frame count, share (%) and mean confidence per emotion"""
+        clauses, params = self._time_filter(since, until)
+        if session_id is not None:
+            clauses.append("session_id = ?")
+            params.append(session_id)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self.conn.execute(
+            f"SELECT emotion, SUM(frame_count) AS count, "
+            f"SUM(confidence * frame_count) / SUM(frame_count) AS avg_confidence "
+            f"FROM records {where} GROUP BY emotion ORDER BY count DESC", params
+        ).fetchall()
+        total = sum(row['count'] for row in rows)
+        return {
+            row['emotion']: {
+                'count': row['count'],
+                'percentage': round(row['count'] / total * 100, 2) if total else 0.0,
+                'avg_confidence': round(row['avg_confidence'] or 0.0, 4)
+            }
+            for row in rows
+        }
+
+    def model_usage(self, since=None, until=None) -> Dict[str, int]:
+        """Frames per model"""
+        clauses, params = self._time_filter(since, until)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self.conn.execute(
+            f"SELECT model_used, SUM(frame_count) AS count FROM records {where} GROUP BY model_used", params
+        ).fetchall()
+        return {row['model_used']: row['count'] for row in rows}
+
+    def find_sessions(self, emotion: str, min_share: float, since=None, until=None) -> List[Dict]:
+        """Sessions where ``emotion`` makes up at least ``min_share`` percent of the frames"""
+        clauses, params = self._time_filter(since, until)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self.conn.execute(
+            f"SELECT s.id, s.name, s.start_us, r.total, r.matches, "
+            f"100.0 * r.matches / r.total AS percentage "
+            f"FROM (SELECT session_id, SUM(frame_count) AS total, SUM((emotion = ?) * frame_count) AS matches "
+            f"      FROM records {where} GROUP BY session_id) r "
+            f"JOIN sessions s ON s.id = r.session_id "
+            f"WHERE 100.0 * r.matches / r.total >= ? ORDER BY percentage DESC",
+            [emotion] + params + [min_share]
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def import_session(self, path: str, name: Optional[str] = None, batch_size: int = 1000) -> int:
+        """Load an existing CSV/NDJSON/JSON session file, returns the new session id"""
+        name = name or os.path.splitext(os.path.basename(path))[0]
+        rows = iter_session_rows(path)
+        first = next(rows, None)
+        start_us = to_us(time.time())
+        if first:
+            start_us = parse_timestamp_us(first['timestamp']) - int(float(first['time_elapsed']) * 1_000_000)
+        with self.conn:
+            session_id = self.conn.execute("INSERT INTO sessions (name, start_us) VALUES (?, ?)",
+                                           (name, start_us)).lastrowid
+            count, last_elapsed, batch = 0, 0.0, []
+            for row in itertools.chain([first] if first else [], rows):
+                record = _record_tuple(session_id, row)
+                batch.append(record)
+                last_elapsed = record[2] + (record[7] or 0.0)
+                count += record[8]
+                if len(batch) >= batch_size:
+                    self.conn.executemany(INSERT_RECORD, batch)
+                    batch = []
+            if batch:
+                self.conn.executemany(INSERT_RECORD, batch)
+            self.conn.execute(
+                "UPDATE sessions SET end_us = ?, duration_seconds = ?, total_records = ? WHERE id = ?",
+                (start_us + int(last_elapsed * 1_000_000), last_elapsed, count, session_id)
+            )
+        return session_id
+
+
+def _format_us(value: Optional[int]) -> str:
+    if value is None:
+        return "-"
+    return datetime.fromtimestamp(value / 1_000_000).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the emotion session database")
+    parser.add_argument("db", help="SQLite database (e.g. output/sessions.db)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add_range(command):
+        command.add_argument("--since", help="Start time (ISO, e.g. 2026-10-01 or 2026-10-01T08:00)")
+        command.add_argument("--until", help="End time (ISO)")
+        command.add_argument("--days", type=float, help="Only the last N days")
+
+    add_range(commands.add_parser("sessions", help="List sessions"))
+    distribution = commands.add_parser("distribution", help="Emotion distribution across sessions")
+    distribution.add_argument("--session", type=int, help="Only this session id")
+    add_range(distribution)
+    find = commands.add_parser("find", help="Sessions where an emotion exceeds a share")
+    find.add_argument("emotion")
+    find.add_argument("--min-share", type=float, default=20.0, help="Minimum share in percent")
+    add_range(find)
+    import_command = commands.add_parser("import", help="Import CSV/NDJSON/JSON session files")
+    import_command.add_argument("files", nargs="+")
+    args = parser.parse_args(argv)
+
+    store = SessionStore(args.db)
+    try:
+        since = getattr(args, 'since', None)
+        until = getattr(args, 'until', None)
+        if getattr(args, 'days', None):
+            since = datetime.now() - timedelta(days=args.days)
+
+        if args.command == "sessions":
+            for session in store.list_sessions(since, until):
+                print(f"{session['id']:5d}  {_format_us(session['start_us'])}  "
+                      f"{(session['duration_seconds'] or 0) / 60:7.1f} phút  "
+                      f"{session['total_records']:7d} bản ghi  {session['name']}")
+        elif args.command == "distribution":
+            for emotion, entry in store.emotion_distribution(args.session, since, until).items():
+                print(f"{emotion:15}: {entry['percentage']:6.2f}%  ({entry['count']}, "
+                      f"độ tin cậy TB {entry['avg_confidence']:.3f})")
+        elif args.command == "find":
+            for session in store.find_sessions(args.emotion, args.min_share, since, until):
+                print(f"{session['id']:5d}  {_format_us(session['start_us'])}  "
+                      f"{session['percentage']:6.2f}%  {session['name']}")
+        elif args.command == "import":
+            for path in expand_inputs(args.files):
+                try:
+                    print(f"{path} -> session {store.import_session(path)}")
+                except Exception as e:
+                    print(f"Lỗi nhập {path}: {e}")
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
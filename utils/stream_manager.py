@@ -0,0 +1,302 @@
+"""
+Multi-camera stream manager feeding a shared inference pool
+"""
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+from models.emotion_result import PENDING_RESULT, STATUS_NOT_FOUND, EmotionResult
+from .camera_handler import CameraHandler
+from .frame_pool import FramePool
+from .inference_pool import InferencePool
+from .process_pool import ProcessInferencePool
+from .perf_monitor import percentile
+from .resolution import fit_size, resize_for_inference
+from .trace_recorder import get_tracer
+
+
+class StreamState:
+    """Per-stream counters, frame buffer pools and the latest annotated frame"""
+
+    def __init__(self, stream_id: int, camera_input, handler: CameraHandler, pool_size: int = 8):
+        self.stream_id = stream_id
+        self.camera_input = camera_input
+        self.handler = handler
+        self.capture_pool = FramePool(pool_size, f"capture-{stream_id}")
+        self.resize_pool = FramePool(pool_size, f"inference-{stream_id}")
+        self.frames_captured = 0
+        self.frames_processed = 0
+        self.frames_stale = 0  # Results finished after a newer frame's result
+        self.latencies_ms = deque(maxlen=120)
+        self.completion_times = deque(maxlen=60)
+        self.latest_frame = None
+        self.latest_buffer = None  # Pooled capture buffer holding latest_frame (one reference)
+        self.latest_result = PENDING_RESULT
+        self.latest_capture_time = 0.0  # Capture time of latest_frame (perf_counter)
+
+    def get_stats(self) -> Dict:
+        """FPS over the last completed frames and latency percentiles"""
+        times = list(self.completion_times)
+        fps = (len(times) - 1) / (times[-1] - times[0]) if len(times) > 1 and times[-1] > times[0] else 0.0
+        ordered = sorted(self.latencies_ms)
+        return {
+            'source': str(self.camera_input),
+            'fps': fps,
+            'latency_p50_ms': percentile(ordered, 50),
+            'latency_p95_ms': percentile(ordered, 95),
+            'frames_captured': self.frames_captured,
+            'frames_processed': self.frames_processed,
+            'frames_stale': self.frames_stale,
+        }
+
+
+class StreamManager:
+    """Open several sources at once and run all of them through one inference pool
+
+    Each source keeps its own capture thread (CameraHandler). Captured frames are
+    submitted to a shared InferencePool, which schedules the streams round-robin
+    on a bounded number of workers. Every worker thread uses its own detector
+    instance, so models that are not thread-safe can still run in parallel.
+
+    With backend="process" the detectors run in worker processes instead
+    (ProcessInferencePool), so their pure-Python parts do not compete for the
+    GIL with capture, annotation and the GUI.
+
+    Captured and downscaled frames live in per-stream FramePools; a submitted
+    item holds one reference on each until its result was annotated or the
+    pool dropped it. Results are drawn into the capture buffer itself, which
+    stays referenced as the stream's latest frame until the next result.
+    Two workers may finish frames of one stream out of order; a result older
+    than the published one is dropped so the latest frame never goes back.
+    """
+
+    def __init__(self, model_manager, num_workers: int = 2, per_stream_capacity: int = 2,
+                 max_streams: int = 8, backend: str = "thread", inference_size=None,
+                 capture_pool_size: int = 8, **pool_options):
+        self.model_manager = model_manager
+        self.max_streams = max_streams
+        self.inference_size = inference_size
+        self.capture_pool_size = capture_pool_size
+        self.model_name = ""
+        self.result_callback: Optional[Callable] = None
+        self.streams: Dict[int, StreamState] = {}
+        self.backend = backend
+        if backend == "process":
+            self.pool = ProcessInferencePool(self._on_result, num_workers, per_stream_capacity,
+                                             on_drop=self._release_item, **pool_options)
+        else:
+            self.pool = InferencePool(self._infer, self._on_result, num_workers, per_stream_capacity,
+                                      on_drop=self._release_item)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+    def open_streams(self, camera_inputs: List) -> List[int]:
+        """Open each source, returns the ids of those that opened"""
+        opened = []
+        for camera_input in camera_inputs[:self.max_streams]:
+            stream_id = self.add_stream(camera_input)
+            if stream_id is not None:
+                opened.append(stream_id)
+        return opened
+
+    def add_stream(self, camera_input) -> Optional[int]:
+        """Open one source and register it with the pool"""
+        if len(self.streams) >= self.max_streams:
+            print(f"Đã đạt số stream tối đa ({self.max_streams})")
+            return None
+
+        handler = CameraHandler()
+        if not handler.start_camera(camera_input):
+            print(f"Không thể mở stream: {camera_input}")
+            return None
+
+        with self._lock:
+            stream_id = self._next_id
+            self._next_id += 1
+            state = StreamState(stream_id, camera_input, handler, self.capture_pool_size)
+            self.streams[stream_id] = state
+        self.pool.register_stream(stream_id)
+
+        if self.pool.is_running():
+            self._start_capture(state)
+        return stream_id
+
+    def start(self, model_name: str, result_callback: Optional[Callable] = None) -> bool:
+        """Start inference workers and all capture threads
+
+        result_callback(stream_id, annotated_frame, result) is called from
+        worker threads with an EmotionResult in capture coordinates; the
+        frame is a pooled buffer, only valid during the callback.
+        """
+        if not self.streams:
+            return False
+
+        self.model_name = model_name
+        self.result_callback = result_callback
+        if self.backend == "process":
+            model_spec = self.model_manager.get_model_spec(model_name)
+            if model_spec is None:
+                print(f"Model không tồn tại: {model_name}")
+                return False
+            self.pool.set_model_spec(model_spec)
+        self.pool.start()
+
+        for state in self.streams.values():
+            self._start_capture(state)
+        return True
+
+    def _start_capture(self, state: StreamState):
+        """Start a stream's capture thread reading into its frame pool"""
+        state.handler.start_streaming(lambda buffer, sid=state.stream_id: self._on_frame(sid, buffer),
+                                      frame_pool=state.capture_pool)
+
+    def stop(self):
+        """Stop capture threads, inference workers and release all sources"""
+        for state in self.streams.values():
+            state.handler.stop_streaming()
+        self.pool.stop()
+        for state in self.streams.values():
+            state.handler.stop_camera()
+        with self._lock:
+            buffers = [state.latest_buffer for state in self.streams.values()]
+            self.streams.clear()
+        for buffer in buffers:
+            if buffer is not None:
+                buffer.release()
+
+    def _on_frame(self, stream_id: int, buffer):
+        """Capture-thread callback: downscale into a pooled buffer and hand both to the shared pool"""
+        state = self.streams.get(stream_id)
+        if state is None:
+            buffer.release()
+            return
+        state.frames_captured += 1
+        frame = buffer.array
+        buffers = (buffer,)
+        dst = None
+        small_buffer = None
+        try:
+            if self.inference_size:
+                height, width = frame.shape[:2]
+                target = fit_size(width, height, *self.inference_size)
+                if target != (width, height):
+                    small_buffer = state.resize_pool.acquire((target[1], target[0]) + frame.shape[2:], frame.dtype)
+                    buffers = (buffer, small_buffer)
+                    dst = small_buffer.array
+            small, scale_x, scale_y = resize_for_inference(frame, self.inference_size, dst)
+        except Exception:
+            # Not handed on: the capture loop releases ``buffer``
+            if small_buffer is not None:
+                small_buffer.release()
+            raise
+        self.pool.submit(stream_id, (small, time.perf_counter(), state.frames_captured, frame,
+                                     (scale_x, scale_y), buffers))
+
+    @staticmethod
+    def _release_item(item):
+        """Return an item's frame buffers to their pools"""
+        for buffer in item[5]:
+            buffer.release()
+
+    def _get_worker_model(self):
+        """Per-worker detector instance"""
+        models = getattr(self._local, 'models', None)
+        if models is None:
+            models = {}
+            self._local.models = models
+        model = models.get(self.model_name)
+        if model is None:
+            model = self.model_manager.create_model_instance(self.model_name)
+            models[self.model_name] = model
+        return model
+
+    def _infer(self, stream_id: int, item):
+        """Run the selected model on one frame (worker thread)"""
+        frame, _, frame_index, _, _, _ = item
+        get_tracer().set_frame(frame_index)
+        model = self._get_worker_model()
+        if model is None:
+            return EmotionResult.from_status(STATUS_NOT_FOUND)
+        return model.detect(frame)
+
+    def _on_result(self, stream_id: int, item, result):
+        """Annotate the frame, update stats and notify the owner (worker thread)"""
+        state = self.streams.get(stream_id)
+        if state is None:
+            self._release_item(item)
+            return
+
+        _, capture_time, _, frame, (scale_x, scale_y), buffers = item
+        capture_buffer = buffers[0]
+        try:
+            result = result.scaled(scale_x, scale_y, frame.shape)
+            # Draw into the capture buffer; its reference moves to latest_buffer below
+            annotated = CameraHandler.draw_result(frame, result)
+        except Exception:
+            self._release_item(item)
+            raise
+        for buffer in buffers[1:]:
+            buffer.release()
+
+        now = time.perf_counter()
+        state.latencies_ms.append((now - capture_time) * 1000.0)
+        state.completion_times.append(now)
+        state.frames_processed += 1
+        with self._lock:
+            stale = capture_time < state.latest_capture_time
+            if stale:
+                state.frames_stale += 1
+            else:
+                previous = state.latest_buffer
+                state.latest_buffer = capture_buffer
+                state.latest_frame = annotated
+                state.latest_result = result
+                state.latest_capture_time = capture_time
+        if stale:
+            # Another worker already published a newer frame of this stream
+            capture_buffer.release()
+            return
+
+        try:
+            if self.result_callback:
+                self.result_callback(stream_id, annotated, result)
+        finally:
+            if previous is not None:
+                previous.release()
+
+    def get_latest_frames(self) -> List:
+        """Latest annotated frame buffer of every stream in id order (None if none yet)
+
+        Each buffer is retained for the caller, who must release it once
+        the frame was shown (see release_frames).
+        """
+        with self._lock:
+            buffers = [self.streams[stream_id].latest_buffer for stream_id in sorted(self.streams)]
+            for buffer in buffers:
+                if buffer is not None:
+                    buffer.retain()
+        return buffers
+
+    @staticmethod
+    def release_frames(buffers: List):
+        """Release the buffers returned by get_latest_frames"""
+        for buffer in buffers:
+            if buffer is not None:
+                buffer.release()
+
+    def get_stream_stats(self) -> Dict[int, Dict]:
+        """Per-stream FPS, latency and drop statistics"""
+        dropped = self.pool.get_dropped_counts()
+        depths = self.pool.get_queue_depths()
+        stats = {}
+        for stream_id, state in list(self.streams.items()):
+            entry = state.get_stats()
+            entry['dropped'] = dropped.get(stream_id, 0)
+            entry['queue_depth'] = depths.get(stream_id, 0)
+            stats[stream_id] = entry
+        return stats
+
+    def get_stream_count(self) -> int:
+        return len(self.streams)
@@ -0,0 +1,329 @@
+"""
+Synthetic face-video generator for load and regression testing
+
+Composes local face images (or drawn placeholder faces) onto backgrounds with
+controllable face count, motion, scale and lighting. Output can be written
+to a video file or consumed live through SyntheticCapture, which behaves like
+a cv2.VideoCapture and can be passed to CameraHandler.start_camera as
+"synthetic://<scenario>?fps=30&size=640x480&faces=3".
+"""
+import glob
+import math
+import os
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlparse, parse_qs
+
+import cv2
+import numpy as np
+
+IMAGE_EXTENSIONS = ('*.jpg', '*.jpeg', '*.png', '*.bmp')
+
+# Predefined load-test scenarios
+SCENARIOS: Dict[str, Dict] = {
+    'idle': {'face_count': 1, 'motion': 0.0, 'scale_jitter': 0.0, 'lighting': 0.0},
+    'single': {'face_count': 1, 'motion': 2.0, 'scale_jitter': 0.05, 'lighting': 0.05},
+    'multi_face': {'face_count': 6, 'motion': 2.0, 'face_scale': 0.18, 'scale_jitter': 0.05, 'lighting': 0.05},
+    'high_motion': {'face_count': 2, 'motion': 25.0, 'scale_jitter': 0.3, 'lighting': 0.3},
+    'empty': {'face_count': 0, 'motion': 0.0, 'scale_jitter': 0.0, 'lighting': 0.1},
+}
+
+
+def _load_images(folder: Optional[str]) -> List[np.ndarray]:
+    """Load all images from a local folder"""
+    images = []
+    if not folder or not os.path.isdir(folder):
+        return images
+    for pattern in IMAGE_EXTENSIONS:
+        for path in sorted(glob.glob(os.path.join(folder, pattern))):
+            image = cv2.imread(path, cv2.IMREAD_COLOR)
+            if image is not None:
+                images.append(image)
+    return images
+
+
+def draw_placeholder_face(size: int, variant: int = 0) -> np.ndarray:
+    """Draw a simple cartoon face (used when no face images are available)"""
+    face = np.full((size, size, 3), 90, dtype=np.uint8)
+    center = (size // 2, size // 2)
+    skin = [(140, 170, 215), (110, 140, 190), (90, 110, 150)][variant % 3]
+    cv2.ellipse(face, center, (int(size * 0.38), int(size * 0.48)), 0, 0, 360, skin, -1)
+    eye_y = int(size * 0.4)
+    for eye_x in (int(size * 0.35), int(size * 0.65)):
+        cv2.circle(face, (eye_x, eye_y), max(2, size // 14), (40, 40, 40), -1)
+    # Alternate smile / frown / open mouth
+    mouth_y = int(size * 0.68)
+    if variant % 3 == 0:
+        cv2.ellipse(face, (size // 2, mouth_y), (size // 6, size // 12), 0, 0, 180, (60, 60, 150), 3)
+    elif variant % 3 == 1:
+        cv2.ellipse(face, (size // 2, mouth_y + size // 12), (size // 6, size // 12), 0, 180, 360, (60, 60, 150), 3)
+    else:
+        cv2.ellipse(face, (size // 2, mouth_y), (size // 12, size // 10), 0, 0, 360, (60, 60, 150), -1)
+    return face
+
+
+class SyntheticFaceVideo:
+    """Deterministic generator of frames with moving faces"""
+
+    def __init__(self, width: int = 640, height: int = 480, face_count: int = 1,
+                 motion: float = 2.0, face_scale: float = 0.3, scale_jitter: float = 0.0,
+                 lighting: float = 0.0, lighting_period: int = 90,
+                 face_dir: Optional[str] = None, background_dir: Optional[str] = None,
+                 noise: int = 8, seed: int = 0):
+        self.width = width
+        self.height = height
+        self.face_count = face_count
+        self.motion = motion
+        self.face_scale = face_scale
+        self.scale_jitter = scale_jitter
+        self.lighting = lighting
+        self.lighting_period = max(1, lighting_period)
+        self.noise = noise
+        self.rng = np.random.default_rng(seed)
+        self.frame_index = 0
+
+        self.face_images = _load_images(face_dir)
+        self.background = self._make_background(_load_images(background_dir))
+        self._mask_cache: Dict[int, np.ndarray] = {}
+        self._noise_frames = [
+            self.rng.integers(0, noise + 1, (height, width, 3), dtype=np.uint8) for _ in range(4)
+        ] if noise > 0 else []
+
+        self.faces = [self._spawn_face(i) for i in range(face_count)]
+
+    @classmethod
+    def from_scenario(cls, scenario: str, **overrides) -> "SyntheticFaceVideo":
+        """Create a generator from a named scenario in SCENARIOS (ValueError if unknown)"""
+        if scenario not in SCENARIOS:
+            raise ValueError(f"Scenario không hợp lệ: {scenario!r} (chọn một trong: {', '.join(sorted(SCENARIOS))})")
+        params = dict(SCENARIOS[scenario])
+        params.update(overrides)
+        return cls(**params)
+
+    def _make_background(self, backgrounds: List[np.ndarray]) -> np.ndarray:
+        """Use a local background image or a horizontal gradient"""
+        if backgrounds:
+            return cv2.resize(backgrounds[0], (self.width, self.height))
+        gradient = np.linspace(40, 120, self.width, dtype=np.uint8)
+        background = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        background[:] = gradient[np.newaxis, :, np.newaxis]
+        return background
+
+    def _spawn_face(self, index: int) -> Dict:
+        """Create initial position, velocity and phase for one face"""
+        base_size = max(24, int(self.height * self.face_scale))
+        angle = self.rng.uniform(0, 2 * math.pi)
+        if self.face_images:
+            image = self.face_images[index % len(self.face_images)]
+        else:
+            image = draw_placeholder_face(256, index)
+        return {
+            'image': image,
+            'base_size': base_size,
+            'x': self.rng.uniform(0, max(1, self.width - base_size)),
+            'y': self.rng.uniform(0, max(1, self.height - base_size)),
+            'vx': math.cos(angle) * self.motion,
+            'vy': math.sin(angle) * self.motion,
+            'phase': self.rng.uniform(0, 2 * math.pi),
+        }
+
+    def _get_mask(self, size: int) -> np.ndarray:
+        """Feathered elliptical alpha mask for compositing"""
+        mask = self._mask_cache.get(size)
+        if mask is None:
+            mask = np.zeros((size, size), dtype=np.float32)
+            cv2.ellipse(mask, (size // 2, size // 2), (int(size * 0.42), int(size * 0.5)), 0, 0, 360, 1.0, -1)
+            mask = cv2.GaussianBlur(mask, (0, 0), max(1, size // 20))[:, :, np.newaxis]
+            self._mask_cache[size] = mask
+        return mask
+
+    def _paste_face(self, frame: np.ndarray, face: Dict, size: int):
+        """Alpha-blend one face at its current position"""
+        x, y = int(face['x']), int(face['y'])
+        x1, y1 = max(0, x), max(0, y)
+        x2, y2 = min(self.width, x + size), min(self.height, y + size)
+        if x2 <= x1 or y2 <= y1:
+            return
+
+        face_img = cv2.resize(face['image'], (size, size))
+        mask = self._get_mask(size)
+        fx1, fy1 = x1 - x, y1 - y
+        fx2, fy2 = fx1 + (x2 - x1), fy1 + (y2 - y1)
+
+        roi = frame[y1:y2, x1:x2].astype(np.float32)
+        alpha = mask[fy1:fy2, fx1:fx2]
+        blended = roi * (1.0 - alpha) + face_img[fy1:fy2, fx1:fx2].astype(np.float32) * alpha
+        frame[y1:y2, x1:x2] = blended.astype(np.uint8)
+
+    def _step_face(self, face: Dict, size: int):
+        """Move a face and bounce it off the frame edges"""
+        face['x'] += face['vx']
+        face['y'] += face['vy']
+        if face['x'] < 0 or face['x'] > self.width - size:
+            face['vx'] = -face['vx']
+            face['x'] = min(max(face['x'], 0), max(0, self.width - size))
+        if face['y'] < 0 or face['y'] > self.height - size:
+            face['vy'] = -face['vy']
+            face['y'] = min(max(face['y'], 0), max(0, self.height - size))
+
+    def next_frame(self) -> np.ndarray:
+        """Render the next frame"""
+        frame = self.background.copy()
+        t = self.frame_index
+
+        for face in self.faces:
+            jitter = 1.0 + self.scale_jitter * math.sin(face['phase'] + t * 0.1)
+            size = max(16, int(face['base_size'] * jitter))
+            self._paste_face(frame, face, size)
+            self._step_face(face, size)
+
+        if self.lighting:
+            gain = 1.0 + self.lighting * math.sin(2 * math.pi * t / self.lighting_period)
+            frame = cv2.convertScaleAbs(frame, alpha=gain, beta=0)
+
+        if self._noise_frames:
+            cv2.add(frame, self._noise_frames[t % len(self._noise_frames)], dst=frame)
+
+        self.frame_index += 1
+        return frame
+
+    def frames(self, count: int):
+        """Yield count frames"""
+        for _ in range(count):
+            yield self.next_frame()
+
+    def write_video(self, filename: str, frame_count: int, fps: float = 30.0) -> bool:
+        """Write frames to a video file"""
+        ext = filename.lower().split('.')[-1]
+        fourcc = cv2.VideoWriter_fourcc(*('mp4v' if ext in ('mp4', 'mov') else 'XVID'))
+        writer = cv2.VideoWriter(filename, fourcc, fps, (self.width, self.height))
+        if not writer.isOpened():
+            print(f"Không thể tạo video writer cho: {filename}")
+            return False
+        try:
+            for frame in self.frames(frame_count):
+                writer.write(frame)
+        finally:
+            writer.release()
+        print(f"Đã tạo video tổng hợp: {filename} ({frame_count} frames)")
+        return True
+
+
+class SyntheticCapture:
+    """cv2.VideoCapture-compatible live source backed by SyntheticFaceVideo"""
+
+    def __init__(self, generator: SyntheticFaceVideo, fps: float = 30.0,
+                 frame_limit: Optional[int] = None, realtime: bool = True):
+        self.generator = generator
+        self.fps = fps
+        self.frame_limit = frame_limit
+        self.realtime = realtime
+        self.frames_read = 0
+        self._opened = True
+        self._next_deadline = None
+
+    @classmethod
+    def from_url(cls, url: str) -> "SyntheticCapture":
+        """Create from 'synthetic://scenario?fps=30&size=WxH&faces=N&motion=M&seed=S&frames=N'"""
+        parsed = urlparse(url)
+        scenario = parsed.netloc or parsed.path.strip('/') or 'single'
+        query = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+
+        overrides = {}
+        if 'size' in query:
+            width, height = query['size'].lower().split('x')
+            overrides['width'], overrides['height'] = int(width), int(height)
+        for key, name, cast in (('faces', 'face_count', int), ('motion', 'motion', float),
+                                ('scale', 'face_scale', float), ('lighting', 'lighting', float),
+                                ('seed', 'seed', int)):
+            if key in query:
+                overrides[name] = cast(query[key])
+        for key in ('face_dir', 'background_dir'):
+            if key in query:
+                overrides[key] = query[key]
+
+        generator = SyntheticFaceVideo.from_scenario(scenario, **overrides)
+        frame_limit = int(query['frames']) if 'frames' in query else None
+        realtime = query.get('realtime', '1') not in ('0', 'false', 'no')
+        return cls(generator, float(query.get('fps', 30)), frame_limit, realtime)
+
+    def isOpened(self) -> bool:
+        if self.frame_limit is not None and self.frames_read >= self.frame_limit:
+            return False
+        return self._opened
+
+    def read(self, image=None):
+        """Return (ret, frame), paced at the configured FPS in realtime mode"""
+        if not self._opened:
+            return False, None
+        if self.frame_limit is not None and self.frames_read >= self.frame_limit:
+            return False, None
+
+        if self.realtime and self.fps > 0:
+            now = time.perf_counter()
+            if self._next_deadline is None:
+                self._next_deadline = now
+            delay = self._next_deadline - now
+            if delay > 0:
+                time.sleep(delay)
+            self._next_deadline = max(self._next_deadline, now - 1.0 / self.fps) + 1.0 / self.fps
+
+        frame = self.generator.next_frame()
+        if image is not None and image.shape == frame.shape:
+            np.copyto(image, frame)
+            frame = image
+        self.frames_read += 1
+        return True, frame
+
+    def get(self, prop_id) -> float:
+        if prop_id == cv2.CAP_PROP_FPS:
+            return float(self.fps)
+        if prop_id == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.generator.width)
+        if prop_id == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.generator.height)
+        if prop_id == cv2.CAP_PROP_FRAME_COUNT:
+            return float(self.frame_limit or 0)
+        if prop_id == cv2.CAP_PROP_POS_FRAMES:
+            return float(self.frames_read)
+        return 0.0
+
+    def set(self, prop_id, value) -> bool:
+        if prop_id == cv2.CAP_PROP_FPS:
+            self.fps = float(value)
+            return True
+        return False
+
+    def release(self):
+        self._opened = False
+
+
+def main(argv=None):
+    """Command line entry point for writing synthetic videos"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate synthetic face videos")
+    parser.add_argument("--scenario", default="single", choices=sorted(SCENARIOS))
+    parser.add_argument("--output", default="synthetic_faces.mp4")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--size", default="640x480", help="Resolution WxH")
+    parser.add_argument("--faces", type=int, help="Override face count")
+    parser.add_argument("--face-dir", help="Folder with local face images")
+    parser.add_argument("--background-dir", help="Folder with local background images")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    width, height = (int(v) for v in args.size.lower().split('x'))
+    overrides = {'width': width, 'height': height, 'seed': args.seed,
+                 'face_dir': args.face_dir, 'background_dir': args.background_dir}
+    if args.faces is not None:
+        overrides['face_count'] = args.faces
+
+    generator = SyntheticFaceVideo.from_scenario(args.scenario, **overrides)
+    return 0 if generator.write_video(args.output, args.frames, args.fps) else 1
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""
+Chrome trace-event recorder for profiling the pipeline
+
+The written JSON file can be opened in chrome://tracing or ui.perfetto.dev.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+
+class TraceRecorder:
+    """Collect complete ("X") trace events from any thread"""
+
+    def __init__(self):
+        self.enabled = False
+        self.filename = ""
+        self.max_events = 0
+        self.dropped_events = 0
+        self._events = []
+        self._thread_names = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._pid = os.getpid()
+        self._origin = time.perf_counter()
+
+    def start(self, filename: str, max_events: int = 500000):
+        """Enable tracing; events are kept in memory until save()"""
+        with self._lock:
+            self.filename = filename
+            self.max_events = max_events
+            self.dropped_events = 0
+            self._events = []
+            self._thread_names = {}
+            self._origin = time.perf_counter()
+            self.enabled = True
+        print(f"Profiling trace enabled: {filename}")
+
+    def stop(self) -> Optional[str]:
+        """Disable tracing and write the trace file"""
+        filename = self.save()
+        self.enabled = False
+        return filename
+
+    def set_frame(self, frame_index: int):
+        """Set the default frame number for spans on the calling thread"""
+        self._local.frame = frame_index
+
+    def get_frame(self) -> Optional[int]:
+        """Get the default frame number of the calling thread"""
+        return getattr(self._local, "frame", None)
+
+    @contextmanager
+    def span(self, name: str, category: str = "pipeline", frame: Optional[int] = None, **args):
+        """Record the duration of a block as one trace event"""
+        if not self.enabled:
+            yield
+            return
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add_event(name, category, start, time.perf_counter(), frame, args)
+
+    def _add_event(self, name, category, start, end, frame, args):
+        """Append a complete event for the calling thread"""
+        thread = threading.current_thread()
+        tid = threading.get_native_id()
+        if frame is None:
+            frame = getattr(self._local, "frame", None)
+        if frame is not None:
+            args["frame"] = frame
+
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": (start - self._origin) * 1e6,
+            "dur": (end - start) * 1e6,
+            "pid": self._pid,
+            "tid": tid,
+            "args": args,
+        }
+
+        with self._lock:
+            if tid not in self._thread_names:
+                self._thread_names[tid] = thread.name
+            if len(self._events) >= self.max_events:
+                self.dropped_events += 1
+                return
+            self._events.append(event)
+
+    def save(self) -> Optional[str]:
+        """Write all events recorded so far to the trace file"""
+        if not self.enabled or not self.filename:
+            return None
+
+        with self._lock:
+            events = list(self._events)
+            thread_names = dict(self._thread_names)
+            dropped = self.dropped_events
+
+        metadata = [
+            {"name": "thread_name", "ph": "M", "pid": self._pid, "tid": tid, "args": {"name": name}}
+            for tid, name in thread_names.items()
+        ]
+
+        try:
+            folder = os.path.dirname(self.filename)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            with open(self.filename, "w", encoding="utf-8") as f:
+                json.dump({
+                    "traceEvents": metadata + events,
+                    "displayTimeUnit": "ms",
+                    "otherData": {"dropped_events": dropped},
+                }, f)
+            print(f"Đã lưu trace: {self.filename} ({len(events)} events)")
+            return self.filename
+        except Exception as e:
+            print(f"Lỗi lưu trace: {e}")
+            return None
+
+
+_tracer = TraceRecorder()
+
+
+def get_tracer() -> TraceRecorder:
+    """Get the process-wide trace recorder"""
+    return _tracer
@@ -2,8 +2,11 @@
 Video recorder for saving emotion recognition sessions
 """
 import cv2
+import numpy as np
 from datetime import datetime
 from typing import Optional
+from .camera_handler import CameraHandler
+from .trace_recorder import get_tracer
 
 class VideoRecorder:
     """Handle video recording functionality"""
@@ -14,6 +17,8 @@ class VideoRecorder:
         self.output_filename = ""
         self.recording_start_time = None
         self.frame_count = 0
+        self.frame_size = (640, 480)
+        self.resize_buffer = None  # Reused when frames are resized or annotated here
     
     def start_recording(self, filename: str, fps: float = 20.0, frame_size: tuple = (640, 480)) -> bool:
         """Start video recording"""
@@ -36,6 +41,7 @@ class VideoRecorder:
                 self.output_filename = filename
                 self.recording_start_time = datetime.now()
                 self.frame_count = 0
+                self.frame_size = tuple(frame_size)
                 print(f"Bắt đầu ghi video: {filename}")
                 return True
             else:
@@ -64,10 +70,30 @@ class VideoRecorder:
         self.recording_start_time = None
         self.frame_count = 0
     
-    def write_frame(self, frame):
-        """Write a frame to the video file"""
+    def write_frame(self, frame, result=None):
+        """Write a frame to the video file, resized to the recording size
+        
+        With an EmotionResult the frame is taken unannotated: the result is
+        drawn into the recorder's own buffer after resizing, so the caller
+        needs no full-resolution annotated copy.
+        """
         if self.is_recording and self.video_writer:
-            self.video_writer.write(frame)
+            with get_tracer().span("recorder.write", "recorder"):
+                height, width = frame.shape[:2]
+                resize = (width, height) != self.frame_size
+                if resize or result is not None:
+                    shape = (self.frame_size[1], self.frame_size[0]) + frame.shape[2:]
+                    if self.resize_buffer is None or self.resize_buffer.shape != shape:
+                        self.resize_buffer = np.empty(shape, dtype=frame.dtype)
+                    if resize:
+                        cv2.resize(frame, self.frame_size, dst=self.resize_buffer, interpolation=cv2.INTER_AREA)
+                    else:
+                        np.copyto(self.resize_buffer, frame)
+                    frame = self.resize_buffer
+                if result is not None:
+                    CameraHandler.draw_result(frame, result.scaled(self.frame_size[0] / width,
+                                                                   self.frame_size[1] / height, frame.shape))
+                self.video_writer.write(frame)
             self.frame_count += 1
     
     def get_default_filename(self) -> str: